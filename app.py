@@ -1,10 +1,21 @@
 import os
 import re
+import base64
+import binascii
 import requests
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, g, Response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from database import db, DatabaseManager
+from database import (db, DatabaseManager, PracticeWriteBehind, VOCABULARY_SORT_KEYS, SENTENCE_SORT_KEYS,
+                      EXPORT_DATASETS, vocabulary_sort_key, sentence_sort_key)
+import export
+import generation
+import scoring
+import vocabulary_import
+from metrics import REGISTRY
+from http_cache import conditional_json, make_etag, parse_timestamp
+from jobs import GenerationJobManager
+from sentence_pool import SentencePool
 from openai import OpenAI
 from dotenv import load_dotenv
 import json
@@ -39,6 +50,144 @@ dev_cache = DevCache()
 # Check if we're in development mode
 DEV_MODE = os.getenv('FLASK_ENV') == 'development' or os.getenv('DEV_MODE') == 'true'
 
+# Practice records are buffered and written in grouped transactions
+practice_writer = PracticeWriteBehind(
+    db,
+    flush_interval=float(os.getenv('PRACTICE_FLUSH_INTERVAL', 1.0)),
+    max_batch=int(os.getenv('PRACTICE_MAX_BATCH', 100)),
+    flush_on_session_end=os.getenv('PRACTICE_FLUSH_ON_SESSION_END', 'true') == 'true'
+)
+
+# Maximum number of records accepted by /api/practice/record-batch
+MAX_PRACTICE_BATCH = 500
+# Types accepted for each practice record field; None is always allowed except for session_id
+PRACTICE_RECORD_FIELDS = {
+    'session_id': int,
+    'vocabulary_id': int,
+    'sentence_id': int,
+    'user_answer': str,
+    'correct_answer': str,
+    'is_correct': (bool, int),
+    'response_time_ms': (int, float),
+}
+
+# Largest page /api/vocabulary and /api/sentences return, whatever ?limit= asks for
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 200))
+
+# Sentence generation runs as background jobs so request workers never wait on the model
+generation_jobs = GenerationJobManager(db, max_workers=int(os.getenv('GENERATION_WORKERS', 4)),
+                                       retention_days=float(os.getenv('GENERATION_JOB_RETENTION_DAYS', 7)))
+generation_jobs.register('sentences', generation.generate_sentences)
+generation_jobs.register('practice_sentence', generation.generate_practice_sentence)
+generation_jobs.resume_pending()
+
+# Practice sentences are served from per-user pools refilled in the background
+sentence_pool = SentencePool(
+    db,
+    generation.generate_practice_pool,
+    depth=int(os.getenv('SENTENCE_POOL_DEPTH', 5)),
+    low_water=int(os.getenv('SENTENCE_POOL_LOW_WATER', 2)),
+    refill_workers=int(os.getenv('SENTENCE_POOL_REFILL_WORKERS', 2))
+)
+
+# Longest a job status request may be held open with ?wait=; clients poll
+# with backoff instead, so a request worker is never pinned for a model call
+MAX_JOB_WAIT_SECONDS = 2
+
+# Most answers /api/practice/score-translations accepts per request
+MAX_SCORE_BATCH = int(os.getenv('MAX_SCORE_BATCH', 200))
+
+# Request latency per route; scraped from /metrics, optionally behind a bearer token
+HTTP_REQUEST_SECONDS = REGISTRY.histogram('lingualearn_http_request_duration_seconds',
+                                          'Wall time of Flask requests by route', ['endpoint', 'method'])
+HTTP_REQUESTS = REGISTRY.counter('lingualearn_http_requests_total',
+                                 'Flask requests by route and status', ['endpoint', 'method', 'status'])
+HTTP_ERRORS = REGISTRY.counter('lingualearn_http_errors_total',
+                               'Unhandled exceptions in Flask requests by route', ['endpoint'])
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+def _request_endpoint():
+    # The URL rule, not the path, keeps label cardinality bounded
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if DEV_MODE and db.profiler:
+        db.profiler.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = _request_endpoint()
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+        HTTP_REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    if DEV_MODE and db.profiler:
+        add_sql_profile_headers(response, db.profiler.end_request())
+    return response
+
+def add_sql_profile_headers(response, summary, top=3):
+    """Server-Timing total plus the request's slowest statements (dev mode only)"""
+    if not summary or not summary['queries']:
+        return
+    response.headers['Server-Timing'] = f'db;dur={summary["time_ms"]:.1f};desc="{summary["queries"]} queries"'
+    statements = '; '.join(f'{statement["calls"]}x {statement["time_ms"]:.1f}ms {statement["sql"][:120]}'
+                           for statement in summary['statements'][:top])
+    # Header values must be latin-1; SQL with other characters is shown escaped
+    response.headers['X-SQL-Profile'] = statements.encode('ascii', 'backslashreplace').decode('ascii')
+
+@app.teardown_request
+def record_request_error(error):
+    if error is not None:
+        HTTP_ERRORS.inc(_request_endpoint())
+        # Propagated exceptions skip after_request; still count the request
+        started = g.pop('request_started', None)
+        if started is not None:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, _request_endpoint(), request.method)
+            HTTP_REQUESTS.inc(_request_endpoint(), request.method, '500')
+
+def collect_component_stats():
+    """Cache, pool and upstream counters from the components' own stats(), read at scrape time"""
+    caches = {'users': db.user_cache.stats(), 'generation': generation.cache_stats(),
+              'sentence_pool': sentence_pool.stats()}
+    pool = db.pool_stats()
+    llm = generation.get_llm_client().stats()
+    coalescing = generation.single_flight_stats()
+    batching = generation.batch_stats()
+    writer = practice_writer.stats()
+    return [
+        ('lingualearn_cache_hits_total', 'counter', 'Cache lookups served from the cache',
+         [({'cache': name}, stats['hits']) for name, stats in caches.items()]),
+        ('lingualearn_cache_misses_total', 'counter', 'Cache lookups that missed',
+         [({'cache': name}, stats['misses']) for name, stats in caches.items()]),
+        ('lingualearn_db_pool_connections', 'gauge', 'Pooled SQLite connections by state',
+         [({'state': 'in_use'}, pool['in_use']), ({'state': 'idle'}, pool['idle'])]),
+        ('lingualearn_db_pool_waits_total', 'counter', 'Checkouts that waited for a free connection',
+         [({}, pool['waits'])]),
+        ('lingualearn_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a free connection',
+         [({}, pool['wait_time_ms'] / 1000)]),
+        ('lingualearn_llm_attempts_total', 'counter', 'HTTP attempts made to the LLM API, including retries',
+         [({}, llm['attempts'])]),
+        ('lingualearn_llm_retries_total', 'counter', 'LLM API attempts that were retried', [({}, llm['retries'])]),
+        ('lingualearn_llm_circuit_rejections_total', 'counter', 'Calls refused while the circuit breaker was open',
+         [({}, llm['circuit_rejections'])]),
+        ('lingualearn_llm_circuit_open', 'gauge', '1 while the LLM circuit breaker is not closed',
+         [({}, int(llm['circuit_state'] != 'closed'))]),
+        ('lingualearn_generation_coalesced_total', 'counter', 'Generation calls that shared an in-flight call',
+         [({}, coalescing['shared'])]),
+        ('lingualearn_generation_batched_requests_total', 'counter', 'Generation prompts sent as part of a batch',
+         [({}, batching['batched_requests'])]),
+        ('lingualearn_practice_pending_records', 'gauge', 'Practice records buffered for writing',
+         [({}, writer['pending'])]),
+        ('lingualearn_practice_write_errors_total', 'counter', 'Failed practice record flushes',
+         [({}, writer['errors'])]),
+        ('lingualearn_practice_dropped_records_total', 'counter', 'Practice records that could not be written',
+         [({}, writer['dropped'])]),
+    ]
+
+REGISTRY.register_collector(collect_component_stats)
+
 # User class for Flask-Login
 class User(UserMixin):
     def __init__(self, user_data):
@@ -48,7 +197,7 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    user_data = db.get_user_by_id(int(user_id))
+    user_data = db.get_cached_user(int(user_id))
     if user_data:
         return User(user_data)
     return None
@@ -155,8 +304,7 @@ def practice_vocabulary():
         return redirect(url_for('dashboard'))
     
     # Get language info
-    languages = db.get_languages()
-    language = next((lang for lang in languages if lang['id'] == language_id), None)
+    language = db.get_language(language_id)
     
     if not language:
         return redirect(url_for('dashboard'))
@@ -175,26 +323,65 @@ def practice_sentences():
         return redirect(url_for('dashboard'))
     
     # Get language info
-    languages = db.get_languages()
-    language = next((lang for lang in languages if lang['id'] == language_id), None)
+    language = db.get_language(language_id)
     
     if not language:
         return redirect(url_for('dashboard'))
     
+    # Start filling the pool while the page loads
+    sentence_pool.ensure_filled(current_user.id, language_id, 'beginner')
+    
     return render_template('practice_sentences.html', 
                          language=language, 
                          session_id=session_id)
 
 @app.route('/api/languages', methods=['GET'])
 def get_languages():
-    languages = db.get_languages()
-    return jsonify(languages)
+    catalog = db.get_language_catalog()
+    return conditional_json(catalog.all, make_etag('languages', catalog.fingerprint), private=False)
+
+@app.route('/api/db/pool-stats', methods=['GET'])
+@login_required
+def get_pool_stats():
+    return jsonify(db.pool_stats())
+
+@app.route('/api/db/sql-profile', methods=['GET'])
+@login_required
+def get_sql_profile():
+    if not db.profiler:
+        return jsonify({'error': 'SQL profiling is disabled (set SQL_PROFILE=true)'}), 404
+    stats = db.profiler.stats(limit=request.args.get('limit', 20, type=int))
+    if request.args.get('reset') == 'true':
+        db.profiler.reset()
+    return jsonify(stats)
+
+@app.route('/api/db/cache-stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    return jsonify({'users': db.user_cache.stats(), 'generation': generation.cache_stats(),
+                    'sentence_pool': sentence_pool.stats()})
+
+@app.route('/api/llm/stats', methods=['GET'])
+@login_required
+def get_llm_stats():
+    stats = generation.get_llm_client().stats()
+    stats['single_flight'] = generation.single_flight_stats()
+    stats['batching'] = generation.batch_stats()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/user-languages', methods=['GET'])
 @login_required
 def get_user_languages_api():
-    user_languages = db.get_user_languages(current_user.id)
-    return jsonify(user_languages)
+    version, updated_at = db.get_data_version(current_user.id, 'languages')
+    etag = make_etag('user-languages', current_user.id, version, updated_at,
+                     db.get_language_catalog().fingerprint)
+    return conditional_json(lambda: db.get_user_languages(current_user.id), etag, parse_timestamp(updated_at))
 
 @app.route('/api/add-language', methods=['POST'])
 @login_required
@@ -211,21 +398,59 @@ def add_language():
     except (ValueError, TypeError):
         return jsonify({'success': False, 'error': 'Invalid language ID'}), 400
     
+    if language_id not in db.get_language_catalog():
+        return jsonify({'success': False, 'error': 'Unknown language'}), 400
+    
     try:
         db.add_user_language(current_user.id, language_id)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def encode_cursor(key):
+    """Opaque next_cursor token for a sort key"""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token, size):
+    """Sort key of `size` integers from a next_cursor token, or None if the token is malformed"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(key, list) or len(key) != size or not all(type(value) is int for value in key):
+        return None
+    return tuple(key)
+
+def list_page(scope, load, sort_key, key_size):
+    """One page of a listing as {'items': [...], 'next_cursor': token or None}.
+
+    Pages hold at most MAX_PAGE_SIZE rows; ?cursor= takes the previous
+    page's next_cursor and continues after its last row.
+    """
+    language_id = request.args.get('language_id', type=int)
+    difficulty_level = request.args.get('difficulty_level')
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_PAGE_SIZE)
+    token = request.args.get('cursor')
+    after = None
+    if token:
+        after = decode_cursor(token, key_size)
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    def page():
+        # One extra row tells whether there is a next page
+        items = load(current_user.id, language_id, difficulty_level, limit + 1, after)
+        next_cursor = encode_cursor(sort_key(items[limit - 1])) if len(items) > limit else None
+        return {'items': items[:limit], 'next_cursor': next_cursor}
+    
+    version, updated_at = db.get_data_version(current_user.id, scope)
+    etag = make_etag(scope, current_user.id, version, updated_at, language_id, difficulty_level, limit, token)
+    return conditional_json(page, etag, parse_timestamp(updated_at))
+
 @app.route('/api/vocabulary', methods=['GET'])
 @login_required
 def get_vocabulary():
-    language_id = request.args.get('language_id', type=int)
-    difficulty_level = request.args.get('difficulty_level')
-    limit = request.args.get('limit', 50, type=int)
-    
-    vocabulary = db.get_user_vocabulary(current_user.id, language_id, difficulty_level, limit)
-    return jsonify(vocabulary)
+    return list_page('vocabulary', db.get_user_vocabulary, vocabulary_sort_key, len(VOCABULARY_SORT_KEYS))
 
 @app.route('/api/add-vocabulary', methods=['POST'])
 @login_required
@@ -287,34 +512,86 @@ def bulk_add_vocabulary():
     if language_id not in user_language_ids:
         return jsonify({'success': False, 'error': 'You can only add vocabulary for languages you have added to your profile'}), 400
     
+    if not isinstance(vocabulary_list, list):
+        return jsonify({'success': False, 'error': 'Vocabulary list must be an array'}), 400
+    
     try:
-        added_count = 0
-        for vocab in vocabulary_list:
-            word = vocab.get('word')
-            translation = vocab.get('translation')
-            difficulty_level = 'beginner'  # Default difficulty level
-            category = vocab.get('category')
-            
-            if word:
-                db.add_vocabulary(
-                    current_user.id, language_id, word, translation, 
-                    difficulty_level, category
-                )
-                added_count += 1
+        difficulty_level = 'beginner'  # Default difficulty level
+        result = db.add_vocabulary_bulk(current_user.id, language_id, vocabulary_list, difficulty_level)
+        errors = [row for row in result['results'] if row['status'] == 'error']
         
-        return jsonify({'success': True, 'added_count': added_count})
+        return jsonify({
+            'success': True,
+            'added_count': result['added_count'],
+            'error_count': len(errors),
+            'errors': errors
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/vocabulary/import', methods=['POST'])
+@login_required
+def import_vocabulary_file():
+    """Stream an uploaded CSV, NDJSON or Anki text file into the vocabulary.
+
+    Form fields: file, language_id, format (default: from the file name),
+    difficulty_level, and import_id to resume an interrupted import with the
+    same file (language, format and level then come from that import).
+    """
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'success': False, 'error': 'A file is required'}), 400
+    
+    import_id = request.form.get('import_id')
+    format_name = request.form.get('format') or vocabulary_import.detect_format(upload.filename)
+    language_id = None
+    if import_id:
+        if db.get_vocabulary_import(import_id, current_user.id) is None:
+            return jsonify({'success': False, 'error': 'Import not found'}), 404
+    else:
+        try:
+            language_id = int(request.form.get('language_id'))
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'Invalid language ID'}), 400
+        
+        user_language_ids = [lang['language_id'] for lang in db.get_user_languages(current_user.id)]
+        if language_id not in user_language_ids:
+            return jsonify({'success': False, 'error': 'You can only add vocabulary for languages you have added to your profile'}), 400
+        if format_name not in vocabulary_import.FORMATS:
+            return jsonify({'success': False, 'error': f'Unknown format, expected one of: {", ".join(vocabulary_import.FORMATS)}'}), 400
+    
+    try:
+        # Werkzeug spools large uploads to a temporary file, so the upload is read as a stream too
+        result = vocabulary_import.import_vocabulary(
+            db, current_user.id, upload.stream, format_name, language_id, filename=upload.filename,
+            difficulty_level=request.form.get('difficulty_level', 'beginner'), import_id=import_id)
+    except vocabulary_import.ImportConflictError as e:
+        return jsonify({'success': False, 'error': str(e), 'import_id': e.import_id}), 409
+    except vocabulary_import.VocabularyImportError as e:
+        return jsonify({'success': False, 'error': str(e), 'import_id': e.import_id}), 400
+    
+    return jsonify(dict(vocabulary_import.import_summary(result), success=True))
+
+@app.route('/api/vocabulary/imports', methods=['GET'])
+@login_required
+def get_vocabulary_imports():
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_PAGE_SIZE))
+    imports = db.get_vocabulary_imports(current_user.id, limit)
+    return jsonify([vocabulary_import.import_summary(item) for item in imports])
+
+@app.route('/api/vocabulary/imports/<import_id>', methods=['GET'])
+@login_required
+def get_vocabulary_import(import_id):
+    """Progress of an import, for polling while it runs or finding where it stopped"""
+    result = db.get_vocabulary_import(import_id, current_user.id)
+    if result is None:
+        return jsonify({'error': 'Import not found'}), 404
+    return jsonify(vocabulary_import.import_summary(result))
+
 @app.route('/api/sentences', methods=['GET'])
 @login_required
 def get_sentences():
-    language_id = request.args.get('language_id', type=int)
-    difficulty_level = request.args.get('difficulty_level')
-    limit = request.args.get('limit', 50, type=int)
-    
-    sentences = db.get_user_sentences(current_user.id, language_id, difficulty_level, limit)
-    return jsonify(sentences)
+    return list_page('sentences', db.get_user_sentences, sentence_sort_key, len(SENTENCE_SORT_KEYS))
 
 @app.route('/api/add-sentence', methods=['POST'])
 @login_required
@@ -343,7 +620,7 @@ def get_vocabulary_practice():
     difficulty_level = request.args.get('difficulty_level')
     limit = request.args.get('limit', 10, type=int)
     
-    vocabulary = db.get_random_vocabulary(current_user.id, language_id, difficulty_level, limit)
+    vocabulary = db.get_due_vocabulary(current_user.id, language_id, difficulty_level, limit)
     return jsonify(vocabulary)
 
 @app.route('/api/practice/sentence', methods=['GET'])
@@ -381,28 +658,74 @@ def end_practice_session():
     correct_answers = data.get('correct_answers', 0)
     total_questions = data.get('total_questions', 0)
     
+    practice_writer.session_ended(session_id)
     db.end_learning_session(session_id, words_practiced, sentences_practiced, correct_answers, total_questions)
     return jsonify({'success': True})
 
+def practice_record(data, default_session_id=None):
+    """A queued practice record for the current user, or an error message.
+
+    Records are checked here because a value SQLite cannot bind would
+    otherwise fail the shared write-behind batch it lands in.
+    """
+    record = {'user_id': current_user.id}
+    for field, types in PRACTICE_RECORD_FIELDS.items():
+        value = data.get(field, default_session_id if field == 'session_id' else None)
+        if value is not None and not isinstance(value, types):
+            return f'Invalid {field}'
+        record[field] = value
+    if not record['session_id']:
+        return 'Session ID is required'
+    return record
+
 @app.route('/api/practice/record', methods=['POST'])
 @login_required
 def record_practice():
-    data = request.get_json()
-    session_id = data.get('session_id')
-    vocabulary_id = data.get('vocabulary_id')
-    sentence_id = data.get('sentence_id')
-    user_answer = data.get('user_answer')
-    correct_answer = data.get('correct_answer')
-    is_correct = data.get('is_correct')
-    response_time_ms = data.get('response_time_ms')
-    
-    db.record_practice(
-        current_user.id, session_id, vocabulary_id, sentence_id,
-        user_answer, correct_answer, is_correct, response_time_ms
-    )
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Session ID is required'}), 400
+    
+    record = practice_record(data)
+    if isinstance(record, str):
+        return jsonify({'success': False, 'error': record}), 400
+    
+    practice_writer.submit([record])
     
     return jsonify({'success': True})
 
+@app.route('/api/practice/record-batch', methods=['POST'])
+@login_required
+def record_practice_batch():
+    data = request.get_json(silent=True) or {}
+    default_session_id = data.get('session_id')
+    records = data.get('records')
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({'success': False, 'error': 'Records list is required'}), 400
+    
+    if len(records) > MAX_PRACTICE_BATCH:
+        return jsonify({'success': False, 'error': f'At most {MAX_PRACTICE_BATCH} records per batch'}), 400
+    
+    batch = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            return jsonify({'success': False, 'error': f'Record {index} must be an object'}), 400
+        
+        if not record.get('session_id', default_session_id):
+            return jsonify({'success': False, 'error': f'Record {index} is missing a session ID'}), 400
+        
+        record = practice_record(record, default_session_id)
+        if isinstance(record, str):
+            return jsonify({'success': False, 'error': f'Record {index}: {record}'}), 400
+        batch.append(record)
+    
+    practice_writer.submit(batch)
+    
+    if data.get('session_end'):
+        practice_writer.session_ended(default_session_id)
+    
+    return jsonify({'success': True, 'accepted_count': len(batch)})
+
 @app.route('/api/stats', methods=['GET'])
 @login_required
 def get_stats():
@@ -410,6 +733,24 @@ def get_stats():
     stats = db.get_user_stats(current_user.id, language_id)
     return jsonify(stats)
 
+@app.route('/api/export/<dataset>', methods=['GET'])
+@login_required
+def export_dataset(dataset):
+    """Download vocabulary, sentences, learning_sessions or practice_records as ?format=ndjson or csv"""
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f'Unknown dataset, expected one of: {", ".join(EXPORT_DATASETS)}'}), 404
+    format_name = request.args.get('format', 'ndjson')
+    if format_name not in export.FORMATS:
+        return jsonify({'error': f'Unknown format, expected one of: {", ".join(export.FORMATS)}'}), 400
+    
+    # Rows are read and encoded chunk by chunk while the response is sent
+    mimetype, extension = export.FORMATS[format_name]
+    body = export.encode(format_name, EXPORT_DATASETS[dataset].columns, db.export_rows(current_user.id, dataset))
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="lingualearn-{dataset}.{extension}"',
+        'Cache-Control': 'private, no-store',
+    })
+
 @app.route('/api/generate-sentences', methods=['POST'])
 @login_required
 def generate_sentences():
@@ -436,62 +777,10 @@ def generate_sentences():
     if language_id not in user_language_ids:
         return jsonify({'success': False, 'error': 'You can only generate sentences for languages you have added to your profile'}), 400
     
-    # Get vocabulary for the language
-    vocabulary = db.get_user_vocabulary(current_user.id, language_id, difficulty_level, 20)
-    print(f"🔍 Debug: Found {len(vocabulary)} vocabulary items")
-    
-    if not vocabulary:
-        return jsonify({'success': False, 'error': 'No vocabulary found for this language and level'})
-    
-    # Get language name
-    languages = db.get_languages()
-    language_name = next((lang['name'] for lang in languages if lang['id'] == language_id), 'Unknown')
-    print(f"🔍 Debug: Language name: {language_name}")
-    
-    # Generate sentences using OpenAI
-    try:
-        load_dotenv()
-        api_key = os.getenv("APIKEY")
-        print(f"🔍 Debug: API key loaded: {'Yes' if api_key and api_key != 'your_openai_api_key_here' else 'No'}")
-        
-        if not api_key or api_key == 'your_openai_api_key_here':
-            return jsonify({'success': False, 'error': 'OpenAI API key not configured. Please set your API key in the .env file.'})
-        
-        vocab_words = [vocab['word'] for vocab in vocabulary[:10]]  # Use first 10 words
-        vocab_str = ", ".join(vocab_words)
-        print(f"🔍 Debug: Using vocabulary words: {vocab_str}")
-        
-        prompt = f"Generate 5 simple sentences in {language_name} using some of these words: {vocab_str}. Make sure each sentence uses 2-3 words from the list. Return only the sentences, one per line."
-        
-        print(f"🔍 Debug: Sending request to OpenAI...")
-        try:
-            response_data = call_openai_api([
-                {"role": "system", "content": "You are a helpful language learning assistant."},
-                {"role": "user", "content": prompt}
-            ], max_tokens=200)
-            
-            content = response_data['choices'][0]['message']['content']
-        except Exception as e:
-            print(f"❌ Error calling OpenAI API: {str(e)}")
-            return jsonify({'success': False, 'error': f'Failed to call OpenAI API: {str(e)}'})
-        
-        if content:
-            generated_sentences = content.strip().split('\n')
-            generated_sentences = [s.strip() for s in generated_sentences if s and s.strip()]
-        else:
-            generated_sentences = []
-        
-        print(f"🔍 Debug: Generated {len(generated_sentences)} sentences")
-        
-        # Add sentences to database
-        for sentence in generated_sentences:
-            db.add_sentence(current_user.id, language_id, sentence, difficulty_level=difficulty_level)
-        
-        return jsonify({'success': True, 'sentences': generated_sentences, 'count': len(generated_sentences)})
-        
-    except Exception as e:
-        print(f"❌ Error in sentence generation: {str(e)}")
-        return jsonify({'success': False, 'error': f'Failed to generate sentences: {str(e)}'})
+    # The model call runs on a background worker; clients poll the job for the result
+    job_id = generation_jobs.submit(current_user.id, 'sentences',
+                                    language_id=language_id, difficulty_level=difficulty_level)
+    return job_accepted_response(job_id)
 
 @app.route('/api/practice/generate-sentence', methods=['POST'])
 @login_required
@@ -519,69 +808,60 @@ def generate_practice_sentence():
     if language_id not in user_language_ids:
         return jsonify({'success': False, 'error': 'You can only practice languages you have added to your profile'}), 400
     
+    sentence = sentence_pool.take(current_user.id, language_id, difficulty_level)
+    if sentence:
+        return jsonify({
+            'success': True,
+            'sentence': sentence['sentence'],
+            'translation': sentence['translation'],
+            'sentence_id': sentence['id']
+        })
+    
+    # Pool is empty (first visit or refills falling behind) - generate this one directly
+    job_id = generation_jobs.submit(current_user.id, 'practice_sentence',
+                                    language_id=language_id, difficulty_level=difficulty_level)
+    return job_accepted_response(job_id)
+
+def job_accepted_response(job_id):
+    """202 response pointing the client at the job status endpoint"""
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'pending',
+        'status_url': url_for('get_generation_job', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_generation_job(job_id):
+    # Optional short hold: ?wait=N (at most MAX_JOB_WAIT_SECONDS) returns as soon as the job finishes
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_JOB_WAIT_SECONDS)
+    job = generation_jobs.get(job_id, current_user.id, wait=wait)
+    
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': {
+            'id': job['id'],
+            'type': job['job_type'],
+            'status': job['status'],
+            'result': job['result'],
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at']
+        }
+    })
+
+def answer_language_code(data):
+    """ISO code of the optional language_id the answers are written in"""
     try:
-        # Get vocabulary for the language
-        vocabulary = db.get_user_vocabulary(current_user.id, language_id, difficulty_level, 10)
-        print(f"🔍 Debug: Found {len(vocabulary)} vocabulary items for practice")
-        
-        if not vocabulary:
-            return jsonify({'success': False, 'error': 'No vocabulary found for this language and level'})
-        
-        # Get language name
-        languages = db.get_languages()
-        language_name = next((lang['name'] for lang in languages if lang['id'] == language_id), 'Unknown')
-        print(f"🔍 Debug: Language name: {language_name}")
-        
-        # Generate sentence using OpenAI
-        load_dotenv()
-        api_key = os.getenv("APIKEY")
-        print(f"🔍 Debug: API key loaded: {'Yes' if api_key and api_key != 'your_openai_api_key_here' else 'No'}")
-        
-        if not api_key or api_key == 'your_openai_api_key_here':
-            return jsonify({'success': False, 'error': 'OpenAI API key not configured. Please set your API key in the .env file.'})
-        
-        vocab_words = [vocab['word'] for vocab in vocabulary[:5]]  # Use first 5 words
-        vocab_str = ", ".join(vocab_words)
-        print(f"🔍 Debug: Using vocabulary words: {vocab_str}")
-        
-        prompt = f"Generate a simple sentence in {language_name} using 2-3 words from this list: {vocab_str}. Also provide the English translation. Return in this exact format: SENTENCE|TRANSLATION"
-        
-        print(f"🔍 Debug: Sending request to OpenAI...")
-        try:
-            response_data = call_openai_api([
-                {"role": "system", "content": "You are a helpful language learning assistant. Always respond with the format: SENTENCE|TRANSLATION"},
-                {"role": "user", "content": prompt}
-            ], max_tokens=100)
-            
-            content = response_data['choices'][0]['message']['content']
-        except Exception as e:
-            print(f"❌ Error calling OpenAI API: {str(e)}")
-            return jsonify({'success': False, 'error': f'Failed to call OpenAI API: {str(e)}'})
-        
-        if content and '|' in content:
-            parts = content.split('|')
-            if len(parts) >= 2:
-                sentence = parts[0].strip()
-                translation = parts[1].strip()
-                
-                print(f"🔍 Debug: Parsed sentence: '{sentence}' | translation: '{translation}'")
-                
-                # Add sentence to database
-                sentence_id = db.add_sentence(current_user.id, language_id, sentence, translation, difficulty_level=difficulty_level)
-                
-                return jsonify({
-                    'success': True, 
-                    'sentence': sentence,
-                    'translation': translation,
-                    'sentence_id': sentence_id
-                })
-        
-        print(f"🔍 Debug: Failed to parse OpenAI response properly")
-        return jsonify({'success': False, 'error': 'Failed to generate sentence'})
-        
-    except Exception as e:
-        print(f"❌ Error in practice sentence generation: {str(e)}")
-        return jsonify({'success': False, 'error': f'Failed to generate sentence: {str(e)}'})
+        language = db.get_language_catalog().get(int(data.get('language_id')))
+    except (TypeError, ValueError):
+        return None
+    return language['code'] if language else None
 
 @app.route('/api/practice/score-translation', methods=['POST'])
 @login_required
@@ -594,70 +874,46 @@ def score_translation():
         return jsonify({'success': False, 'error': 'Both user translation and correct translation are required'}), 400
     
     try:
-        # Simple similarity scoring (in a real app, you'd use more sophisticated NLP)
-        similarity_score = calculate_similarity(user_translation, correct_translation)
-        is_correct = similarity_score >= 0.6  # 60% similarity threshold
+        similarity_score = scoring.score_translation(user_translation, correct_translation,
+                                                     answer_language_code(data))
         
         return jsonify({
             'success': True,
-            'is_correct': is_correct,
+            'is_correct': scoring.is_correct(similarity_score),
             'similarity_score': similarity_score,
             'correct_translation': correct_translation
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def calculate_similarity(user_answer, correct_answer):
-    """Calculate similarity between user answer and correct answer"""
-    if not correct_answer:
-        return 0.0
-    
-    # Convert to lowercase and remove punctuation for comparison
-    import re
-    clean_user = re.sub(r'[^\w\s]', '', user_answer.lower())
-    clean_correct = re.sub(r'[^\w\s]', '', correct_answer.lower())
-    
-    # Check if user answer contains key words from correct answer
-    correct_words = [word for word in clean_correct.split() if len(word) > 2]
-    user_words = [word for word in clean_user.split() if len(word) > 2]
-    
-    if not correct_words:
-        return 0.0
-    
-    matching_words = [word for word in correct_words if word in user_words]
-    similarity = len(matching_words) / len(correct_words)
-    
-    return similarity
-
-# Function to call OpenAI API directly using requests
-def call_openai_api(messages, max_tokens=200):
-    """Call OpenAI API directly using requests to avoid proxy issues"""
-    api_key = os.getenv("APIKEY")
-    if not api_key or api_key == 'your_openai_api_key_here':
-        raise ValueError("OpenAI API key not configured")
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": "gpt-4",
-        "messages": messages,
-        "max_tokens": max_tokens
-    }
-    
-    response = requests.post(
-        "https://api.openai.com/v1/chat/completions",
-        headers=headers,
-        json=data,
-        timeout=30
-    )
-    
-    if response.status_code != 200:
-        raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
+@app.route('/api/practice/score-translations', methods=['POST'])
+@login_required
+def score_translations():
+    data = request.get_json() or {}
+    answers = data.get('answers')
+    
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'success': False, 'error': 'answers must be a non-empty list'}), 400
+    if len(answers) > MAX_SCORE_BATCH:
+        return jsonify({'success': False, 'error': f'At most {MAX_SCORE_BATCH} answers per request'}), 400
+    
+    pairs = []
+    for index, answer in enumerate(answers):
+        if (not isinstance(answer, dict) or not isinstance(answer.get('user_translation'), str)
+                or not isinstance(answer.get('correct_translation'), str)):
+            return jsonify({'success': False,
+                            'error': f'answers[{index}] needs user_translation and correct_translation'}), 400
+        pairs.append((answer['user_translation'], answer['correct_translation']))
     
-    return response.json()
+    try:
+        scores = scoring.score_translations(pairs, answer_language_code(data))
+        return jsonify({
+            'success': True,
+            'results': [{'is_correct': scoring.is_correct(score), 'similarity_score': score}
+                        for score in scores]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 if __name__ == '__main__':
     # Initialize database
@@ -0,0 +1,191 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a helpful language learning assistant. You will receive a JSON object "
+    "mapping request ids to independent tasks. Complete every task, following the "
+    "format each task asks for, and respond with only a JSON object mapping each "
+    "request id to your answer as a string."
+)
+
+class _Request:
+    __slots__ = ('messages', 'max_tokens', 'group', 'event', 'result', 'error')
+
+    def __init__(self, messages, max_tokens, group):
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.group = group
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def resolve(self, result):
+        self.result = result
+        self.event.set()
+
+    def fail(self, error):
+        self.error = error
+        self.event.set()
+
+def build_batch_messages(requests_by_id):
+    """One chat prompt carrying every request's instructions, keyed by request id"""
+    tasks = {}
+    for request_id, request in requests_by_id.items():
+        tasks[request_id] = '\n'.join(message['content'] for message in request.messages
+                                      if message['role'] in ('system', 'user'))
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(tasks, ensure_ascii=False)}
+    ]
+
+def parse_batch_response(content):
+    """Map of request id -> answer text from a batched reply; {} if it is not a JSON object"""
+    if not content:
+        return {}
+    start, end = content.find('{'), content.rfind('}')
+    if start == -1 or end <= start:
+        return {}
+    try:
+        answers = json.loads(content[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(answers, dict):
+        return {}
+
+    parsed = {}
+    for request_id, answer in answers.items():
+        if isinstance(answer, list):
+            answer = '\n'.join(str(part) for part in answer)
+        if isinstance(answer, str) and answer.strip():
+            parsed[str(request_id)] = answer
+    return parsed
+
+def split_by_group(batch):
+    """Requests grouped by their group in arrival order; ungrouped requests each on their own"""
+    groups = {}
+    for index, request in enumerate(batch):
+        key = ('group', request.group) if request.group is not None else ('alone', index)
+        groups.setdefault(key, []).append(request)
+    return list(groups.values())
+
+class PromptBatcher:
+    """Packs chat completions from one group that arrive within `window` seconds into one prompt.
+
+    submit() blocks until its own answer is available. A dispatcher thread
+    gathers up to `max_batch` requests per window, splits them by group and
+    hands each group's batch to a small pool, so slow upstream calls do not
+    hold back the next window. Prompts embed user-supplied text, so only
+    requests submitted with the same group (the user they are for) share a
+    prompt; requests without a group are always sent on their own. A batch
+    of one is sent unchanged; in larger batches, answers missing from the
+    JSON reply are retried as individual calls.
+
+    `complete(messages, max_tokens)` performs a single upstream call and
+    returns the reply text.
+    """
+    def __init__(self, complete, window=0.05, max_batch=8, max_concurrent=4, max_tokens_cap=4000):
+        self._complete = complete
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.max_tokens_cap = max_tokens_cap
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent),
+                                            thread_name_prefix='prompt-batch')
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'batches': 0, 'batched_requests': 0,
+                       'upstream_calls': 0, 'fallbacks': 0}
+
+    def submit(self, messages, max_tokens=200, timeout=None, group=None):
+        """Reply text for one chat completion, possibly answered in a batch with the same group"""
+        request = _Request(messages, max_tokens, group)
+        with self._lock:
+            self._stats['requests'] += 1
+        if group is None:
+            # Nothing can share its prompt, so waiting out the window would only add latency
+            self._send_single(request)
+            return self._result(request)
+        self._ensure_worker()
+        self._queue.put(request)
+
+        if not request.event.wait(timeout):
+            raise TimeoutError('Timed out waiting for a batched generation')
+        return self._result(request)
+
+    @staticmethod
+    def _result(request):
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        stats['avg_batch_size'] = (round(stats['batched_requests'] / stats['batches'], 2)
+                                   if stats['batches'] else 0.0)
+        return stats
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='prompt-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            for group_batch in split_by_group(batch):
+                try:
+                    self._executor.submit(self._dispatch, group_batch)
+                except RuntimeError:
+                    # The pool refuses new work during interpreter shutdown; callers
+                    # are still waiting, so answer them from this thread
+                    self._dispatch(group_batch)
+
+    def _dispatch(self, batch):
+        if len(batch) == 1:
+            self._send_single(batch[0])
+            return
+
+        requests_by_id = {f'r{index}': request for index, request in enumerate(batch, 1)}
+        max_tokens = min(self.max_tokens_cap, sum(request.max_tokens for request in batch) + 20 * len(batch))
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['batched_requests'] += len(batch)
+            self._stats['upstream_calls'] += 1
+
+        try:
+            answers = parse_batch_response(self._complete(build_batch_messages(requests_by_id), max_tokens))
+        except Exception as e:
+            for request in batch:
+                request.fail(e)
+            return
+
+        for request_id, request in requests_by_id.items():
+            if request_id in answers:
+                request.resolve(answers[request_id])
+            else:
+                with self._lock:
+                    self._stats['fallbacks'] += 1
+                self._send_single(request)
+
+    def _send_single(self, request):
+        with self._lock:
+            self._stats['upstream_calls'] += 1
+        try:
+            request.resolve(self._complete(request.messages, request.max_tokens))
+        except Exception as e:
+            request.fail(e)
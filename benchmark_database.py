@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+DatabaseManager Benchmark Suite for LinguaLearn
+Seeds a database with realistic row counts (into the millions), times the
+DatabaseManager methods behind every page and practice request, and writes
+machine-readable results so runs can be compared between commits.
+
+    python benchmark_database.py --output bench-before.json
+    python benchmark_database.py --compare bench-before.json --output bench-after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from werkzeug.security import generate_password_hash
+from database import DatabaseManager
+
+# Rows are spread over this many languages per user
+LANGUAGES_PER_USER = 2
+MASTERY_LEVELS = 7
+DIFFICULTIES = ('beginner', 'intermediate', 'advanced')
+SEED_CHUNK = 50000
+
+def _insert_chunked(conn, sql, rows, label, total):
+    """executemany in SEED_CHUNK slices, committing and reporting progress as it goes"""
+    done = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= SEED_CHUNK:
+            conn.executemany(sql, chunk)
+            conn.commit()
+            done += len(chunk)
+            chunk = []
+            print(f"   {label}: {done:,}/{total:,}", end='\r', flush=True)
+    if chunk:
+        conn.executemany(sql, chunk)
+        conn.commit()
+        done += len(chunk)
+    if total:
+        print(f"   {label}: {done:,}/{total:,}")
+
+def seed_database(db, users, vocabulary, sentences, sessions, records, seed=42):
+    """Fill an empty database; rows are assigned to users round-robin.
+
+    Returns the layout the benchmarks need to pick valid ids for a user.
+    """
+    rng = random.Random(seed)
+    conn = db.get_connection()
+    password_hash = generate_password_hash('bench')
+
+    first_user = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0]
+    _insert_chunked(conn, 'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+                    ((f'bench_{i}', f'bench_{i}@example.com', password_hash) for i in range(users)),
+                    'users', users)
+    user_ids = list(range(first_user, first_user + users))
+
+    def language_for(index):
+        # Languages 1..LANGUAGES_PER_USER, alternating per row of a user
+        return 1 + (index // users) % LANGUAGES_PER_USER
+
+    _insert_chunked(conn, 'INSERT OR IGNORE INTO user_languages (user_id, language_id) VALUES (?, ?)',
+                    ((user_id, language_id) for user_id in user_ids
+                     for language_id in range(1, LANGUAGES_PER_USER + 1)),
+                    'user_languages', users * LANGUAGES_PER_USER)
+
+    first_vocab = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM vocabulary").fetchone()[0]
+    # Due dates spread over a month either side of now
+    now = time.time()
+    _insert_chunked(conn, '''INSERT INTO vocabulary (user_id, language_id, word, translation,
+                                                     difficulty_level, mastery_level, review_count, next_due)
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                    ((user_ids[i % users], language_for(i), f'word{i}', f'translation{i}',
+                      DIFFICULTIES[i % len(DIFFICULTIES)], rng.randrange(MASTERY_LEVELS), rng.randrange(20),
+                      now + rng.uniform(-30, 30) * 86400)
+                     for i in range(vocabulary)),
+                    'vocabulary', vocabulary)
+
+    first_sentence = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM sentences").fetchone()[0]
+    _insert_chunked(conn, '''INSERT INTO sentences (user_id, language_id, sentence, translation,
+                                                    difficulty_level, use_count)
+                             VALUES (?, ?, ?, ?, ?, ?)''',
+                    ((user_ids[i % users], language_for(i), f'Sentence number {i}.', f'Translation {i}.',
+                      DIFFICULTIES[i % len(DIFFICULTIES)], rng.randrange(10))
+                     for i in range(sentences)),
+                    'sentences', sentences)
+
+    first_session = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM learning_sessions").fetchone()[0]
+
+    def session_rows():
+        for i in range(sessions):
+            total = rng.randrange(5, 40)
+            yield (user_ids[i % users], language_for(i), 'vocabulary' if i % 2 else 'sentences',
+                   total, rng.randrange(total + 1), total)
+
+    _insert_chunked(conn, '''INSERT INTO learning_sessions (user_id, language_id, session_type, ended_at,
+                                                            words_practiced, correct_answers, total_questions)
+                             VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?)''',
+                    session_rows(), 'learning_sessions', sessions)
+
+    def record_rows():
+        vocab_per_user = max(1, vocabulary // users)
+        sessions_per_user = max(1, sessions // users)
+        for _ in range(records):
+            user_index = rng.randrange(users)
+            vocab_index = user_index + users * rng.randrange(vocab_per_user)
+            session_index = user_index + users * rng.randrange(sessions_per_user)
+            correct = rng.random() < 0.7
+            yield (user_ids[user_index], first_vocab + vocab_index if vocab_index < vocabulary else None,
+                   first_session + session_index if session_index < sessions else None,
+                   'answer', 'answer' if correct else 'other', correct, rng.randrange(500, 8000))
+
+    if sessions and records:
+        _insert_chunked(conn, '''INSERT INTO practice_records (user_id, vocabulary_id, session_id, user_answer,
+                                                               correct_answer, is_correct, response_time_ms)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                        record_rows(), 'practice_records', records)
+
+    print("   analyzing...")
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+    return {'user_ids': user_ids, 'first_vocab': first_vocab, 'vocabulary': vocabulary,
+            'first_sentence': first_sentence, 'sentences': sentences,
+            'first_session': first_session, 'sessions': sessions}
+
+def load_layout(db):
+    """Layout of a database seeded by an earlier run (--db reuse)"""
+    conn = db.get_connection()
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'bench\\_%' ESCAPE '\\' ORDER BY id")]
+    vocab = conn.execute('SELECT MIN(id), COUNT(*) FROM vocabulary').fetchone()
+    sentence = conn.execute('SELECT MIN(id), COUNT(*) FROM sentences').fetchone()
+    session = conn.execute('SELECT MIN(id), COUNT(*) FROM learning_sessions').fetchone()
+    conn.close()
+    return {'user_ids': user_ids, 'first_vocab': vocab[0] or 1, 'vocabulary': vocab[1],
+            'first_sentence': sentence[0] or 1, 'sentences': sentence[1],
+            'first_session': session[0] or 1, 'sessions': session[1]}
+
+def row_counts(db):
+    conn = db.get_connection()
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'user_languages', 'vocabulary', 'sentences',
+                            'learning_sessions', 'practice_records')}
+    conn.close()
+    return counts
+
+def build_benchmarks(db, layout, rng):
+    """name -> zero-argument callable; each call picks a random seeded user"""
+    user_ids = layout['user_ids']
+    users = len(user_ids)
+
+    def user():
+        return rng.choice(user_ids)
+
+    def vocab_id_for(index):
+        # Round-robin seeding: row i belongs to user_ids[i % users]
+        row = index + users * rng.randrange(max(1, layout['vocabulary'] // users))
+        return layout['first_vocab'] + min(row, layout['vocabulary'] - 1)
+
+    def session_for(index):
+        row = index + users * rng.randrange(max(1, layout['sessions'] // users))
+        return layout['first_session'] + min(row, layout['sessions'] - 1)
+
+    def record_practice():
+        index = rng.randrange(users)
+        db.record_practice(user_ids[index], session_for(index), vocab_id_for(index), None,
+                           'answer', 'answer', rng.random() < 0.7, 1500)
+
+    def record_practice_batch():
+        index = rng.randrange(users)
+        session_id = session_for(index)
+        db.record_practice_batch([{'user_id': user_ids[index], 'session_id': session_id,
+                                   'vocabulary_id': vocab_id_for(index), 'user_answer': 'a',
+                                   'correct_answer': 'a', 'is_correct': rng.random() < 0.7,
+                                   'response_time_ms': 1500} for _ in range(20)])
+
+    def session_round_trip():
+        session_id = db.start_learning_session(user(), 1, 'vocabulary')
+        db.end_learning_session(session_id, 10, 0, 7, 10)
+
+    counter = iter(range(10 ** 9))
+
+    def add_vocabulary():
+        db.add_vocabulary(user(), 1, f'bench-new-{next(counter)}', 'new')
+
+    def add_vocabulary_bulk():
+        batch = next(counter)
+        db.add_vocabulary_bulk(user(), 1, [{'word': f'bench-bulk-{batch}-{i}', 'translation': 'x'}
+                                           for i in range(100)])
+
+    def get_user_vocabulary_page():
+        # A page continuing deep inside the user's list
+        index = rng.randrange(users)
+        db.get_user_vocabulary(user_ids[index], 1, None, 50, after=(0, 0, vocab_id_for(index)))
+
+    return {
+        'get_user_by_id': lambda: db.get_user_by_id(user()),
+        'get_user_languages': lambda: db.get_user_languages(user()),
+        'get_user_vocabulary': lambda: db.get_user_vocabulary(user(), 1, 'beginner', 50),
+        'get_user_vocabulary_all': lambda: db.get_user_vocabulary(user()),
+        'get_user_vocabulary_page': get_user_vocabulary_page,
+        'get_user_sentences': lambda: db.get_user_sentences(user(), 1, 'beginner', 50),
+        'get_random_vocabulary': lambda: db.get_random_vocabulary(user(), 1, 'beginner', 10),
+        'get_due_vocabulary': lambda: db.get_due_vocabulary(user(), 1, limit=10),
+        'get_random_sentence': lambda: db.get_random_sentence(user(), 1, 'beginner'),
+        'get_user_stats': lambda: db.get_user_stats(user()),
+        'get_user_stats_language': lambda: db.get_user_stats(user(), 1),
+        'record_practice': record_practice,
+        'record_practice_batch_20': record_practice_batch,
+        'start_end_learning_session': session_round_trip,
+        'add_vocabulary': add_vocabulary,
+        'add_vocabulary_bulk_100': add_vocabulary_bulk,
+    }
+
+def time_benchmark(func, repeat, warmup):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 4),
+        'min_ms': round(samples[0], 4),
+        'max_ms': round(samples[-1], 4),
+        'ops_per_sec': round(1000 / statistics.fmean(samples), 1),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, threshold):
+    """Print median changes against a previous results file; returns names that regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    print(f"\n📈 Compared with {baseline_path} (median):")
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"   {name:<28} {current['median_ms']:>10.3f} ms   (new)")
+            continue
+        change = (current['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0.0
+        marker = '❌' if change > threshold else '  '
+        print(f"{marker} {name:<28} {before['median_ms']:>10.3f} -> {current['median_ms']:>10.3f} ms  ({change:+.1f}%)")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DatabaseManager methods at scale')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--vocabulary', type=int, default=1000000, help='Total vocabulary rows')
+    parser.add_argument('--sentences', type=int, default=200000, help='Total sentence rows')
+    parser.add_argument('--sessions', type=int, default=100000, help='Total learning sessions')
+    parser.add_argument('--records', type=int, default=2000000, help='Total practice records')
+    parser.add_argument('--repeat', type=int, default=200, help='Timed calls per method')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed calls per method')
+    parser.add_argument('--only', help='Comma-separated benchmark names to run')
+    parser.add_argument('--db', help='Database file to seed or reuse (default: temporary)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_results.json', help='Results JSON file')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=25.0,
+                        help='Median slowdown in percent reported as a regression (default 25)')
+    args = parser.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, 'bench.db')
+
+    reuse = os.path.exists(db_path)
+    db = DatabaseManager(db_path)
+    seed_seconds = None
+    if reuse:
+        print(f"♻️  Reusing seeded database {db_path}")
+        layout = load_layout(db)
+    else:
+        print(f"🌱 Seeding {db_path}...")
+        started = time.perf_counter()
+        layout = seed_database(db, args.users, args.vocabulary, args.sentences, args.sessions,
+                               args.records, args.seed)
+        seed_seconds = round(time.perf_counter() - started, 2)
+        print(f"✅ Seeded in {seed_seconds}s")
+
+    if not layout['user_ids']:
+        parser.error(f'{db_path} has no benchmark users; remove it to reseed')
+
+    counts = row_counts(db)
+    benchmarks = build_benchmarks(db, layout, random.Random(args.seed))
+    if args.only:
+        names = args.only.split(',')
+        unknown = set(names) - set(benchmarks)
+        if unknown:
+            parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        benchmarks = {name: benchmarks[name] for name in names}
+
+    print(f"\n⏱️  {len(benchmarks)} benchmarks, {args.repeat} calls each")
+    print(f"{'benchmark':<30} {'median':>10} {'p95':>10} {'mean':>10} {'ops/s':>10}")
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = time_benchmark(func, args.repeat, args.warmup)
+        r = results[name]
+        print(f"{name:<30} {r['median_ms']:>7.3f} ms {r['p95_ms']:>7.3f} ms {r['mean_ms']:>7.3f} ms {r['ops_per_sec']:>10}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'args': vars(args),
+            'row_counts': counts,
+            'seed_seconds': seed_seconds,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    db.close()
+    if tmp:
+        tmp.cleanup()
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmarks slowed down by more than {args.threshold}%")
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Random Practice Sampling Benchmark for LinguaLearn
+Compares sampling by trigger-maintained sample sequences (one index seek
+per pick) against the old ORDER BY RANDOM() queries as the number of
+vocabulary/sentence rows per user grows.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from database import DatabaseManager
+
+LEGACY_VOCABULARY_QUERY = '''SELECT id, word, translation, difficulty_level, category, mastery_level
+                             FROM vocabulary
+                             WHERE user_id = ? AND language_id = ? AND is_active = 1
+                             ORDER BY mastery_level ASC, RANDOM() LIMIT ?'''
+
+LEGACY_SENTENCE_QUERY = '''SELECT id, sentence, translation, difficulty_level, category
+                           FROM sentences
+                           WHERE user_id = ? AND language_id = ? AND is_active = 1
+                           ORDER BY RANDOM() LIMIT 1'''
+
+def seed(db, user_id, rows):
+    """Insert `rows` vocabulary words and sentences for one user"""
+    conn = db.get_connection()
+    conn.executemany('''INSERT INTO vocabulary (user_id, language_id, word, translation, mastery_level)
+                        VALUES (?, 1, ?, ?, ?)''',
+                     ((user_id, f'word{i}', f'translation{i}', random.randint(0, 6)) for i in range(rows)))
+    conn.executemany('''INSERT INTO sentences (user_id, language_id, sentence, translation)
+                        VALUES (?, 1, ?, ?)''',
+                     ((user_id, f'sentence {i}', f'translation {i}') for i in range(rows)))
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+def time_ms(func, repeat):
+    """Average wall time of func() in milliseconds"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+def run_legacy(db, query, params):
+    conn = db.get_connection()
+    conn.execute(query, params).fetchall()
+    conn.close()
+
+def benchmark(sizes, repeat, limit):
+    print(f"{'rows':>10} | {'vocab (new)':>12} | {'vocab (old)':>12} | {'sentence (new)':>14} | {'sentence (old)':>14}")
+    print('-' * 74)
+
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+            user_id = db.create_user('bench', 'bench@example.com', 'bench')
+            seed(db, user_id, rows)
+
+            results = [
+                time_ms(lambda: db.get_random_vocabulary(user_id, 1, limit=limit), repeat),
+                time_ms(lambda: run_legacy(db, LEGACY_VOCABULARY_QUERY, (user_id, 1, limit)), repeat),
+                time_ms(lambda: db.get_random_sentence(user_id, 1), repeat),
+                time_ms(lambda: run_legacy(db, LEGACY_SENTENCE_QUERY, (user_id, 1)), repeat),
+            ]
+            db.close()
+
+        print(f"{rows:>10} | {results[0]:>9.3f} ms | {results[1]:>9.3f} ms | "
+              f"{results[2]:>11.3f} ms | {results[3]:>11.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark random practice sampling')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='Comma-separated row counts per user')
+    parser.add_argument('--repeat', type=int, default=50, help='Calls per measurement')
+    parser.add_argument('--limit', type=int, default=10, help='Vocabulary words per practice call')
+    args = parser.parse_args()
+
+    random.seed(42)
+    print("🎲 Benchmarking random practice sampling...")
+    benchmark([int(size) for size in args.sizes.split(',')], args.repeat, args.limit)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Translation Scoring Benchmark for LinguaLearn
+Compares the scoring module against the old calculate_similarity from app.py
+on typed answers of different lengths and scripts.
+"""
+
+import argparse
+import random
+import time
+import scoring
+
+def legacy_calculate_similarity(user_answer, correct_answer):
+    """calculate_similarity as it was in app.py before the scoring module"""
+    if not correct_answer:
+        return 0.0
+
+    # Convert to lowercase and remove punctuation for comparison
+    import re
+    clean_user = re.sub(r'[^\w\s]', '', user_answer.lower())
+    clean_correct = re.sub(r'[^\w\s]', '', correct_answer.lower())
+
+    # Check if user answer contains key words from correct answer
+    correct_words = [word for word in clean_correct.split() if len(word) > 2]
+    user_words = [word for word in clean_user.split() if len(word) > 2]
+
+    if not correct_words:
+        return 0.0
+
+    matching_words = [word for word in correct_words if word in user_words]
+    similarity = len(matching_words) / len(correct_words)
+
+    return similarity
+
+ENGLISH_WORDS = ('the', 'house', 'water', 'morning', 'friend', 'yesterday', 'beautiful', 'library',
+                 'students', 'travel', 'kitchen', 'weather', 'delicious', 'restaurant', 'because',
+                 'tomorrow', 'always', 'family', 'station', 'breakfast', 'is', 'we', 'to', 'and')
+CHINESE_CHARS = '我你他是的学生老师今天明天吃饭喝水去学校图书馆朋友家'
+
+def typo(rng, word):
+    """Swap, drop or double one letter"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.random()
+    if kind < 0.4:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind < 0.7:
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i] + word[i:]
+
+def english_pairs(rng, count, words, prompts=None):
+    """(answer, correct) pairs; with `prompts`, many learners answer the same few sentences"""
+    sentences = [[rng.choice(ENGLISH_WORDS) for _ in range(words)] for _ in range(prompts or 0)]
+    pairs = []
+    for _ in range(count):
+        correct = rng.choice(sentences) if sentences else [rng.choice(ENGLISH_WORDS) for _ in range(words)]
+        answer = [typo(rng, word) if rng.random() < 0.2 else word for word in correct if rng.random() < 0.85]
+        pairs.append((' '.join(answer).capitalize() + '.', ' '.join(correct).capitalize() + '.'))
+    return pairs
+
+def chinese_pairs(rng, count, chars):
+    pairs = []
+    for _ in range(count):
+        correct = ''.join(rng.choice(CHINESE_CHARS) for _ in range(chars))
+        answer = ''.join(char for char in correct if rng.random() < 0.85)
+        pairs.append((answer + '。', correct + '。'))
+    return pairs
+
+def time_us(func, pairs, repeat):
+    """Microseconds per scored answer, best of `repeat` runs each starting with empty caches"""
+    best = float('inf')
+    for _ in range(repeat):
+        scoring._token_set.cache_clear()
+        scoring._key_words.cache_clear()
+        scoring._similarity.cache_clear()
+        started = time.perf_counter()
+        func(pairs)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6 / len(pairs)
+
+def run_legacy(pairs):
+    return [legacy_calculate_similarity(user_answer, correct_answer) for user_answer, correct_answer in pairs]
+
+def run_single(pairs):
+    return [scoring.score_translation(user_answer, correct_answer) for user_answer, correct_answer in pairs]
+
+def run_exact(pairs):
+    return [scoring.score_translation(user_answer, correct_answer, fuzzy_threshold=1)
+            for user_answer, correct_answer in pairs]
+
+def run_batch(pairs):
+    return scoring.score_translations(pairs)
+
+def mean_score(func, pairs):
+    return sum(func(pairs)) / len(pairs)
+
+def benchmark(count, repeat, seed):
+    rng = random.Random(seed)
+    workloads = [
+        ('english, 6 words', english_pairs(rng, count, 6)),
+        ('english, 50 prompts', english_pairs(rng, count, 8, prompts=50)),
+        ('english, 30 words', english_pairs(rng, count, 30)),
+        ('english, 150 words', english_pairs(rng, count, 150)),
+        ('chinese, 10 chars', chinese_pairs(rng, count, 10)),
+    ]
+
+    print(f"{'workload':<20} | {'legacy':>10} | {'exact':>10} | {'fuzzy':>10} | {'batch':>10} | "
+          f"{'legacy score':>12} | {'fuzzy score':>11}")
+    print('-' * 102)
+    for name, pairs in workloads:
+        results = [time_us(func, pairs, repeat) for func in (run_legacy, run_exact, run_single, run_batch)]
+        print(f"{name:<20} | " + ' | '.join(f'{result:>7.1f} us' for result in results) +
+              f" | {mean_score(run_legacy, pairs):>12.3f} | {mean_score(run_single, pairs):>11.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark translation scoring')
+    parser.add_argument('--answers', type=int, default=2000, help='Answers per workload')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("📝 Benchmarking translation scoring (per answer, cold cache)...")
+    benchmark(args.answers, args.repeat, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -62,45 +62,42 @@ def create_demo_users():
     print("\n🚀 Start the app with: python app.py")
     print("🌐 Visit: http://localhost:5000")
 
+# Sample vocabulary by language id (1 = Spanish, 2 = French), also used as
+# seed words by generate_dataset.py
+SAMPLE_VOCABULARY = {
+    1: [
+        ('hola', 'hello'),
+        ('gracias', 'thank you'),
+        ('por favor', 'please'),
+        ('adiós', 'goodbye'),
+        ('sí', 'yes'),
+        ('no', 'no'),
+        ('agua', 'water'),
+        ('pan', 'bread'),
+        ('casa', 'house'),
+        ('perro', 'dog'),
+    ],
+    2: [
+        ('bonjour', 'hello'),
+        ('merci', 'thank you'),
+        ('s\'il vous plaît', 'please'),
+        ('au revoir', 'goodbye'),
+        ('oui', 'yes'),
+        ('non', 'no'),
+        ('eau', 'water'),
+        ('pain', 'bread'),
+        ('maison', 'house'),
+        ('chien', 'dog'),
+    ],
+}
+
 def add_sample_data(user_id):
     """Add sample languages and vocabulary for demo users"""
     try:
-        # Add Spanish and French to the user's languages
-        spanish_id = 1  # Spanish is typically ID 1
-        french_id = 2   # French is typically ID 2
-        
-        db.add_user_language(user_id, spanish_id)
-        db.add_user_language(user_id, french_id)
-        
-        # Add some sample vocabulary
-        sample_vocab = [
-            # Spanish vocabulary
-            (spanish_id, 'hola', 'hello'),
-            (spanish_id, 'gracias', 'thank you'),
-            (spanish_id, 'por favor', 'please'),
-            (spanish_id, 'adiós', 'goodbye'),
-            (spanish_id, 'sí', 'yes'),
-            (spanish_id, 'no', 'no'),
-            (spanish_id, 'agua', 'water'),
-            (spanish_id, 'pan', 'bread'),
-            (spanish_id, 'casa', 'house'),
-            (spanish_id, 'perro', 'dog'),
-            
-            # French vocabulary
-            (french_id, 'bonjour', 'hello'),
-            (french_id, 'merci', 'thank you'),
-            (french_id, 's\'il vous plaît', 'please'),
-            (french_id, 'au revoir', 'goodbye'),
-            (french_id, 'oui', 'yes'),
-            (french_id, 'non', 'no'),
-            (french_id, 'eau', 'water'),
-            (french_id, 'pain', 'bread'),
-            (french_id, 'maison', 'house'),
-            (french_id, 'chien', 'dog'),
-        ]
-        
-        for lang_id, word, translation in sample_vocab:
-            db.add_vocabulary(user_id, lang_id, word, translation)
+        for language_id, words in SAMPLE_VOCABULARY.items():
+            db.add_user_language(user_id, language_id)
+            db.add_vocabulary_bulk(user_id, language_id,
+                                   [{'word': word, 'translation': translation} for word, translation in words])
         
         print(f"  📚 Added sample vocabulary for user {user_id}")
         
@@ -2,16 +2,869 @@ import sqlite3
 import random
 from datetime import datetime
 import hashlib
+import json
 import os
+import atexit
+import queue
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from types import MappingProxyType
 from werkzeug.security import generate_password_hash, check_password_hash
+from cache import TTLCache
+from metrics import REGISTRY, instrument_methods
+from sql_profiler import SQLProfiler
+from scheduler import DEFAULT_EASE, ReviewState, answer_quality, interval_after, review
+
+# Sentinel for cache lookups, where None is a valid cached value
+_MISSING = object()
+
+# PRAGMAs applied once to every pooled connection when it is opened
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -8000,
+}
+
+def _backfill_legacy_rows(cursor):
+    """Assign orphaned vocabulary/sentences from the pre-multi-user schema"""
+    cursor.execute('''SELECT
+                         (SELECT COUNT(*) FROM vocabulary WHERE user_id IS NULL OR language_id IS NULL) +
+                         (SELECT COUNT(*) FROM sentences WHERE user_id IS NULL OR language_id IS NULL)''')
+    if cursor.fetchone()[0] == 0:
+        return
+    
+    # Get default language ID (Spanish)
+    cursor.execute('SELECT id FROM languages WHERE name = ?', ('Spanish',))
+    default_lang = cursor.fetchone()
+    default_lang_id = default_lang[0] if default_lang else 1
+    
+    cursor.execute('''UPDATE vocabulary 
+                     SET user_id = 1, language_id = ?
+                     WHERE user_id IS NULL OR language_id IS NULL''', (default_lang_id,))
+    cursor.execute('''UPDATE sentences 
+                     SET user_id = 1, language_id = ?
+                     WHERE user_id IS NULL OR language_id IS NULL''', (default_lang_id,))
+    
+    # Backfilled rows belong to user 1, so make sure a default user exists
+    cursor.execute('SELECT id FROM users WHERE username = ?', ('default_user',))
+    if not cursor.fetchone():
+        cursor.execute('''INSERT INTO users (username, email, password_hash, is_active)
+                         VALUES (?, ?, ?, ?)''', 
+                      ('default_user', 'default@example.com', 
+                       generate_password_hash('password'), 1))
+
+# language_id used for the all-languages row of each user in user_stats
+ALL_LANGUAGES = 0
+
+# Expressions for one row's contribution to user_stats. Vocabulary counts only
+# while active and sessions only once ended; accuracy mirrors
+# AVG(correct_answers * 100.0 / total_questions), which skips NULLs.
+_VOCAB_CONTRIBUTION = {
+    'vocab_total': '({row}.is_active = 1)',
+    'vocab_mastered': '({row}.is_active = 1 AND {row}.mastery_level >= 5)',
+    'mastery_sum': 'CASE WHEN {row}.is_active = 1 THEN {row}.mastery_level ELSE 0 END',
+}
+_SESSION_CONTRIBUTION = {
+    'session_count': '({row}.ended_at IS NOT NULL)',
+    'correct_total': 'CASE WHEN {row}.ended_at IS NOT NULL THEN COALESCE({row}.correct_answers, 0) ELSE 0 END',
+    'question_total': 'CASE WHEN {row}.ended_at IS NOT NULL THEN COALESCE({row}.total_questions, 0) ELSE 0 END',
+    'accuracy_sum': '''CASE WHEN {row}.ended_at IS NOT NULL
+                       THEN COALESCE({row}.correct_answers * 100.0 / {row}.total_questions, 0) ELSE 0 END''',
+    'accuracy_count': '''({row}.ended_at IS NOT NULL AND
+                         {row}.correct_answers * 100.0 / {row}.total_questions IS NOT NULL)''',
+}
+USER_STATS_COLUMNS = list(_VOCAB_CONTRIBUTION) + list(_SESSION_CONTRIBUTION)
+
+def _stats_trigger(name, event, table, contribution, old=False, new=False, when=None):
+    """Build a trigger that applies NEW minus OLD contributions to both stats rows"""
+    row = 'NEW' if new else 'OLD'
+    assignments = []
+    for column, expression in contribution.items():
+        change = ''
+        if new:
+            change += f" + COALESCE({expression.format(row='NEW')}, 0)"
+        if old:
+            change += f" - COALESCE({expression.format(row='OLD')}, 0)"
+        assignments.append(f'{column} = {column}{change}')
+
+    return f'''CREATE TRIGGER IF NOT EXISTS {name}
+               AFTER {event} ON {table}
+               {f'WHEN {when}' if when else ''}
+               BEGIN
+                   INSERT OR IGNORE INTO user_stats (user_id, language_id)
+                   VALUES ({row}.user_id, {row}.language_id), ({row}.user_id, {ALL_LANGUAGES});
+                   UPDATE user_stats
+                   SET {', '.join(assignments)}, updated_at = CURRENT_TIMESTAMP
+                   WHERE user_id = {row}.user_id AND language_id IN ({row}.language_id, {ALL_LANGUAGES});
+               END'''
+
+def compute_user_stats(cursor, user_id=None):
+    """Recompute user_stats rows from the base tables, keyed by (user_id, language_id)"""
+    user_filter = ' AND user_id = ?' if user_id is not None else ''
+    params = [user_id] if user_id is not None else []
+    stats = {}
+
+    def add(key, values):
+        row = stats.setdefault(key, dict.fromkeys(USER_STATS_COLUMNS, 0))
+        for column, value in values.items():
+            row[column] += value or 0
+
+    cursor.execute(f'''SELECT user_id, language_id, COUNT(*),
+                              SUM(mastery_level >= 5), SUM(mastery_level)
+                       FROM vocabulary WHERE is_active = 1{user_filter}
+                       GROUP BY user_id, language_id''', params)
+    for uid, language_id, total, mastered, mastery_sum in cursor.fetchall():
+        values = {'vocab_total': total, 'vocab_mastered': mastered, 'mastery_sum': mastery_sum}
+        add((uid, language_id), values)
+        add((uid, ALL_LANGUAGES), values)
+
+    cursor.execute(f'''SELECT user_id, language_id, COUNT(*),
+                              SUM(correct_answers), SUM(total_questions),
+                              SUM(correct_answers * 100.0 / total_questions),
+                              COUNT(correct_answers * 100.0 / total_questions)
+                       FROM learning_sessions WHERE ended_at IS NOT NULL{user_filter}
+                       GROUP BY user_id, language_id''', params)
+    for uid, language_id, count, correct, questions, accuracy_sum, accuracy_count in cursor.fetchall():
+        values = {'session_count': count, 'correct_total': correct, 'question_total': questions,
+                  'accuracy_sum': accuracy_sum, 'accuracy_count': accuracy_count}
+        add((uid, language_id), values)
+        add((uid, ALL_LANGUAGES), values)
+
+    return stats
+
+def _rebuild_user_stats(cursor, user_id=None):
+    """Replace user_stats rows with freshly computed values"""
+    stats = compute_user_stats(cursor, user_id)
+    if user_id is None:
+        cursor.execute('DELETE FROM user_stats')
+    else:
+        cursor.execute('DELETE FROM user_stats WHERE user_id = ?', (user_id,))
+
+    cursor.executemany(f'''INSERT INTO user_stats (user_id, language_id, {', '.join(USER_STATS_COLUMNS)})
+                           VALUES (?, ?, {', '.join('?' * len(USER_STATS_COLUMNS))})''',
+                       [key + tuple(values[column] for column in USER_STATS_COLUMNS)
+                        for key, values in stats.items()])
+    return len(stats)
+
+def _create_user_stats(cursor):
+    """Create the materialized user_stats table, its triggers and backfill it"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER NOT NULL,
+        language_id INTEGER NOT NULL,
+        vocab_total INTEGER NOT NULL DEFAULT 0,
+        vocab_mastered INTEGER NOT NULL DEFAULT 0,
+        mastery_sum INTEGER NOT NULL DEFAULT 0,
+        session_count INTEGER NOT NULL DEFAULT 0,
+        correct_total INTEGER NOT NULL DEFAULT 0,
+        question_total INTEGER NOT NULL DEFAULT 0,
+        accuracy_sum REAL NOT NULL DEFAULT 0,
+        accuracy_count INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, language_id)
+    ) WITHOUT ROWID''')
+
+    _create_user_stats_triggers(cursor)
+    _rebuild_user_stats(cursor)
+
+_STATS_TRIGGER_TABLES = ('vocabulary', 'learning_sessions')
+_STATS_TRIGGER_EVENTS = ('insert', 'delete', 'update', 'move_out', 'move_in')
+
+def _create_user_stats_triggers(cursor):
+    """Triggers keeping user_stats in step with vocabulary and learning_sessions"""
+    moved = 'OLD.user_id != NEW.user_id OR OLD.language_id != NEW.language_id'
+    for table, contribution, columns in (
+        ('vocabulary', _VOCAB_CONTRIBUTION, 'is_active, mastery_level, user_id, language_id'),
+        ('learning_sessions', _SESSION_CONTRIBUTION,
+         'ended_at, correct_answers, total_questions, user_id, language_id'),
+    ):
+        cursor.execute(_stats_trigger(f'{table}_stats_insert', 'INSERT', table, contribution, new=True))
+        cursor.execute(_stats_trigger(f'{table}_stats_delete', 'DELETE', table, contribution, old=True))
+        cursor.execute(_stats_trigger(f'{table}_stats_update', f'UPDATE OF {columns}', table, contribution,
+                                      old=True, new=True, when=f'NOT ({moved})'))
+        # Rows moved to another user or language leave one stats row and join another
+        cursor.execute(_stats_trigger(f'{table}_stats_move_out', f'UPDATE OF {columns}', table, contribution,
+                                      old=True, when=moved))
+        cursor.execute(_stats_trigger(f'{table}_stats_move_in', f'UPDATE OF {columns}', table, contribution,
+                                      new=True, when=moved))
+
+def _drop_user_stats_triggers(cursor):
+    for table in _STATS_TRIGGER_TABLES:
+        for event in _STATS_TRIGGER_EVENTS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_stats_{event}')
+
+def _add_sentence_pool(cursor):
+    """Flag pre-generated sentences that have not been served yet"""
+    cursor.execute('PRAGMA table_info(sentences)')
+    if 'in_pool' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE sentences ADD COLUMN in_pool INTEGER NOT NULL DEFAULT 0')
+    # take_pooled_sentence / count_pooled_sentences
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_sentences_pool
+                      ON sentences (user_id, language_id, difficulty_level, id)
+                      WHERE in_pool = 1 AND is_active = 1''')
+
+def _add_generation_keys(cursor):
+    """Remember which cached generation a stored sentence came from"""
+    cursor.execute('PRAGMA table_info(sentences)')
+    if 'generation_key' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE sentences ADD COLUMN generation_key TEXT')
+    # add_generated_sentences: a user's sentences from one cached generation
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_sentences_generation_key
+                      ON sentences (user_id, generation_key)
+                      WHERE generation_key IS NOT NULL''')
+
+def _add_catalog_versions(cursor):
+    """Version shared catalogs so every process notices changes to them"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS catalog_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+    cursor.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES ('languages', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS languages_catalog_{event.lower()}
+                           AFTER {event} ON languages
+                           BEGIN
+                               UPDATE catalog_versions SET version = version + 1 WHERE name = 'languages';
+                           END''')
+
+# Tables sampled for random practice: (level expression, membership predicate on
+# {row}). Sampled rows of one user, language, level and difficulty (NULL counts
+# as '') carry a dense sample_seq 0..size-1 and their group's size is kept in
+# sample_groups, so a uniform random row is one index seek at any table size.
+_SAMPLED_TABLES = {
+    'vocabulary': ('{row}.mastery_level', '{row}.is_active = 1 AND {row}.mastery_level IS NOT NULL',
+                   'is_active, mastery_level, difficulty_level, user_id, language_id'),
+    'sentences': ('0', '{row}.is_active = 1 AND {row}.in_pool = 0',
+                  'is_active, in_pool, difficulty_level, user_id, language_id'),
+}
+
+def _sample_group_key(table, row):
+    """SQL matching the sample_groups row of `row` (OLD/NEW) in `table`"""
+    level = _SAMPLED_TABLES[table][0].format(row=row)
+    return (f"table_name = '{table}' AND user_id = {row}.user_id AND language_id = {row}.language_id "
+            f"AND level = {level} AND difficulty = IFNULL({row}.difficulty_level, '')")
+
+def _sample_trigger(name, event, table, join=None, leave=None, when=None):
+    """Build a trigger appending `join` (NEW) to its group and removing `leave` (OLD) from its group.
+
+    Leaving moves the group's last row into the freed sample_seq, so the
+    sequence stays dense.
+    """
+    level, member, _ = _SAMPLED_TABLES[table]
+    body = []
+    if leave:
+        body.append(f'''UPDATE {table} SET sample_seq = {leave}.sample_seq
+                        WHERE user_id = {leave}.user_id AND language_id = {leave}.language_id
+                        AND {level.format(row=table)} = {level.format(row=leave)}
+                        AND IFNULL(difficulty_level, '') = IFNULL({leave}.difficulty_level, '')
+                        AND {member.format(row=table)}
+                        AND sample_seq = (SELECT size - 1 FROM sample_groups
+                                          WHERE {_sample_group_key(table, leave)});''')
+        body.append(f'UPDATE sample_groups SET size = size - 1 WHERE {_sample_group_key(table, leave)};')
+    if join:
+        body.append(f'''INSERT OR IGNORE INTO sample_groups (table_name, user_id, language_id, level, difficulty)
+                        VALUES ('{table}', {join}.user_id, {join}.language_id, {level.format(row=join)},
+                                IFNULL({join}.difficulty_level, ''));''')
+        body.append(f'UPDATE sample_groups SET size = size + 1 WHERE {_sample_group_key(table, join)};')
+        body.append(f'''UPDATE {table}
+                        SET sample_seq = (SELECT size - 1 FROM sample_groups WHERE {_sample_group_key(table, join)})
+                        WHERE id = {join}.id;''')
+
+    return f'''CREATE TRIGGER IF NOT EXISTS {name}
+               AFTER {event} ON {table}
+               {f'WHEN {when}' if when else ''}
+               BEGIN
+                   {' '.join(body)}
+               END'''
+
+def _create_sample_triggers(cursor):
+    """Triggers keeping sample_seq dense and sample_groups sizes current"""
+    for table, (level, member, columns) in _SAMPLED_TABLES.items():
+        same_group = (f"OLD.user_id IS NEW.user_id AND OLD.language_id IS NEW.language_id "
+                      f"AND {level.format(row='OLD')} IS {level.format(row='NEW')} "
+                      f"AND IFNULL(OLD.difficulty_level, '') = IFNULL(NEW.difficulty_level, '')")
+        old_member, new_member = member.format(row='OLD'), member.format(row='NEW')
+        cursor.execute(_sample_trigger(f'{table}_sample_insert', 'INSERT', table, join='NEW', when=new_member))
+        cursor.execute(_sample_trigger(f'{table}_sample_delete', 'DELETE', table, leave='OLD', when=old_member))
+        # An update may move a row out of one group and into another, or just one of the two
+        cursor.execute(_sample_trigger(f'{table}_sample_leave', f'UPDATE OF {columns}', table, leave='OLD',
+                                       when=f'({old_member}) AND NOT ({new_member} AND {same_group})'))
+        cursor.execute(_sample_trigger(f'{table}_sample_join', f'UPDATE OF {columns}', table, join='NEW',
+                                       when=f'({new_member}) AND NOT ({old_member} AND {same_group})'))
+
+def _drop_sample_triggers(cursor):
+    for table in _SAMPLED_TABLES:
+        for event in ('insert', 'delete', 'leave', 'join'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_sample_{event}')
+
+def _rebuild_sample_groups(cursor):
+    """Renumber every sampled row and recount sample_groups from the base tables"""
+    cursor.execute('DELETE FROM sample_groups')
+    for table, (level, member, _) in _SAMPLED_TABLES.items():
+        level, member = level.format(row=table), member.format(row=table)
+        cursor.execute('DROP TABLE IF EXISTS temp.sample_seqs')
+        cursor.execute(f'''CREATE TEMP TABLE sample_seqs AS
+                           SELECT id, ROW_NUMBER() OVER (
+                               PARTITION BY user_id, language_id, {level}, IFNULL(difficulty_level, '')
+                               ORDER BY id) - 1 AS seq
+                           FROM {table} WHERE {member}''')
+        cursor.execute('CREATE UNIQUE INDEX temp.idx_sample_seqs_id ON sample_seqs (id)')
+        cursor.execute(f'''UPDATE {table} SET sample_seq = (SELECT seq FROM sample_seqs
+                                                            WHERE sample_seqs.id = {table}.id)
+                           WHERE id IN (SELECT id FROM sample_seqs) OR sample_seq IS NOT NULL''')
+        cursor.execute('DROP TABLE temp.sample_seqs')
+        cursor.execute(f'''INSERT INTO sample_groups (table_name, user_id, language_id, level, difficulty, size)
+                           SELECT '{table}', user_id, language_id, {level}, IFNULL(difficulty_level, ''), COUNT(*)
+                           FROM {table} WHERE {member}
+                           GROUP BY 2, 3, 4, 5''')
+
+def _add_sample_sequences(cursor):
+    """Number sampled rows densely per group so random practice is one seek per pick"""
+    for table in _SAMPLED_TABLES:
+        cursor.execute(f'PRAGMA table_info({table})')
+        if 'sample_seq' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN sample_seq INTEGER')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS sample_groups (
+        table_name TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        language_id INTEGER NOT NULL,
+        level INTEGER NOT NULL,
+        difficulty TEXT NOT NULL,
+        size INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, user_id, language_id, level, difficulty)
+    ) WITHOUT ROWID''')
+
+    # sample_random_ids: the row at one position of a group; the sentence index
+    # also covers in_pool, which the rowid sampling index left to table lookups
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_vocabulary_sample_seq
+                      ON vocabulary (user_id, language_id, mastery_level, IFNULL(difficulty_level, ''), sample_seq)
+                      WHERE is_active = 1 AND mastery_level IS NOT NULL''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_sentences_sample_seq
+                      ON sentences (user_id, language_id, IFNULL(difficulty_level, ''), sample_seq)
+                      WHERE is_active = 1 AND in_pool = 0''')
+    cursor.execute('DROP INDEX IF EXISTS idx_vocabulary_sampling')
+    cursor.execute('DROP INDEX IF EXISTS idx_sentences_sampling')
+
+    _create_sample_triggers(cursor)
+    _rebuild_sample_groups(cursor)
+
+def _add_review_schedule(cursor):
+    """Add SM-2 scheduling state to vocabulary and seed it from mastery levels"""
+    cursor.execute('PRAGMA table_info(vocabulary)')
+    columns = [column[1] for column in cursor.fetchall()]
+    for name, definition in [('ease_factor', f'REAL NOT NULL DEFAULT {DEFAULT_EASE}'),
+                             ('interval_days', 'REAL NOT NULL DEFAULT 0'),
+                             ('repetitions', 'INTEGER NOT NULL DEFAULT 0'),
+                             # Unix time the word is next due; 0 for words never reviewed
+                             ('next_due', 'REAL NOT NULL DEFAULT 0')]:
+        if name not in columns:
+            cursor.execute(f'ALTER TABLE vocabulary ADD COLUMN {name} {definition}')
+
+    # Treat each mastery level as one correct review in a row, counted from the last review
+    cursor.execute('SELECT DISTINCT mastery_level FROM vocabulary WHERE mastery_level > 0')
+    for (level,) in cursor.fetchall():
+        cursor.execute('''UPDATE vocabulary SET repetitions = ?, interval_days = ?
+                          WHERE mastery_level = ?''', (level, interval_after(level), level))
+    cursor.execute('''UPDATE vocabulary
+                      SET next_due = (julianday(last_reviewed) - 2440587.5 + interval_days) * 86400
+                      WHERE last_reviewed IS NOT NULL''')
+
+    # get_due_vocabulary: next words by due time, with and without a difficulty filter
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_vocabulary_due
+                      ON vocabulary (user_id, language_id, next_due)
+                      WHERE is_active = 1''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_vocabulary_due_level
+                      ON vocabulary (user_id, language_id, difficulty_level, next_due)
+                      WHERE is_active = 1''')
+
+# Per-user data scopes whose version changes whenever a row the API returns
+# changes: (scope, table, columns that appear in or filter API responses)
+_VERSIONED_TABLES = (
+    ('vocabulary', 'vocabulary', 'word, translation, difficulty_level, category, part_of_speech, '
+                                 'example_sentence, mastery_level, review_count, is_active, user_id, language_id'),
+    ('sentences', 'sentences', 'sentence, translation, difficulty_level, category, use_count, '
+                               'is_active, in_pool, user_id, language_id'),
+    ('languages', 'user_languages', 'is_learning, user_id, language_id'),
+)
+
+def _version_trigger(name, event, table, scope, rows):
+    """Build a trigger bumping the data version of the users owning `rows` (OLD/NEW)"""
+    users = ', '.join(f'{row}.user_id' for row in rows)
+    values = ', '.join(f"({row}.user_id, '{scope}')" for row in rows)
+    return f'''CREATE TRIGGER IF NOT EXISTS {name}
+               AFTER {event} ON {table}
+               BEGIN
+                   INSERT OR IGNORE INTO user_data_versions (user_id, scope) VALUES {values};
+                   UPDATE user_data_versions
+                   SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                   WHERE user_id IN ({users}) AND scope = '{scope}';
+               END'''
+
+def _create_version_triggers(cursor):
+    for scope, table, columns in _VERSIONED_TABLES:
+        cursor.execute(_version_trigger(f'{table}_version_insert', 'INSERT', table, scope, ['NEW']))
+        cursor.execute(_version_trigger(f'{table}_version_delete', 'DELETE', table, scope, ['OLD']))
+        cursor.execute(_version_trigger(f'{table}_version_update', f'UPDATE OF {columns}', table, scope,
+                                        ['OLD', 'NEW']))
+
+def _drop_version_triggers(cursor):
+    for _, table, _ in _VERSIONED_TABLES:
+        for event in ('insert', 'delete', 'update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_version_{event}')
+
+def _bump_all_versions(cursor):
+    """New versions for every user with data, after writes that bypassed the triggers"""
+    for scope, table, _ in _VERSIONED_TABLES:
+        cursor.execute(f'''INSERT OR IGNORE INTO user_data_versions (user_id, scope)
+                           SELECT DISTINCT user_id, '{scope}' FROM {table} WHERE user_id IS NOT NULL''')
+    cursor.execute('UPDATE user_data_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP')
+
+def _add_data_versions(cursor):
+    """Track a version per user and scope so unchanged API responses can be revalidated cheaply"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS user_data_versions (
+        user_id INTEGER NOT NULL,
+        scope TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, scope)
+    ) WITHOUT ROWID''')
+    _create_version_triggers(cursor)
+    _bump_all_versions(cursor)
+
+# Versioned schema migrations, applied in order by DatabaseManager.run_migrations().
+# Each entry is (version, description, steps) where steps is a list of SQL
+# statements or a callable taking a cursor. Never edit an applied migration;
+# append a new one instead.
+MIGRATIONS = [
+    (1, 'Backfill legacy vocabulary and sentences', _backfill_legacy_rows),
+    (2, 'Add indexes for hot queries', [
+        # get_user_vocabulary / get_random_vocabulary / get_user_stats per language
+        '''CREATE INDEX IF NOT EXISTS idx_vocabulary_user_lang_mastery
+           ON vocabulary (user_id, language_id, mastery_level, review_count)
+           WHERE is_active = 1''',
+        # get_user_vocabulary / get_user_stats across all languages
+        '''CREATE INDEX IF NOT EXISTS idx_vocabulary_user_mastery
+           ON vocabulary (user_id, mastery_level, review_count)
+           WHERE is_active = 1''',
+        # get_user_sentences / get_random_sentence per language
+        '''CREATE INDEX IF NOT EXISTS idx_sentences_user_lang_use
+           ON sentences (user_id, language_id, use_count)
+           WHERE is_active = 1''',
+        # get_user_sentences across all languages
+        '''CREATE INDEX IF NOT EXISTS idx_sentences_user_use
+           ON sentences (user_id, use_count)
+           WHERE is_active = 1''',
+        # get_user_stats session aggregates (covering)
+        '''CREATE INDEX IF NOT EXISTS idx_sessions_user_lang_ended
+           ON learning_sessions (user_id, language_id, correct_answers, total_questions)
+           WHERE ended_at IS NOT NULL''',
+        # practice_records foreign keys
+        'CREATE INDEX IF NOT EXISTS idx_practice_records_user ON practice_records (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_practice_records_session ON practice_records (session_id)',
+        'CREATE INDEX IF NOT EXISTS idx_practice_records_vocabulary ON practice_records (vocabulary_id)',
+        'CREATE INDEX IF NOT EXISTS idx_practice_records_sentence ON practice_records (sentence_id)',
+    ]),
+    (3, 'Add rowid sampling indexes for random practice', [
+        # get_random_vocabulary: seek to a random id within one mastery level
+        '''CREATE INDEX IF NOT EXISTS idx_vocabulary_sampling
+           ON vocabulary (user_id, language_id, mastery_level, id)
+           WHERE is_active = 1''',
+        # get_random_sentence: seek to a random id within the user's sentences
+        '''CREATE INDEX IF NOT EXISTS idx_sentences_sampling
+           ON sentences (user_id, language_id, id)
+           WHERE is_active = 1''',
+    ]),
+    (4, 'Add materialized per-user/per-language stats', _create_user_stats),
+    (5, 'Add background generation jobs', [
+        '''CREATE TABLE IF NOT EXISTS generation_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            job_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            params TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_generation_jobs_finished ON generation_jobs (finished_at)',
+    ]),
+    (6, 'Add content-addressed LLM generation cache', [
+        '''CREATE TABLE IF NOT EXISTS generation_cache (
+            cache_key TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hit_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID''',
+        # TTL purge and least-recently-used eviction
+        'CREATE INDEX IF NOT EXISTS idx_generation_cache_created ON generation_cache (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_generation_cache_last_used ON generation_cache (last_used_at)',
+    ]),
+    (7, 'Add pre-generated sentence pools', _add_sentence_pool),
+    (8, 'Add spaced-repetition schedule to vocabulary', _add_review_schedule),
+    (9, 'Add per-user data versions for conditional requests', _add_data_versions),
+    (10, 'Add per-user id indexes for streaming export', [
+        # export_rows: seek to the next chunk of a user's rows by id
+        'CREATE INDEX IF NOT EXISTS idx_vocabulary_user_id ON vocabulary (user_id) WHERE is_active = 1',
+        'CREATE INDEX IF NOT EXISTS idx_sentences_user_id ON sentences (user_id) WHERE is_active = 1 AND in_pool = 0',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_user ON learning_sessions (user_id)',
+    ]),
+    (11, 'Add resumable vocabulary imports', [
+        '''CREATE TABLE IF NOT EXISTS vocabulary_imports (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            language_id INTEGER NOT NULL,
+            format TEXT NOT NULL,
+            filename TEXT,
+            difficulty_level TEXT NOT NULL DEFAULT 'beginner',
+            status TEXT NOT NULL DEFAULT 'running',
+            rows_processed INTEGER NOT NULL DEFAULT 0,
+            added_count INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            errors TEXT,
+            checkpoint TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (language_id) REFERENCES languages (id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_vocabulary_imports_user ON vocabulary_imports (user_id, created_at)',
+    ]),
+    (12, 'Tag generated sentences with their generation cache key', _add_generation_keys),
+    (13, 'Add a trigger-maintained languages catalog version', _add_catalog_versions),
+    (14, 'Replace rowid sampling with trigger-maintained sample sequences', _add_sample_sequences),
+]
+
+# What export_rows() reads per dataset: the table, which of the user's rows
+# count (the ones the app shows) and the exported columns, id first
+ExportDataset = namedtuple('ExportDataset', 'table where columns')
+EXPORT_DATASETS = {
+    'vocabulary': ExportDataset('vocabulary', 'is_active = 1', (
+        'id', 'language_id', 'word', 'translation', 'difficulty_level', 'category', 'part_of_speech',
+        'example_sentence', 'mastery_level', 'review_count', 'last_reviewed', 'ease_factor',
+        'interval_days', 'repetitions', 'next_due', 'created_at')),
+    'sentences': ExportDataset('sentences', 'is_active = 1 AND in_pool = 0', (
+        'id', 'language_id', 'sentence', 'translation', 'difficulty_level', 'category', 'use_count',
+        'last_used', 'created_at')),
+    'learning_sessions': ExportDataset('learning_sessions', '1', (
+        'id', 'language_id', 'session_type', 'started_at', 'ended_at', 'words_practiced',
+        'sentences_practiced', 'correct_answers', 'total_questions')),
+    'practice_records': ExportDataset('practice_records', '1', (
+        'id', 'session_id', 'vocabulary_id', 'sentence_id', 'user_answer', 'correct_answer',
+        'is_correct', 'response_time_ms', 'practiced_at')),
+}
+# Rows read per query while exporting
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+# Seconds between checks that the cached language catalog is still current
+LANGUAGE_CATALOG_CHECK_SECONDS = float(os.getenv('LANGUAGE_CATALOG_CHECK_SECONDS', 1))
+
+_IMPORT_COLUMNS = ('id', 'user_id', 'language_id', 'format', 'filename', 'difficulty_level', 'status',
+                   'rows_processed', 'added_count', 'error_count', 'errors', 'checkpoint', 'error',
+                   'created_at', 'updated_at')
+
+def _import_from_row(row):
+    vocabulary_import = dict(zip(_IMPORT_COLUMNS, row))
+    vocabulary_import['errors'] = json.loads(vocabulary_import['errors']) if vocabulary_import['errors'] else []
+    return vocabulary_import
+
+def sample_random_ids(cursor, table, user_id, language_id, count, difficulty_level=None, rng=random):
+    """Pick up to `count` distinct random ids of a user's sampled `table` rows, lowest level first.
+
+    Rows are sampled from the lowest level (vocabulary mastery_level; all
+    sentences share one level) that has any, then the next, and every row of
+    a level is equally likely. Triggers number each group of rows (user,
+    language, level and difficulty) densely through sample_seq and keep the
+    group sizes in sample_groups, so a pick is a random position within its
+    level's groups and one index seek for the row there, however many rows
+    the user has and however sparse their ids are.
+    """
+    cursor.execute('''SELECT level, difficulty, size FROM sample_groups
+                      WHERE table_name = ? AND user_id = ? AND language_id = ? AND size > 0'''
+                   + (' AND difficulty = ?' if difficulty_level else '')
+                   + ' ORDER BY level, difficulty',
+                   [table, user_id, language_id] + ([difficulty_level] if difficulty_level else []))
+    levels = {}
+    for level, difficulty, size in cursor.fetchall():
+        levels.setdefault(level, []).append((difficulty, size))
+
+    level_expression, member, _ = _SAMPLED_TABLES[table]
+    query = f'''SELECT id FROM {table}
+                 WHERE user_id = ? AND language_id = ? AND {level_expression.format(row=table)} = ?
+                 AND IFNULL(difficulty_level, '') = ? AND sample_seq = ? AND {member.format(row=table)}'''
+    ids = []
+    for level, groups in levels.items():
+        if len(ids) >= count:
+            break
+        total = sum(size for _, size in groups)
+        positions = rng.sample(range(total), min(count - len(ids), total))
+        for position in positions:
+            for difficulty, size in groups:
+                if position < size:
+                    break
+                position -= size
+            cursor.execute(query, (user_id, language_id, level, difficulty, position))
+            row = cursor.fetchone()
+            # Writes since the sizes were read can empty a position or move a picked row into another
+            if row and row[0] not in ids:
+                ids.append(row[0])
+    return ids
+
+def fetch_keyset_page(cursor, query, params, keys, after, limit):
+    """Up to `limit` rows of `query` ordered by the `keys` columns, starting after the key tuple `after`.
+
+    `query` is a SELECT ... WHERE without ORDER BY or LIMIT, and the last
+    key must be unique (id). SQLite seeks an index on the first column of a
+    row-value comparison like (a, b, id) > (?, ?, ?) only, so a page deep
+    inside a large run of equal keys would rescan the run. Instead the rest
+    of the page is read as a = ? AND b = ? AND id > ?, then a = ? AND b > ?,
+    then a > ?, each of which is a single index seek.
+    """
+    if after is None:
+        cursor.execute(f"{query} ORDER BY {', '.join(keys)} LIMIT ?", params + [limit])
+        return cursor.fetchall()
+
+    rows = []
+    for depth in range(len(keys) - 1, -1, -1):
+        conditions = ''.join(f' AND {key} = ?' for key in keys[:depth]) + f' AND {keys[depth]} > ?'
+        cursor.execute(f"{query}{conditions} ORDER BY {', '.join(keys[depth:])} LIMIT ?",
+                       params + list(after[:depth + 1]) + [limit - len(rows)])
+        rows.extend(cursor.fetchall())
+        if len(rows) >= limit:
+            break
+    return rows
+
+# Sort keys of get_user_vocabulary() and get_user_sentences(); the last row's key pages onwards
+VOCABULARY_SORT_KEYS = ('mastery_level', 'review_count', 'id')
+SENTENCE_SORT_KEYS = ('use_count', 'id')
+
+def vocabulary_sort_key(vocab):
+    return tuple(vocab[key] for key in VOCABULARY_SORT_KEYS)
+
+def sentence_sort_key(sentence):
+    return tuple(sentence[key] for key in SENTENCE_SORT_KEYS)
+
+class PooledConnection:
+    """Thin wrapper around a pooled sqlite3 connection.
+
+    Behaves like a regular connection, except that close() hands the
+    connection back to the pool instead of closing it.
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        self.close()
+        return False
+    
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+    
+    def __del__(self):
+        # Connections leaked by an exception are returned to the pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of long-lived SQLite connections"""
+    def __init__(self, db_path, max_size=5, busy_timeout_ms=5000, pragmas=None,
+                 checkout_timeout=30.0, profiler=None):
+        self.db_path = db_path
+        self.profiler = profiler
+        # Every in-memory connection is a separate database, so only share one
+        self.max_size = 1 if db_path == ':memory:' else max(1, max_size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.checkout_timeout = checkout_timeout
+        
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'timeouts': 0,
+            'connections_opened': 0,
+        }
+    
+    def _open(self):
+        if self.profiler is not None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0,
+                                   check_same_thread=False, factory=self.profiler.connection_factory)
+            self.profiler.attach(conn)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0,
+                                   check_same_thread=False)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+    
+    def acquire(self):
+        """Check out a connection, opening a new one while below max_size"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._stats['connections_opened'] += 1
+                    grow = True
+                else:
+                    grow = False
+            
+            if grow:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.checkout_timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise sqlite3.OperationalError(
+                        f'Timed out after {self.checkout_timeout}s waiting for a database connection')
+                finally:
+                    with self._lock:
+                        self._stats['waits'] += 1
+                        self._stats['wait_time_ms'] += (time.perf_counter() - started) * 1000
+        
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return PooledConnection(self, conn)
+    
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection - drop it so a fresh one gets opened
+            with self._lock:
+                self._size -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+    
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._size -= 1
+    
+    def stats(self):
+        """Snapshot of pool counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            size = self._size
+        idle = self._idle.qsize()
+        stats.update({
+            'size': size,
+            'max_size': self.max_size,
+            'idle': idle,
+            'in_use': size - idle,
+            'wait_time_ms': round(stats['wait_time_ms'], 2),
+        })
+        return stats
+
+class LanguageCatalog:
+    """Immutable snapshot of the languages table with O(1) lookups by id and code"""
+    def __init__(self, rows, version=None):
+        # catalog_versions value the rows were read at
+        self.version = version
+        self._languages = tuple(
+            MappingProxyType({'id': row[0], 'name': row[1], 'code': row[2], 'flag_emoji': row[3]})
+            for row in rows
+        )
+        self._by_id = {lang['id']: lang for lang in self._languages}
+        self._by_code = {lang['code']: lang for lang in self._languages}
+        # Changes whenever the catalog contents do; part of the languages ETags
+        self.fingerprint = hashlib.sha1(repr([tuple(row) for row in rows]).encode('utf-8')).hexdigest()
+    
+    def all(self):
+        """All languages ordered by name"""
+        return [dict(lang) for lang in self._languages]
+    
+    def get(self, language_id):
+        lang = self._by_id.get(language_id)
+        return dict(lang) if lang else None
+    
+    def get_by_code(self, code):
+        lang = self._by_code.get(code)
+        return dict(lang) if lang else None
+    
+    def __contains__(self, language_id):
+        return language_id in self._by_id
+    
+    def __len__(self):
+        return len(self._languages)
 
 class DatabaseManager:
-    def __init__(self, db_path='language_learning.db'):
+    def __init__(self, db_path='language_learning.db', pool_size=None, busy_timeout_ms=None,
+                 pragmas=None, profiler=None):
         self.db_path = db_path
+        # Optional SQLProfiler timing every statement on the pool's connections
+        self.profiler = profiler
+        self._language_catalog = None
+        self._language_catalog_checked = 0.0
+        self._language_catalog_lock = threading.Lock()
+        self.user_cache = TTLCache(
+            max_size=int(os.getenv('USER_CACHE_SIZE', 10000)),
+            ttl=float(os.getenv('USER_CACHE_TTL', 60)),
+        )
+        self.pool = ConnectionPool(
+            db_path,
+            max_size=pool_size or int(os.getenv('DB_POOL_SIZE', 5)),
+            busy_timeout_ms=busy_timeout_ms or int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000)),
+            pragmas=pragmas,
+            profiler=profiler,
+        )
         self.init_database()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Check out a pooled connection; call close() to return it"""
+        return self.pool.acquire()
+    
+    def pool_stats(self):
+        """Get connection pool statistics"""
+        return self.pool.stats()
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close_all()
     
     def init_database(self):
         """Initialize the database with all required tables"""
@@ -144,9 +997,74 @@ class DatabaseManager:
             for lang_name, lang_code, flag in default_languages:
                 cursor.execute('''INSERT INTO languages (name, code, flag_emoji) 
                                  VALUES (?, ?, ?)''', (lang_name, lang_code, flag))
+            self.invalidate_language_catalog()
+        
+        # Create schema_migrations table if it doesn't exist
+        cursor.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''')
         
         conn.commit()
+        
+        try:
+            self.run_migrations(conn)
+        finally:
+            conn.close()
+    
+    def get_schema_version(self):
+        """Get the highest applied migration version"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations')
+        version = cursor.fetchone()[0]
         conn.close()
+        return version
+    
+    def run_migrations(self, conn=None):
+        """Apply pending schema migrations in order, each in its own transaction"""
+        own_connection = conn is None
+        if own_connection:
+            conn = self.get_connection()
+        cursor = conn.cursor()
+        applied = []
+        
+        try:
+            cursor.execute('SELECT version FROM schema_migrations')
+            done = {row[0] for row in cursor.fetchall()}
+            
+            for version, description, steps in MIGRATIONS:
+                if version in done:
+                    continue
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    # Another process may have applied it while we waited for the lock
+                    cursor.execute('SELECT 1 FROM schema_migrations WHERE version = ?', (version,))
+                    if cursor.fetchone():
+                        conn.rollback()
+                        continue
+                    
+                    if callable(steps):
+                        steps(cursor)
+                    else:
+                        for statement in steps:
+                            cursor.execute(statement)
+                    
+                    cursor.execute('''INSERT INTO schema_migrations (version, description)
+                                     VALUES (?, ?)''', (version, description))
+                    conn.commit()
+                    applied.append(version)
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Migration {version} ({description}) failed: {e}")
+                    raise
+        finally:
+            if own_connection:
+                conn.close()
+        
+        return applied
     
     def create_user(self, username, email, password):
         """Create a new user account"""
@@ -173,6 +1091,7 @@ class DatabaseManager:
                 user_id = cursor.lastrowid
             
             conn.commit()
+            self.user_cache.invalidate(user_id)
             return user_id
         except sqlite3.IntegrityError as e:
             print(f"Database error: {e}")
@@ -198,6 +1117,7 @@ class DatabaseManager:
                              WHERE id = ?''', (user[0],))
             conn.commit()
             conn.close()
+            self.user_cache.invalidate(user[0])
             
             return {
                 'id': user[0],
@@ -226,17 +1146,99 @@ class DatabaseManager:
             }
         return None
     
-    def get_languages(self):
-        """Get all available languages"""
+    def get_user_by_username(self, username):
+        """Get active user data by username"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''SELECT id, username, email, created_at, last_login 
+                         FROM users WHERE username = ? AND is_active = 1''', (username,))
+        user = cursor.fetchone()
+        conn.close()
+        
+        if user:
+            return {
+                'id': user[0],
+                'username': user[1],
+                'email': user[2],
+                'created_at': user[3],
+                'last_login': user[4]
+            }
+        return None
+    
+    def get_cached_user(self, user_id):
+        """Get user data by ID through the user cache (used on every authenticated request)"""
+        user = self.user_cache.get(user_id, _MISSING)
+        if user is _MISSING:
+            user = self.get_user_by_id(user_id)
+            # Unknown or inactive users are cached too, so stale sessions stay cheap
+            self.user_cache.set(user_id, user)
+        return dict(user) if user else None
+    
+    def deactivate_user(self, user_id):
+        """Deactivate a user account"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''SELECT id, name, code, flag_emoji FROM languages ORDER BY name''')
-        languages = cursor.fetchall()
+        cursor.execute('UPDATE users SET is_active = 0 WHERE id = ?', (user_id,))
+        changed = cursor.rowcount > 0
+        conn.commit()
         conn.close()
         
-        return [{'id': lang[0], 'name': lang[1], 'code': lang[2], 'flag_emoji': lang[3]} 
-                for lang in languages]
+        self.user_cache.invalidate(user_id)
+        return changed
+    
+    def get_language_catalog(self):
+        """Get the language catalog, reloading it when the languages table has changed.
+
+        Triggers bump the catalog_versions row on every write to languages,
+        whichever process or connection makes it. The cached catalog is
+        checked against that row (one primary-key lookup) at most every
+        LANGUAGE_CATALOG_CHECK_SECONDS, and reloaded only if it moved.
+        """
+        catalog = self._language_catalog
+        if self._language_catalog_checked_recently(catalog):
+            return catalog
+        
+        with self._language_catalog_lock:
+            catalog = self._language_catalog
+            if self._language_catalog_checked_recently(catalog):
+                return catalog
+            
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            # Read the version first: a write racing the load leaves an older
+            # version with newer rows, which only causes one extra reload
+            cursor.execute("SELECT version FROM catalog_versions WHERE name = 'languages'")
+            row = cursor.fetchone()
+            version = row[0] if row else None
+            if catalog is None or version is None or catalog.version != version:
+                cursor.execute('''SELECT id, name, code, flag_emoji FROM languages ORDER BY name''')
+                catalog = LanguageCatalog(cursor.fetchall(), version)
+            conn.close()
+            self._language_catalog = catalog
+            self._language_catalog_checked = time.monotonic()
+        return catalog
+    
+    def _language_catalog_checked_recently(self, catalog):
+        return (catalog is not None and
+                time.monotonic() - self._language_catalog_checked < LANGUAGE_CATALOG_CHECK_SECONDS)
+    
+    def invalidate_language_catalog(self):
+        """Reload the catalog on next use; writes to languages also invalidate it through catalog_versions"""
+        self._language_catalog = None
+    
+    def get_languages(self):
+        """Get all available languages"""
+        return self.get_language_catalog().all()
+    
+    def get_language(self, language_id):
+        """Get a language by ID"""
+        return self.get_language_catalog().get(language_id)
+    
+    def get_language_by_code(self, code):
+        """Get a language by its code (e.g. 'es')"""
+        return self.get_language_catalog().get_by_code(code)
     
     def add_user_language(self, user_id, language_id):
         """Add a language to user's learning list"""
@@ -254,6 +1256,21 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def get_data_version(self, user_id, scope):
+        """(version, updated_at) of a user's 'vocabulary', 'sentences' or 'languages' data.
+
+        The version changes on every write to rows the API returns, so it
+        can stand in for the content when revalidating cached responses.
+        Users who never had data in the scope get (0, None).
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''SELECT version, updated_at FROM user_data_versions
+                         WHERE user_id = ? AND scope = ?''', (user_id, scope))
+        row = cursor.fetchone()
+        conn.close()
+        return (row[0], row[1]) if row else (0, None)
+    
     def get_user_languages(self, user_id):
         """Get all languages that a user is learning"""
         conn = self.get_connection()
@@ -294,8 +1311,75 @@ class DatabaseManager:
         conn.close()
         return vocab_id
     
-    def get_user_vocabulary(self, user_id, language_id=None, difficulty_level=None, limit=50):
-        """Get vocabulary for a user with optional filters"""
+    def add_vocabulary_bulk(self, user_id, language_id, vocabulary_list,
+                            difficulty_level='beginner', chunk_size=500):
+        """Add many vocabulary words using executemany in chunked transactions.
+        
+        Each item is a dict with 'word' and optional 'translation', 'category',
+        'part_of_speech' and 'example_sentence'. Returns the number of words
+        added and a per-row result list in input order.
+        """
+        results = []
+        rows = []
+        for index, vocab in enumerate(vocabulary_list):
+            if not isinstance(vocab, dict):
+                results.append({'index': index, 'status': 'error', 'error': 'Entry must be an object'})
+                continue
+        
+            word = vocab.get('word')
+            if not isinstance(word, str) or not word.strip():
+                results.append({'index': index, 'status': 'error', 'error': 'Word is required'})
+                continue
+        
+            fields = [vocab.get(key) for key in ('translation', 'category', 'part_of_speech', 'example_sentence')]
+            if any(value is not None and not isinstance(value, str) for value in fields):
+                results.append({'index': index, 'status': 'error', 'error': 'Fields must be strings'})
+                continue
+        
+            result = {'index': index, 'status': 'added'}
+            results.append(result)
+            rows.append((result, (user_id, language_id, word.strip(), fields[0], difficulty_level,
+                                  fields[1], fields[2], fields[3])))
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.executemany('''INSERT INTO vocabulary
+                                     (user_id, language_id, word, translation, difficulty_level,
+                                      category, part_of_speech, example_sentence)
+                                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                                   [params for _, params in chunk])
+                # AUTOINCREMENT ids are consecutive while we hold the write lock
+                cursor.execute('SELECT last_insert_rowid()')
+                last_id = cursor.fetchone()[0]
+                conn.commit()
+        
+                for offset, (result, _) in enumerate(chunk):
+                    result['vocabulary_id'] = last_id - len(chunk) + 1 + offset
+        except sqlite3.Error as e:
+            conn.rollback()
+            # Rows from chunks that were not committed are reported as failed
+            for result, _ in rows:
+                if 'vocabulary_id' not in result:
+                    result['status'] = 'error'
+                    result['error'] = str(e)
+        finally:
+            conn.close()
+        
+        added_count = sum(1 for result in results if result['status'] == 'added')
+        return {'added_count': added_count, 'results': results}
+    
+    def get_user_vocabulary(self, user_id, language_id=None, difficulty_level=None, limit=50, after=None):
+        """Get vocabulary for a user with optional filters, least mastered first.
+
+        Rows come in vocabulary_sort_key() order; pass the key of the last
+        row of a page as `after` to get the next page (keyset pagination),
+        which costs the same index seeks however deep the page is.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -313,11 +1397,7 @@ class DatabaseManager:
             query += ' AND difficulty_level = ?'
             params.append(difficulty_level)
         
-        query += ' ORDER BY mastery_level ASC, review_count ASC LIMIT ?'
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        vocabulary = cursor.fetchall()
+        vocabulary = fetch_keyset_page(cursor, query, params, VOCABULARY_SORT_KEYS, after, limit)
         conn.close()
         
         return [{'id': vocab[0], 'word': vocab[1], 'translation': vocab[2],
@@ -341,14 +1421,104 @@ class DatabaseManager:
         conn.close()
         return sentence_id
     
-    def get_user_sentences(self, user_id, language_id=None, difficulty_level=None, limit=50):
-        """Get sentences for a user with optional filters"""
+    def add_generated_sentences(self, user_id, language_id, generation_key, sentences,
+                                difficulty_level='beginner'):
+        """Store (sentence, translation) pairs from one generation for a user, at most once.
+
+        If the user already has active sentences stored from generation_key (a
+        generation cache hit), those are returned instead of inserting copies.
+        Returns [{'id', 'sentence', 'translation'}] in generation order.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''SELECT id, sentence, translation FROM sentences
+                             WHERE user_id = ? AND generation_key = ? AND is_active = 1
+                             ORDER BY id''', (user_id, generation_key))
+            rows = cursor.fetchall()
+            if not rows:
+                for sentence, translation in sentences:
+                    cursor.execute('''INSERT INTO sentences
+                                     (user_id, language_id, sentence, translation, difficulty_level,
+                                      generation_key)
+                                     VALUES (?, ?, ?, ?, ?, ?)''',
+                                  (user_id, language_id, sentence, translation, difficulty_level,
+                                   generation_key))
+                    rows.append((cursor.lastrowid, sentence, translation))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return [{'id': row[0], 'sentence': row[1], 'translation': row[2]} for row in rows]
+    
+    def add_pooled_sentences(self, user_id, language_id, difficulty_level, sentences):
+        """Store pre-generated (sentence, translation) pairs in the user's pool"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany('''INSERT INTO sentences
+                             (user_id, language_id, sentence, translation, difficulty_level, in_pool)
+                             VALUES (?, ?, ?, ?, ?, 1)''',
+                          [(user_id, language_id, sentence, translation, difficulty_level)
+                           for sentence, translation in sentences])
+        added = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return added
+    
+    def take_pooled_sentence(self, user_id, language_id, difficulty_level):
+        """Claim the oldest pooled sentence, turning it into a regular sentence"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # BEGIN IMMEDIATE so two requests never claim the same row
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''SELECT id, sentence, translation, difficulty_level, category
+                         FROM sentences
+                         WHERE user_id = ? AND language_id = ? AND difficulty_level = ?
+                               AND in_pool = 1 AND is_active = 1
+                         ORDER BY id LIMIT 1''', (user_id, language_id, difficulty_level))
+        sentence = cursor.fetchone()
+        if sentence:
+            cursor.execute('UPDATE sentences SET in_pool = 0 WHERE id = ?', (sentence[0],))
+        conn.commit()
+        conn.close()
+        
+        if sentence:
+            return {'id': sentence[0], 'sentence': sentence[1], 'translation': sentence[2],
+                    'difficulty_level': sentence[3], 'category': sentence[4]}
+        return None
+    
+    def count_pooled_sentences(self, user_id, language_id, difficulty_level):
+        """Number of pre-generated sentences waiting to be served"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''SELECT COUNT(*) FROM sentences
+                         WHERE user_id = ? AND language_id = ? AND difficulty_level = ?
+                               AND in_pool = 1 AND is_active = 1''',
+                      (user_id, language_id, difficulty_level))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_user_sentences(self, user_id, language_id=None, difficulty_level=None, limit=50, after=None):
+        """Get sentences for a user with optional filters, least used first.
+
+        Rows come in sentence_sort_key() order; `after` continues from the
+        key of the last row of the previous page, as in get_user_vocabulary().
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         query = '''SELECT id, sentence, translation, difficulty_level, category, use_count
                    FROM sentences 
-                   WHERE user_id = ? AND is_active = 1'''
+                   WHERE user_id = ? AND is_active = 1 AND in_pool = 0'''
         params = [user_id]
         
         if language_id:
@@ -359,11 +1529,7 @@ class DatabaseManager:
             query += ' AND difficulty_level = ?'
             params.append(difficulty_level)
         
-        query += ' ORDER BY use_count ASC LIMIT ?'
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        sentences = cursor.fetchall()
+        sentences = fetch_keyset_page(cursor, query, params, SENTENCE_SORT_KEYS, after, limit)
         conn.close()
         
         return [{'id': sent[0], 'sentence': sent[1], 'translation': sent[2],
@@ -375,19 +1541,12 @@ class DatabaseManager:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        query = '''SELECT id, sentence, translation, difficulty_level, category
-                   FROM sentences 
-                   WHERE user_id = ? AND language_id = ? AND is_active = 1'''
-        params = [user_id, language_id]
-        
-        if difficulty_level:
-            query += ' AND difficulty_level = ?'
-            params.append(difficulty_level)
-        
-        query += ' ORDER BY RANDOM() LIMIT 1'
-        
-        cursor.execute(query, params)
-        sentence = cursor.fetchone()
+        ids = sample_random_ids(cursor, 'sentences', user_id, language_id, 1, difficulty_level)
+        sentence = None
+        if ids:
+            cursor.execute('''SELECT id, sentence, translation, difficulty_level, category
+                             FROM sentences WHERE id = ?''', (ids[0],))
+            sentence = cursor.fetchone()
         conn.close()
         
         if sentence:
@@ -396,30 +1555,81 @@ class DatabaseManager:
         return None
     
     def get_random_vocabulary(self, user_id, language_id, difficulty_level=None, limit=10):
-        """Get random vocabulary for practice"""
+        """Get random vocabulary for practice, least mastered levels first"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        query = '''SELECT id, word, translation, difficulty_level, category, mastery_level
-                   FROM vocabulary 
-                   WHERE user_id = ? AND language_id = ? AND is_active = 1'''
+        # Sampled randomly within each mastery level, walking the levels upwards
+        ids = sample_random_ids(cursor, 'vocabulary', user_id, language_id, limit, difficulty_level)
+        
+        vocabulary = []
+        if ids:
+            cursor.execute(f'''SELECT id, word, translation, difficulty_level, category, mastery_level
+                              FROM vocabulary WHERE id IN ({', '.join('?' * len(ids))})''', ids)
+            rows = {row[0]: row for row in cursor.fetchall()}
+            vocabulary = [rows[vocab_id] for vocab_id in ids]
+        conn.close()
+        
+        return [{'id': vocab[0], 'word': vocab[1], 'translation': vocab[2],
+                'difficulty_level': vocab[3], 'category': vocab[4], 'mastery_level': vocab[5]}
+                for vocab in vocabulary]
+    
+    def get_due_vocabulary(self, user_id, language_id, difficulty_level=None, limit=10, now=None):
+        """Get the next `limit` words to review, most overdue first.
+
+        Words never reviewed are due immediately. When fewer than `limit`
+        words are due, the ones coming up soonest fill the rest, so practice
+        never runs dry; each row's `due` tells them apart. Reads one index
+        range in next_due order, so the cost does not grow with vocabulary size.
+        """
+        now = time.time() if now is None else now
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        where = 'user_id = ? AND language_id = ? AND is_active = 1'
         params = [user_id, language_id]
         
         if difficulty_level:
-            query += ' AND difficulty_level = ?'
+            where += ' AND difficulty_level = ?'
             params.append(difficulty_level)
         
-        query += ' ORDER BY mastery_level ASC, RANDOM() LIMIT ?'
-        params.append(limit)
-        
-        cursor.execute(query, params)
+        cursor.execute(f'''SELECT id, word, translation, difficulty_level, category, mastery_level,
+                                  next_due, interval_days, repetitions
+                           FROM vocabulary WHERE {where}
+                           ORDER BY next_due LIMIT ?''', params + [limit])
         vocabulary = cursor.fetchall()
         conn.close()
         
         return [{'id': vocab[0], 'word': vocab[1], 'translation': vocab[2],
-                'difficulty_level': vocab[3], 'category': vocab[4], 'mastery_level': vocab[5]}
+                'difficulty_level': vocab[3], 'category': vocab[4], 'mastery_level': vocab[5],
+                'next_due': vocab[6], 'interval_days': vocab[7], 'repetitions': vocab[8],
+                'due': vocab[6] <= now}
                 for vocab in vocabulary]
     
+    def _schedule_reviews(self, cursor, reviews, now):
+        """Apply (user_id, vocabulary_id, quality) reviews, in order, to the SM-2 schedule"""
+        states = {}
+        keys = list({(user_id, vocabulary_id) for user_id, vocabulary_id, _ in reviews})
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            cursor.execute(f'''SELECT user_id, id, ease_factor, interval_days, repetitions, next_due
+                               FROM vocabulary WHERE id IN ({', '.join('?' * len(chunk))})''',
+                           [vocabulary_id for _, vocabulary_id in chunk])
+            for row in cursor.fetchall():
+                states[(row[0], row[1])] = ReviewState(*row[2:])
+        
+        changed = {}
+        for user_id, vocabulary_id, quality in reviews:
+            state = changed.get((user_id, vocabulary_id)) or states.get((user_id, vocabulary_id))
+            if state is not None:
+                changed[(user_id, vocabulary_id)] = review(state.ease_factor, state.interval_days,
+                                                           state.repetitions, quality, now)
+        
+        cursor.executemany('''UPDATE vocabulary
+                             SET ease_factor = ?, interval_days = ?, repetitions = ?, next_due = ?
+                             WHERE id = ?''',
+                           [tuple(state) + (vocabulary_id,) for (_, vocabulary_id), state in changed.items()])
+    
     def start_learning_session(self, user_id, language_id, session_type):
         """Start a new learning session"""
         conn = self.get_connection()
@@ -476,6 +1686,8 @@ class DatabaseManager:
                                      review_count = review_count + 1,
                                      last_reviewed = CURRENT_TIMESTAMP
                                  WHERE id = ?''', (vocabulary_id,))
+            self._schedule_reviews(cursor, [(user_id, vocabulary_id, answer_quality(is_correct, response_time_ms))],
+                                   time.time())
         
         # Update sentence use count if applicable
         if sentence_id:
@@ -486,98 +1698,605 @@ class DatabaseManager:
         
         conn.commit()
         conn.close()
+
+    def record_practice_batch(self, records):
+        """Record many practice attempts in a single transaction.
+
+        Each record is a dict with the record_practice() arguments. Mastery and
+        use_count updates are coalesced to one UPDATE per vocabulary/sentence row,
+        and repeated answers for one word advance its schedule in order.
+        """
+        if not records:
+            return 0
+
+        # Fold the per-attempt mastery steps (+1, or -1 clamped at 0) into a
+        # single MAX(floor, mastery_level + delta) per vocabulary row
+        vocab_updates = {}
+        sentence_updates = {}
+        # (user_id, vocabulary_id, quality) in answer order for the review schedule
+        answers = []
+        for record in records:
+            vocabulary_id = record.get('vocabulary_id')
+            is_correct = record.get('is_correct')
+            if vocabulary_id and is_correct is not None:
+                key = (record['user_id'], vocabulary_id)
+                floor, delta, reviews = vocab_updates.get(key, (0, 0, 0))
+                step = 1 if is_correct else -1
+                vocab_updates[key] = (max(0, floor + step), delta + step, reviews + 1)
+                answers.append(key + (answer_quality(is_correct, record.get('response_time_ms')),))
+
+            sentence_id = record.get('sentence_id')
+            if sentence_id:
+                key = (record['user_id'], sentence_id)
+                sentence_updates[key] = sentence_updates.get(key, 0) + 1
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany('''INSERT INTO practice_records
+                                 (user_id, session_id, vocabulary_id, sentence_id, user_answer,
+                                  correct_answer, is_correct, response_time_ms)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                               [(record['user_id'], record['session_id'], record.get('vocabulary_id'),
+                                 record.get('sentence_id'), record.get('user_answer'),
+                                 record.get('correct_answer'), record.get('is_correct'),
+                                 record.get('response_time_ms'))
+                                for record in records])
+
+            cursor.executemany('''UPDATE vocabulary
+                                 SET mastery_level = MAX(?, mastery_level + ?),
+                                     review_count = review_count + ?,
+                                     last_reviewed = CURRENT_TIMESTAMP
+                                 WHERE id = ? AND user_id = ?''',
+                               [(floor, delta, reviews, vocabulary_id, user_id)
+                                for (user_id, vocabulary_id), (floor, delta, reviews) in vocab_updates.items()])
+            if answers:
+                self._schedule_reviews(cursor, answers, time.time())
+
+            cursor.executemany('''UPDATE sentences
+                                 SET use_count = use_count + ?,
+                                     last_used = CURRENT_TIMESTAMP
+                                 WHERE id = ? AND user_id = ?''',
+                               [(uses, sentence_id, user_id)
+                                for (user_id, sentence_id), uses in sentence_updates.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return len(records)
+
+    def export_rows(self, user_id, dataset, chunk_size=None):
+        """Yield all of a user's rows in an EXPORT_DATASETS dataset, in id order, as lists of tuples.
+
+        Each chunk is a separate short read on a freshly checked-out
+        connection, continuing after the last id, so an export of any size
+        holds one chunk in memory and never pins a pooled connection (or an
+        open read transaction) while a slow client downloads.
+        """
+        table, where, columns = EXPORT_DATASETS[dataset]
+        query = f'''SELECT {', '.join(columns)} FROM {table}
+                    WHERE user_id = ? AND {where} AND id > ?
+                    ORDER BY id LIMIT ?'''
+        chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+        last_id = 0
+        while True:
+            conn = self.get_connection()
+            try:
+                rows = conn.execute(query, (user_id, last_id, chunk_size)).fetchall()
+            finally:
+                conn.close()
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
     
     def get_user_stats(self, user_id, language_id=None):
-        """Get learning statistics for a user"""
+        """Get learning statistics for a user from the materialized user_stats table"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Get vocabulary stats
-        vocab_query = '''SELECT COUNT(*) as total, 
-                               SUM(CASE WHEN mastery_level >= 5 THEN 1 ELSE 0 END) as mastered,
-                               AVG(mastery_level) as avg_mastery
-                        FROM vocabulary 
-                        WHERE user_id = ? AND is_active = 1'''
-        vocab_params = [user_id]
-        
-        if language_id:
-            vocab_query += ' AND language_id = ?'
-            vocab_params.append(language_id)
-        
-        cursor.execute(vocab_query, vocab_params)
-        vocab_stats = cursor.fetchone()
-        
-        # Get session stats
-        session_query = '''SELECT COUNT(*) as total_sessions,
-                                 SUM(correct_answers) as total_correct,
-                                 SUM(total_questions) as total_questions,
-                                 AVG(correct_answers * 100.0 / total_questions) as avg_accuracy
-                          FROM learning_sessions 
-                          WHERE user_id = ? AND ended_at IS NOT NULL'''
-        session_params = [user_id]
-        
-        if language_id:
-            session_query += ' AND language_id = ?'
-            session_params.append(language_id)
-        
-        cursor.execute(session_query, session_params)
-        session_stats = cursor.fetchone()
-        
+        cursor.execute('''SELECT vocab_total, vocab_mastered, mastery_sum,
+                                 session_count, correct_total, question_total,
+                                 accuracy_sum, accuracy_count
+                          FROM user_stats
+                          WHERE user_id = ? AND language_id = ?''',
+                       (user_id, language_id or ALL_LANGUAGES))
+        stats = cursor.fetchone() or (0,) * 8
         conn.close()
         
+        (vocab_total, vocab_mastered, mastery_sum, session_count,
+         correct_total, question_total, accuracy_sum, accuracy_count) = stats
+        
         return {
             'vocabulary': {
-                'total': vocab_stats[0] or 0,
-                'mastered': vocab_stats[1] or 0,
-                'avg_mastery': round(vocab_stats[2] or 0, 2)
+                'total': vocab_total,
+                'mastered': vocab_mastered,
+                'avg_mastery': round(mastery_sum / vocab_total, 2) if vocab_total else 0
             },
             'sessions': {
-                'total': session_stats[0] or 0,
-                'total_correct': session_stats[1] or 0,
-                'total_questions': session_stats[2] or 0,
-                'avg_accuracy': round(session_stats[3] or 0, 2)
+                'total': session_count,
+                'total_correct': correct_total,
+                'total_questions': question_total,
+                'avg_accuracy': round(accuracy_sum / accuracy_count, 2) if accuracy_count else 0
             }
         }
+    
+    def rebuild_user_stats(self, user_id=None):
+        """Recompute user_stats from vocabulary and learning_sessions (all users by default)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            rows = _rebuild_user_stats(cursor, user_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return rows
+    
+    @contextmanager
+    def deferred_user_stats(self):
+        """Suspend the user_stats, sampling and data version triggers for a bulk load.
 
-    def migrate_existing_data(self):
-        """Migrate existing data to new schema"""
+        Row-by-row trigger upkeep roughly doubles insert time at millions of
+        rows. The triggers are dropped for the duration of the block, then
+        recreated, user_stats and the sample sequences are rebuilt in one
+        pass and every data version is bumped, even if the block fails.
+        Other writers during the block do not update user_stats either,
+        which the rebuild corrects.
+        """
+        conn = self.get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        _drop_user_stats_triggers(conn.cursor())
+        _drop_sample_triggers(conn.cursor())
+        _drop_version_triggers(conn.cursor())
+        conn.commit()
+        conn.close()
+        try:
+            yield
+        finally:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                _create_user_stats_triggers(cursor)
+                _rebuild_user_stats(cursor)
+                _create_sample_triggers(cursor)
+                _rebuild_sample_groups(cursor)
+                _create_version_triggers(cursor)
+                _bump_all_versions(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+    
+    def check_user_stats(self, user_id=None):
+        """Compare user_stats with the base tables and return any mismatched rows"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Read both sides from one snapshot
+        cursor.execute('BEGIN')
+        expected = compute_user_stats(cursor, user_id)
+        
+        query = 'SELECT * FROM user_stats'
+        params = []
+        if user_id is not None:
+            query += ' WHERE user_id = ?'
+            params.append(user_id)
+        cursor.execute(query, params)
+        names = [description[0] for description in cursor.description]
+        actual = {}
+        for row in cursor.fetchall():
+            row = dict(zip(names, row))
+            actual[(row['user_id'], row['language_id'])] = row
+        conn.rollback()
+        conn.close()
+        
+        mismatches = []
+        for key in set(expected) | set(actual):
+            want = expected.get(key)
+            have = actual.get(key)
+            if want is None:
+                # Rows left at zero after deletes are harmless
+                if any(have[column] for column in USER_STATS_COLUMNS):
+                    mismatches.append({'user_id': key[0], 'language_id': key[1], 'expected': None, 'actual': have})
+                continue
+            # accuracy_sum is a float maintained incrementally, so allow rounding drift
+            if have is None or any(abs(have[column] - want[column]) > 1e-6 * max(1, abs(want[column]))
+                                   for column in USER_STATS_COLUMNS):
+                mismatches.append({'user_id': key[0], 'language_id': key[1], 'expected': want, 'actual': have})
+        
+        return mismatches
+    
+    def create_generation_job(self, job_id, user_id, job_type, params):
+        """Persist a new pending generation job"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''INSERT INTO generation_jobs (id, user_id, job_type, params)
+                         VALUES (?, ?, ?, ?)''', (job_id, user_id, job_type, json.dumps(params)))
+        conn.commit()
+        conn.close()
+    
+    def start_generation_job(self, job_id):
+        """Mark a pending job as running; returns False if it was already claimed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''UPDATE generation_jobs
+                         SET status = 'running', started_at = CURRENT_TIMESTAMP
+                         WHERE status = 'pending' AND id = ?''', (job_id,))
+        claimed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return claimed
+    
+    def finish_generation_job(self, job_id, status, result=None, error=None):
+        """Store the outcome of a generation job"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''UPDATE generation_jobs
+                         SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                         WHERE id = ?''',
+                      (status, json.dumps(result) if result is not None else None, error, job_id))
+        conn.commit()
+        conn.close()
+    
+    def get_generation_job(self, job_id, user_id=None):
+        """Get a generation job, optionally only if it belongs to user_id"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        query = '''SELECT id, user_id, job_type, status, params, result, error,
+                          created_at, started_at, finished_at
+                   FROM generation_jobs WHERE id = ?'''
+        params = [job_id]
+        
+        if user_id is not None:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        
+        cursor.execute(query, params)
+        job = cursor.fetchone()
+        conn.close()
+        
+        if job:
+            return {'id': job[0], 'user_id': job[1], 'job_type': job[2], 'status': job[3],
+                    'params': json.loads(job[4]) if job[4] else {},
+                    'result': json.loads(job[5]) if job[5] else None,
+                    'error': job[6], 'created_at': job[7], 'started_at': job[8],
+                    'finished_at': job[9]}
+        return None
+    
+    def get_pending_generation_job_ids(self):
+        """Get ids of jobs still waiting for a worker, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''SELECT id FROM generation_jobs
+                         WHERE status = 'pending'
+                         ORDER BY created_at''')
+        job_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return job_ids
+    
+    def fail_stale_generation_jobs(self, stale_seconds=300):
+        """Fail jobs stuck in running longer than stale_seconds (e.g. after a crash)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''UPDATE generation_jobs
+                         SET status = 'failed', error = 'Job was interrupted',
+                             finished_at = CURRENT_TIMESTAMP
+                         WHERE status = 'running' AND started_at < datetime('now', ?)''',
+                      (f'-{int(stale_seconds)} seconds',))
+        failed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return failed
+    
+    def delete_finished_generation_jobs(self, older_than_days=7):
+        """Delete finished jobs older than the given number of days"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''DELETE FROM generation_jobs
+                         WHERE finished_at < datetime('now', ?)''', (f'-{float(older_than_days) * 86400} seconds',))
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+    
+    def get_cached_generation(self, cache_key, ttl_seconds):
+        """Get cached model output younger than ttl_seconds, marking it as used"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = time.time()
+        
+        cursor.execute('''SELECT content FROM generation_cache
+                         WHERE cache_key = ? AND created_at >= ?''', (cache_key, now - ttl_seconds))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('''UPDATE generation_cache
+                             SET last_used_at = ?, hit_count = hit_count + 1
+                             WHERE cache_key = ?''', (now, cache_key))
+            conn.commit()
+        conn.close()
+        return row[0] if row else None
+    
+    def store_cached_generation(self, cache_key, content, ttl_seconds, max_entries):
+        """Store model output, dropping expired entries and the least recently used beyond max_entries"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = time.time()
+        
+        cursor.execute('''INSERT OR REPLACE INTO generation_cache
+                         (cache_key, content, created_at, last_used_at)
+                         VALUES (?, ?, ?, ?)''', (cache_key, content, now, now))
+        cursor.execute('DELETE FROM generation_cache WHERE created_at < ?', (now - ttl_seconds,))
+        cursor.execute('SELECT COUNT(*) FROM generation_cache')
+        excess = cursor.fetchone()[0] - max_entries
+        if excess > 0:
+            cursor.execute('''DELETE FROM generation_cache WHERE cache_key IN (
+                                SELECT cache_key FROM generation_cache
+                                ORDER BY last_used_at LIMIT ?)''', (excess,))
+        conn.commit()
+        conn.close()
+        return max(0, excess)
+    
+    def clear_generation_cache(self):
+        """Remove every cached generation"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('DELETE FROM generation_cache')
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+    
+    def create_vocabulary_import(self, import_id, user_id, language_id, format_name, filename=None,
+                                 difficulty_level='beginner'):
+        """Record a new vocabulary import before its first chunk is written"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''INSERT INTO vocabulary_imports
+                         (id, user_id, language_id, format, filename, difficulty_level)
+                         VALUES (?, ?, ?, ?, ?, ?)''',
+                      (import_id, user_id, language_id, format_name, filename, difficulty_level))
+        conn.commit()
+        conn.close()
+    
+    def get_vocabulary_import(self, import_id, user_id=None):
+        """Get a vocabulary import, optionally only if it belongs to user_id"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        query = f'SELECT {", ".join(_IMPORT_COLUMNS)} FROM vocabulary_imports WHERE id = ?'
+        params = [import_id]
+        
+        if user_id is not None:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        conn.close()
+        return _import_from_row(row) if row else None
+    
+    def get_vocabulary_imports(self, user_id, limit=20):
+        """A user's most recent vocabulary imports, newest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''SELECT {", ".join(_IMPORT_COLUMNS)} FROM vocabulary_imports
+                          WHERE user_id = ? ORDER BY created_at DESC, rowid DESC LIMIT ?''', (user_id, limit))
+        imports = [_import_from_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return imports
+    
+    def set_vocabulary_import_status(self, import_id, status, error=None):
+        """Set an import's status; a completed import is never reopened. Returns False if unchanged"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''UPDATE vocabulary_imports
+                         SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+                         WHERE id = ? AND status != ?''', (status, error, import_id, 'completed'))
+        changed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return changed
+    
+    def write_vocabulary_import_chunk(self, vocabulary_import, rows, progress):
+        """Insert a chunk of imported words and record the import's new progress in one transaction.
+
+        rows are (word, translation, difficulty_level, category,
+        part_of_speech, example_sentence) tuples. progress holds the new
+        rows_processed, added_count, error_count, errors and checkpoint.
+        The write only happens if the stored rows_processed still matches
+        vocabulary_import['rows_processed'], so a crash never leaves words
+        without the progress that accounts for them, and two processes
+        resuming the same import cannot both write a chunk. Returns False
+        when the progress had moved on.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Get default language ID (Spanish)
-            cursor.execute('SELECT id FROM languages WHERE name = ?', ('Spanish',))
-            default_lang = cursor.fetchone()
-            default_lang_id = default_lang[0] if default_lang else 1
-            
-            # Update existing vocabulary to have user_id and language_id
-            cursor.execute('''UPDATE vocabulary 
-                             SET user_id = 1, language_id = ?
-                             WHERE user_id IS NULL OR language_id IS NULL''', (default_lang_id,))
-            
-            # Update existing sentences to have user_id and language_id
-            cursor.execute('''UPDATE sentences 
-                             SET user_id = 1, language_id = ?
-                             WHERE user_id IS NULL OR language_id IS NULL''', (default_lang_id,))
-            
-            # Create default user if it doesn't exist
-            cursor.execute('SELECT id FROM users WHERE username = ?', ('default_user',))
-            default_user = cursor.fetchone()
-            
-            if not default_user:
-                cursor.execute('''INSERT INTO users (username, email, password_hash, is_active)
-                                 VALUES (?, ?, ?, ?)''', 
-                              ('default_user', 'default@example.com', 
-                               generate_password_hash('password'), 1))
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''UPDATE vocabulary_imports
+                             SET rows_processed = ?, added_count = ?, error_count = ?, errors = ?,
+                                 checkpoint = ?, updated_at = CURRENT_TIMESTAMP
+                             WHERE id = ? AND rows_processed = ? AND status = ?''',
+                          (progress['rows_processed'], progress['added_count'], progress['error_count'],
+                           json.dumps(progress['errors']), progress['checkpoint'],
+                           vocabulary_import['id'], vocabulary_import['rows_processed'], 'running'))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
             
+            user_id, language_id = vocabulary_import['user_id'], vocabulary_import['language_id']
+            cursor.executemany('''INSERT INTO vocabulary
+                                 (user_id, language_id, word, translation, difficulty_level,
+                                  category, part_of_speech, example_sentence)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                               [(user_id, language_id) + row for row in rows])
             conn.commit()
-            print("Data migration completed successfully")
-            
-        except Exception as e:
-            print(f"Migration error: {e}")
+            return True
+        except Exception:
             conn.rollback()
+            raise
         finally:
             conn.close()
+    
+    def migrate_existing_data(self):
+        """Migrate existing data to the current schema (kept for older scripts)"""
+        applied = self.run_migrations()
+        print(f"Data migration completed successfully (applied: {applied or 'none'})")
+
+class PracticeWriteBehind:
+    """Write-behind queue that coalesces practice records into grouped transactions.
+
+    Records are buffered in memory and written with record_practice_batch()
+    every flush_interval seconds, as soon as max_batch records are pending,
+    or when a session ends (if flush_on_session_end is set). A flush_interval
+    of 0 writes every submission straight through.
+    """
+    def __init__(self, db, flush_interval=1.0, max_batch=100, flush_on_session_end=True):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self.flush_on_session_end = flush_on_session_end
+
+        self._pending = []
+        self._lock = threading.Lock()
+        # Serializes flushes so mastery updates are applied in submission order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._worker = None
+        self._stats = {'submitted': 0, 'written': 0, 'batches': 0, 'errors': 0, 'dropped': 0}
+        atexit.register(self.close)
+
+    def submit(self, records):
+        """Queue practice records for writing"""
+        with self._lock:
+            self._pending.extend(records)
+            self._stats['submitted'] += len(records)
+            pending = len(self._pending)
+
+        if self.flush_interval <= 0 or pending >= self.max_batch:
+            self.flush()
+        else:
+            self._ensure_worker()
+
+    def flush(self):
+        """Write every pending record now"""
+        with self._flush_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+            if not records:
+                return 0
+
+            try:
+                self.db.record_practice_batch(records)
+            except sqlite3.OperationalError as e:
+                # Database busy or locked - keep the records for the next flush
+                with self._lock:
+                    self._pending = records + self._pending
+                    self._stats['errors'] += 1
+                print(f"⚠️ Practice flush deferred: {e}")
+                return 0
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                print(f"⚠️ Practice batch failed, writing records one by one: {e}")
+                return self._flush_each(records)
+
+            with self._lock:
+                self._stats['written'] += len(records)
+                self._stats['batches'] += 1
+            return len(records)
+
+    def _flush_each(self, records):
+        """Write records one at a time so a bad record only loses itself"""
+        written = 0
+        for index, record in enumerate(records):
+            try:
+                self.db.record_practice_batch([record])
+            except sqlite3.OperationalError as e:
+                with self._lock:
+                    self._pending = records[index:] + self._pending
+                    self._stats['errors'] += 1
+                print(f"⚠️ Practice flush deferred: {e}")
+                break
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                    self._stats['dropped'] += 1
+                print(f"❌ Dropped practice record for user {record.get('user_id')}: {e}")
+                continue
+            written += 1
+
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['batches'] += 1 if written else 0
+        return written
+
+    def session_ended(self, session_id=None):
+        """Flush on session end so stats and mastery reflect every answer"""
+        if self.flush_on_session_end:
+            self.flush()
+
+    def stats(self):
+        """Snapshot of queue counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats
+
+    def close(self):
+        """Stop the background worker and write anything still pending"""
+        self._stopped = True
+        self._wake.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=5)
+        self.flush()
+
+    def _ensure_worker(self):
+        if self._worker is not None or self._stopped:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='practice-write-behind', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+DB_METHOD_SECONDS = REGISTRY.histogram('lingualearn_db_method_duration_seconds',
+                                       'Wall time of DatabaseManager methods', ['method'])
+DB_METHOD_ERRORS = REGISTRY.counter('lingualearn_db_method_errors_total',
+                                    'DatabaseManager calls that raised', ['method'])
+instrument_methods(DatabaseManager, DB_METHOD_SECONDS, DB_METHOD_ERRORS)
 
-# Global database instance
-db = DatabaseManager()
+# Global database instance; SQL_PROFILE=true times every statement
+db = DatabaseManager(profiler=SQLProfiler.from_env())
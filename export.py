@@ -0,0 +1,32 @@
+import csv
+import io
+from http_cache import dumps
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+def ndjson_chunks(columns, chunks):
+    """One JSON object per row and line; one bytes string per chunk of rows"""
+    for rows in chunks:
+        yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in rows)
+
+def csv_chunks(columns, chunks):
+    """A header line, then one bytes string of CSV lines per chunk of rows (NULL as empty)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+def encode(format_name, columns, chunks):
+    """Lazily encoded body for `chunks` (lists of row tuples) in one of FORMATS"""
+    if format_name == 'csv':
+        return csv_chunks(columns, chunks)
+    return ndjson_chunks(columns, chunks)
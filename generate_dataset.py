@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Generator for LinguaLearn
+Builds on create_demo_user.py to fill a database with hundreds of thousands
+of users for capacity planning: skewed language popularity, long-tailed
+vocabulary sizes, mastery that drops off with level, and practice history
+with per-user accuracy. Rows are written with executemany in one
+transaction per chunk of users, and the same seed always produces the same
+dataset.
+
+    python generate_dataset.py --users 200000 --db synthetic.db
+    python generate_dataset.py --users 5000 --avg-vocabulary 300 --seed 7 --no-history
+"""
+
+import argparse
+import bisect
+import itertools
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from werkzeug.security import generate_password_hash
+from database import DatabaseManager
+from create_demo_user import SAMPLE_VOCABULARY
+from scheduler import DAY_SECONDS, interval_after
+
+# Relative popularity of the default languages (ids 1-15, see init_database)
+LANGUAGE_WEIGHTS = [30, 18, 12, 8, 6, 5, 6, 4, 5, 2, 2, 1, 0.5, 0.5, 0.5]
+# How many languages a learner studies
+LANGUAGE_COUNT_WEIGHTS = {1: 60, 2: 30, 3: 10}
+# Most words sit at low mastery; few reach the top level
+MASTERY_WEIGHTS = [30, 22, 16, 12, 9, 6, 5]
+DIFFICULTY_WEIGHTS = {'beginner': 60, 'intermediate': 30, 'advanced': 10}
+# Share of users who signed up but never practiced
+INACTIVE_SHARE = 0.2
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ta', 'ri', 'so', 'bu', 'le', 'da', 'po', 'chi', 'ven', 'mar', 'tel', 'sa']
+
+def weighted_picker(values, weights):
+    """pick(rng) -> value; bisect over cumulative weights with a single rng.random().
+
+    random.choices/randrange cost several calls per draw, which dominates
+    generation time at millions of rows.
+    """
+    values = list(values)
+    cumulative = list(itertools.accumulate(weights))
+    total = cumulative[-1]
+    return lambda rng: values[bisect.bisect(cumulative, rng.random() * total)]
+
+pick_language = weighted_picker(range(1, len(LANGUAGE_WEIGHTS) + 1), LANGUAGE_WEIGHTS)
+pick_language_count = weighted_picker(LANGUAGE_COUNT_WEIGHTS, LANGUAGE_COUNT_WEIGHTS.values())
+pick_mastery = weighted_picker(range(len(MASTERY_WEIGHTS)), MASTERY_WEIGHTS)
+pick_difficulty = weighted_picker(DIFFICULTY_WEIGHTS, DIFFICULTY_WEIGHTS.values())
+
+def below(rng, n):
+    """Random int in [0, n)"""
+    return int(rng.random() * n)
+
+def lognormal_count(rng, mean, sigma, maximum):
+    """Long-tailed positive count with the given mean"""
+    mu = math.log(max(mean, 1)) - sigma ** 2 / 2
+    return max(1, min(maximum, int(rng.lognormvariate(mu, sigma))))
+
+def pseudo_word(rng, language_id, index):
+    """A seed word from create_demo_user.py, or a pronounceable made-up one"""
+    samples = SAMPLE_VOCABULARY.get(language_id)
+    if samples and index < len(samples):
+        return samples[index]
+    word = ''.join(SYLLABLES[below(rng, len(SYLLABLES))] for _ in range(2 + below(rng, 3)))
+    return f'{word}{index}', f'meaning of {word}'
+
+class TimestampFactory:
+    """SQLite timestamps within the last `days` days before `end`"""
+    def __init__(self, end, days):
+        self.end = datetime.combine(end, datetime.min.time())
+        self.days = max(1, days)
+        self._day_strings = {}
+
+    def day(self, days_ago):
+        text = self._day_strings.get(days_ago)
+        if text is None:
+            text = self._day_strings[days_ago] = (self.end - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+        return text
+
+    def random(self, rng, max_days_ago=None):
+        """(days_ago, timestamp) at a random time up to max_days_ago days back"""
+        days_ago = below(rng, (self.days - 1 if max_days_ago is None else max_days_ago) + 1)
+        seconds = below(rng, 86400)
+        return days_ago, f'{self.day(days_ago)} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+
+    @staticmethod
+    def after(timestamp, minutes):
+        moment = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S') + timedelta(minutes=minutes)
+        return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+class DatasetGenerator:
+    def __init__(self, db, seed=42, avg_vocabulary=80, max_vocabulary=3000, avg_sessions=12,
+                 max_sessions=500, history=True, days=180, end_date=None, prefix='synth_',
+                 password='password123'):
+        self.db = db
+        self.seed = seed
+        self.avg_vocabulary = avg_vocabulary
+        self.max_vocabulary = max_vocabulary
+        self.avg_sessions = avg_sessions
+        self.max_sessions = max_sessions
+        self.history = history
+        self.prefix = prefix
+        self.timestamps = TimestampFactory(end_date or date.today(), days)
+        self.end_time = self.timestamps.end.timestamp()
+        # One hash for every synthetic user; hashing per user would dominate the run
+        self.password_hash = generate_password_hash(password)
+        self.counts = {'users': 0, 'user_languages': 0, 'vocabulary': 0, 'sentences': 0,
+                       'learning_sessions': 0, 'practice_records': 0}
+
+    def user_rng(self, index):
+        # Independent stream per user, so chunk size does not change the data
+        return random.Random(self.seed * 1000003 + index)
+
+    def plan_user(self, index):
+        """Everything about one user except database ids"""
+        rng = self.user_rng(index)
+        language_count = pick_language_count(rng)
+        languages = []
+        while len(languages) < language_count:
+            language_id = pick_language(rng)
+            if language_id not in languages:
+                languages.append(language_id)
+
+        signup_days_ago, created_at = self.timestamps.random(rng)
+        plan = {'rng': rng, 'created_at': created_at, 'signup_days_ago': signup_days_ago,
+                'languages': languages, 'accuracy': rng.betavariate(7, 3),
+                'active': rng.random() >= INACTIVE_SHARE}
+
+        plan['vocabulary'] = {}
+        plan['sentences'] = {}
+        for position, language_id in enumerate(languages):
+            # Later languages get less attention
+            vocab_count = lognormal_count(rng, self.avg_vocabulary / (position + 1), 1.0, self.max_vocabulary)
+            plan['vocabulary'][language_id] = vocab_count
+            plan['sentences'][language_id] = vocab_count // 4
+        return plan
+
+    def generate(self, users, chunk_users=1000, defer_stats=True):
+        """Write `users` users in chunks; returns elapsed seconds"""
+        if defer_stats:
+            with self.db.deferred_user_stats():
+                elapsed = self._generate(users, chunk_users)
+            print("   user_stats rebuilt")
+            return elapsed
+        return self._generate(users, chunk_users)
+
+    def _generate(self, users, chunk_users):
+        conn = self.db.get_connection()
+        conn.execute('PRAGMA synchronous = OFF')
+        existing = conn.execute('SELECT COUNT(*) FROM users WHERE substr(username, 1, ?) = ?',
+                                (len(self.prefix), self.prefix)).fetchone()[0]
+        if existing:
+            conn.close()
+            raise ValueError(f"Database already has {existing} users named {self.prefix}*; "
+                             f"use another --prefix or a fresh --db")
+
+        started = time.perf_counter()
+        try:
+            for chunk_start in range(0, users, chunk_users):
+                chunk = range(chunk_start, min(users, chunk_start + chunk_users))
+                self._write_chunk(conn, chunk)
+                done = chunk.stop
+                elapsed = time.perf_counter() - started
+                rate = done / elapsed if elapsed else 0
+                eta = (users - done) / rate if rate else 0
+                print(f"   {done:,}/{users:,} users | {self.counts['vocabulary']:,} words | "
+                      f"{self.counts['practice_records']:,} records | {rate:,.0f} users/s | ETA {eta:,.0f}s",
+                      end='\r', flush=True)
+            print()
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('ANALYZE')
+            conn.commit()
+        finally:
+            conn.close()
+        return time.perf_counter() - started
+
+    def _write_chunk(self, conn, chunk):
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        plans = [self.plan_user(index) for index in chunk]
+
+        cursor.executemany('''INSERT INTO users (username, email, password_hash, created_at)
+                              VALUES (?, ?, ?, ?)''',
+                           [(f'{self.prefix}{index:07d}', f'{self.prefix}{index:07d}@example.com',
+                             self.password_hash, plan['created_at']) for index, plan in zip(chunk, plans)])
+        first_user = cursor.execute('SELECT last_insert_rowid()').fetchone()[0] - len(plans) + 1
+
+        language_rows, vocab_rows, sentence_rows = [], [], []
+        for offset, plan in enumerate(plans):
+            user_id = plan['user_id'] = first_user + offset
+            rng = plan['rng']
+            for language_id in plan['languages']:
+                language_rows.append((user_id, language_id, plan['created_at']))
+                for i in range(plan['vocabulary'][language_id]):
+                    word, translation = pseudo_word(rng, language_id, i)
+                    mastery = pick_mastery(rng)
+                    _, created_at = self.timestamps.random(rng, plan['signup_days_ago'])
+                    # Reviewed words are spread around their due date, so about half are due now
+                    interval = interval_after(mastery)
+                    next_due = (self.end_time + (rng.random() * 2 - 1) * interval * DAY_SECONDS
+                                if mastery else 0)
+                    vocab_rows.append((user_id, language_id, word, translation, pick_difficulty(rng),
+                                       mastery, mastery * 2 + below(rng, 3), created_at,
+                                       mastery, interval, next_due))
+                for i in range(plan['sentences'][language_id]):
+                    _, created_at = self.timestamps.random(rng, plan['signup_days_ago'])
+                    sentence_rows.append((user_id, language_id, f'Frase {i} del usuario {user_id}.',
+                                          f'Sentence {i} of user {user_id}.',
+                                          pick_difficulty(rng), below(rng, 6), created_at))
+
+        cursor.executemany('INSERT OR IGNORE INTO user_languages (user_id, language_id, created_at) VALUES (?, ?, ?)',
+                           language_rows)
+        cursor.executemany('''INSERT INTO vocabulary (user_id, language_id, word, translation, difficulty_level,
+                                                      mastery_level, review_count, created_at,
+                                                      repetitions, interval_days, next_due)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', vocab_rows)
+        first_vocab = cursor.execute('SELECT last_insert_rowid()').fetchone()[0] - len(vocab_rows) + 1
+        cursor.executemany('''INSERT INTO sentences (user_id, language_id, sentence, translation,
+                                                     difficulty_level, use_count, created_at)
+                              VALUES (?, ?, ?, ?, ?, ?, ?)''', sentence_rows)
+        first_sentence = cursor.execute('SELECT last_insert_rowid()').fetchone()[0] - len(sentence_rows) + 1
+
+        self.counts['users'] += len(plans)
+        self.counts['user_languages'] += len(language_rows)
+        self.counts['vocabulary'] += len(vocab_rows)
+        self.counts['sentences'] += len(sentence_rows)
+
+        if self.history:
+            self._write_history(cursor, plans, first_vocab, first_sentence)
+        conn.commit()
+
+    def _write_history(self, cursor, plans, first_vocab, first_sentence):
+        """Ended sessions with matching practice records, referencing each user's own rows"""
+        # Id ranges per (user, language), in the order rows were queued above
+        vocab_ranges, sentence_ranges = {}, {}
+        next_vocab, next_sentence = first_vocab, first_sentence
+        for plan in plans:
+            for language_id in plan['languages']:
+                count = plan['vocabulary'][language_id]
+                vocab_ranges[(plan['user_id'], language_id)] = (next_vocab, count)
+                next_vocab += count
+                count = plan['sentences'][language_id]
+                sentence_ranges[(plan['user_id'], language_id)] = (next_sentence, count)
+                next_sentence += count
+
+        sessions, session_records = [], []
+        for plan in plans:
+            if not plan['active']:
+                continue
+            rng = plan['rng']
+            for _ in range(lognormal_count(rng, self.avg_sessions, 1.2, self.max_sessions)):
+                language_id = plan['languages'][below(rng, len(plan['languages']))]
+                sentence_start, sentence_count = sentence_ranges[(plan['user_id'], language_id)]
+                session_type = 'sentences' if sentence_count and rng.random() < 0.3 else 'vocabulary'
+                questions = 5 + below(rng, 26)
+                correct = sum(rng.random() < plan['accuracy'] for _ in range(questions))
+                _, started_at = self.timestamps.random(rng, plan['signup_days_ago'])
+                ended_at = self.timestamps.after(started_at, questions // 2 + 1)
+                sessions.append((plan['user_id'], language_id, session_type, started_at, ended_at,
+                                 questions if session_type == 'vocabulary' else 0,
+                                 questions if session_type == 'sentences' else 0, correct, questions))
+
+                if session_type == 'vocabulary':
+                    start, count = vocab_ranges[(plan['user_id'], language_id)]
+                else:
+                    start, count = sentence_start, sentence_count
+                answers = [True] * correct + [False] * (questions - correct)
+                rng.shuffle(answers)
+                session_records.append([(plan['user_id'], session_type, start + below(rng, count),
+                                         is_correct, 800 + below(rng, 8200), started_at)
+                                        for is_correct in answers])
+
+        cursor.executemany('''INSERT INTO learning_sessions (user_id, language_id, session_type, started_at,
+                                                             ended_at, words_practiced, sentences_practiced,
+                                                             correct_answers, total_questions)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', sessions)
+        first_session = cursor.execute('SELECT last_insert_rowid()').fetchone()[0] - len(sessions) + 1
+
+        record_rows = []
+        for offset, records in enumerate(session_records):
+            session_id = first_session + offset
+            for user_id, session_type, row_id, is_correct, response_ms, practiced_at in records:
+                record_rows.append((user_id, session_id,
+                                    row_id if session_type == 'vocabulary' else None,
+                                    row_id if session_type == 'sentences' else None,
+                                    'answer' if is_correct else 'wrong', 'answer', is_correct,
+                                    response_ms, practiced_at))
+        cursor.executemany('''INSERT INTO practice_records (user_id, session_id, vocabulary_id, sentence_id,
+                                                            user_answer, correct_answer, is_correct,
+                                                            response_time_ms, practiced_at)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', record_rows)
+
+        self.counts['learning_sessions'] += len(sessions)
+        self.counts['practice_records'] += len(record_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic LinguaLearn dataset')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--db', default='synthetic.db', help='Database file (created if missing)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--avg-vocabulary', type=int, default=80, help='Mean words in a learner\'s main language')
+    parser.add_argument('--max-vocabulary', type=int, default=3000)
+    parser.add_argument('--avg-sessions', type=int, default=12, help='Mean sessions per active user')
+    parser.add_argument('--max-sessions', type=int, default=500)
+    parser.add_argument('--days', type=int, default=180, help='Spread history over this many days')
+    parser.add_argument('--end-date', type=date.fromisoformat,
+                        help='Newest history date, YYYY-MM-DD (default today; fix it for identical reruns)')
+    parser.add_argument('--no-history', action='store_true', help='Skip sessions and practice records')
+    parser.add_argument('--chunk-users', type=int, default=1000, help='Users per transaction')
+    parser.add_argument('--live-stats', action='store_true',
+                        help='Keep the user_stats triggers during the load instead of rebuilding at the end')
+    parser.add_argument('--prefix', default='synth_', help='Username prefix')
+    parser.add_argument('--password', default='password123', help='Password for every generated user')
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    generator = DatasetGenerator(db, seed=args.seed, avg_vocabulary=args.avg_vocabulary,
+                                 max_vocabulary=args.max_vocabulary, avg_sessions=args.avg_sessions,
+                                 max_sessions=args.max_sessions, history=not args.no_history,
+                                 days=args.days, end_date=args.end_date, prefix=args.prefix,
+                                 password=args.password)
+
+    print(f"🏭 Generating {args.users:,} users into {args.db} (seed {args.seed})...")
+    try:
+        elapsed = generator.generate(args.users, args.chunk_users, defer_stats=not args.live_stats)
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+    print(f"✅ Done in {elapsed:.1f}s")
+    for table, count in generator.counts.items():
+        print(f"  - {table}: {count:,}")
+    print(f"\n🔑 Log in as {args.prefix}0000000 / {args.password}")
+
+if __name__ == '__main__':
+    main()
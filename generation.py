@@ -0,0 +1,359 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+from database import db
+from llm_client import LLMClient, LLMError, CircuitBreaker
+from metrics import REGISTRY
+from cache import SingleFlight
+from batching import PromptBatcher
+
+def api_key_configured():
+    """Check whether an OpenAI API key is available"""
+    load_dotenv()
+    api_key = os.getenv("APIKEY")
+    return bool(api_key) and api_key != 'your_openai_api_key_here'
+
+# Bump when a prompt below changes so older cached output is no longer served
+PROMPT_TEMPLATE_VERSION = 1
+
+SENTENCES_SYSTEM_PROMPT = "You are a helpful language learning assistant."
+SENTENCES_PROMPT = ("Generate 5 simple sentences in {language_name} using some of these words: {vocab_str}. "
+                    "Make sure each sentence uses 2-3 words from the list. Return only the sentences, one per line.")
+PRACTICE_SYSTEM_PROMPT = ("You are a helpful language learning assistant. "
+                          "Always respond with the format: SENTENCE|TRANSLATION")
+PRACTICE_PROMPT = ("Generate a simple sentence in {language_name} using 2-3 words from this list: {vocab_str}. "
+                   "Also provide the English translation. Return in this exact format: SENTENCE|TRANSLATION")
+
+PRACTICE_POOL_PROMPT = ("Generate {count} different simple sentences in {language_name}, each using 2-3 words "
+                        "from this list: {vocab_str}. Also provide the English translation of each. "
+                        "Return one per line in this exact format: SENTENCE|TRANSLATION")
+
+# Model output is cached in the generation_cache table; a TTL of 0 disables the cache
+GENERATION_CACHE_TTL = float(os.getenv('GENERATION_CACHE_TTL', 86400))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', 10000))
+# Cached variants kept per set of prompt inputs, so repeated requests with
+# the same words still get different sentences
+GENERATION_CACHE_VARIANTS = int(os.getenv('GENERATION_CACHE_VARIANTS', 8))
+
+_cache_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_cache_stats_lock = threading.Lock()
+
+# A user's requests arriving within this many seconds are packed into one prompt.
+# Prompts from different users are never combined (their vocabulary could steer
+# each other's answers), and one user rarely has concurrent requests, so the
+# window would mostly add latency: batching is opt-in and 0 disables it
+GENERATION_BATCH_WINDOW = float(os.getenv('GENERATION_BATCH_WINDOW', 0))
+GENERATION_BATCH_SIZE = int(os.getenv('GENERATION_BATCH_SIZE', 8))
+
+# Concurrent identical generations share one in-flight call
+_single_flight = SingleFlight()
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    """Shared LLM client, configured from the environment on first use"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient(
+                    base_url=os.getenv('LLM_BASE_URL', 'https://api.openai.com/v1'),
+                    model=os.getenv('LLM_MODEL', 'gpt-4'),
+                    timeout=float(os.getenv('LLM_TIMEOUT', 30)),
+                    pool_size=int(os.getenv('LLM_POOL_SIZE', 10)),
+                    max_retries=int(os.getenv('LLM_MAX_RETRIES', 3)),
+                    backoff_base=float(os.getenv('LLM_BACKOFF_BASE', 0.5)),
+                    backoff_max=float(os.getenv('LLM_BACKOFF_MAX', 8)),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.getenv('LLM_BREAKER_THRESHOLD', 5)),
+                        reset_timeout=float(os.getenv('LLM_BREAKER_RESET', 30))
+                    )
+                )
+    return _llm_client
+
+LLM_CALL_SECONDS = REGISTRY.histogram('lingualearn_llm_call_duration_seconds',
+                                      'Wall time of call_openai_api, including retries', ['outcome'])
+LLM_CALL_ERRORS = REGISTRY.counter('lingualearn_llm_call_errors_total',
+                                   'Failed call_openai_api calls by HTTP status or error type', ['error'])
+
+def call_openai_api(messages, max_tokens=200):
+    """Call the OpenAI chat completions API through the shared keep-alive client"""
+    api_key = os.getenv("APIKEY")
+    if not api_key or api_key == 'your_openai_api_key_here':
+        raise ValueError("OpenAI API key not configured")
+
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = get_llm_client().chat_completion(messages, max_tokens=max_tokens, api_key=api_key)
+        outcome = 'ok'
+        return response
+    except LLMError as e:
+        LLM_CALL_ERRORS.inc(str(e.status_code) if e.status_code else type(e).__name__)
+        raise
+    except Exception as e:
+        LLM_CALL_ERRORS.inc(type(e).__name__)
+        raise
+    finally:
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, outcome)
+
+def _single_completion(messages, max_tokens):
+    response_data = call_openai_api(messages, max_tokens=max_tokens)
+    return response_data['choices'][0]['message']['content']
+
+_batcher = PromptBatcher(_single_completion, window=GENERATION_BATCH_WINDOW,
+                         max_batch=GENERATION_BATCH_SIZE)
+
+def complete(messages, max_tokens=200, user_id=None):
+    """Reply text for a chat prompt, batched with the same user's concurrent prompts when enabled"""
+    if GENERATION_BATCH_WINDOW > 0 and GENERATION_BATCH_SIZE > 1:
+        # A batched call and a fallback call of its own, so a dead dispatcher cannot block forever
+        timeout = GENERATION_BATCH_WINDOW + 2 * get_llm_client().max_call_seconds()
+        return _batcher.submit(messages, max_tokens, timeout=timeout, group=user_id)
+    return _single_completion(messages, max_tokens)
+
+def batch_stats():
+    return _batcher.stats()
+
+def generation_cache_key(kind, language_name, difficulty_level, words, variant=0):
+    """Hash of the normalized prompt inputs and a variant number; word order and case do not matter"""
+    normalized = {
+        'kind': kind,
+        'language': (language_name or '').strip().lower(),
+        'difficulty': (difficulty_level or '').strip().lower(),
+        'vocabulary': sorted({word.strip().lower() for word in words if word and word.strip()}),
+        'variant': variant,
+        'version': PROMPT_TEMPLATE_VERSION,
+    }
+    encoded = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def cached_completion(cache_key, messages, max_tokens, is_valid=bool, user_id=None):
+    """Model output for messages, served from the generation cache when possible.
+
+    Only output accepted by is_valid is stored, so a malformed reply is
+    retried on the next request instead of being served for the whole TTL.
+    Concurrent misses for the same key wait for a single upstream call.
+    """
+    return _single_flight.do(('completion', cache_key), _cached_completion,
+                             cache_key, messages, max_tokens, is_valid, user_id)
+
+def _cached_completion(cache_key, messages, max_tokens, is_valid, user_id):
+    if GENERATION_CACHE_TTL > 0:
+        content = db.get_cached_generation(cache_key, GENERATION_CACHE_TTL)
+        with _cache_stats_lock:
+            _cache_stats['hits' if content is not None else 'misses'] += 1
+        if content is not None:
+            return content
+
+    content = complete(messages, max_tokens=max_tokens, user_id=user_id)
+
+    if GENERATION_CACHE_TTL > 0 and content and is_valid(content):
+        evicted = db.store_cached_generation(cache_key, content, GENERATION_CACHE_TTL,
+                                             GENERATION_CACHE_MAX_ENTRIES)
+        with _cache_stats_lock:
+            _cache_stats['stores'] += 1
+            _cache_stats['evictions'] += evicted
+    return content
+
+def single_flight_stats():
+    """How many generation calls were coalesced into another in-flight call"""
+    return _single_flight.stats()
+
+def cache_stats():
+    """Generation cache counters, including the hit rate"""
+    with _cache_stats_lock:
+        stats = dict(_cache_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+def sample_cache_key(kind, language_name, difficulty_level, words):
+    """Cache key for one of GENERATION_CACHE_VARIANTS generations from these words, picked at random"""
+    variant = random.randrange(max(1, GENERATION_CACHE_VARIANTS))
+    return generation_cache_key(kind, language_name, difficulty_level, words, variant)
+
+def generate_sentences(user_id, language_id, difficulty_level='beginner'):
+    """Generate practice sentences from the user's vocabulary and store them.
+
+    Identical concurrent requests from the same user (double clicks, several
+    tabs) share one generation and its stored sentences.
+    """
+    return _single_flight.do(('sentences', user_id, language_id, difficulty_level),
+                             _generate_sentences, user_id, language_id, difficulty_level)
+
+def _generate_sentences(user_id, language_id, difficulty_level):
+    # Get vocabulary for the language
+    vocabulary = db.get_random_vocabulary(user_id, language_id, difficulty_level, 10)
+    print(f"🔍 Debug: Found {len(vocabulary)} vocabulary items")
+
+    if not vocabulary:
+        return {'success': False, 'error': 'No vocabulary found for this language and level'}
+
+    # Get language name
+    language = db.get_language(language_id)
+    language_name = language['name'] if language else 'Unknown'
+    print(f"🔍 Debug: Language name: {language_name}")
+
+    # Generate sentences using OpenAI
+    try:
+        print(f"🔍 Debug: API key loaded: {'Yes' if api_key_configured() else 'No'}")
+
+        if not api_key_configured():
+            return {'success': False, 'error': 'OpenAI API key not configured. Please set your API key in the .env file.'}
+
+        vocab_words = [vocab['word'] for vocab in vocabulary]
+        vocab_str = ", ".join(vocab_words)
+        print(f"🔍 Debug: Using vocabulary words: {vocab_str}")
+
+        prompt = SENTENCES_PROMPT.format(language_name=language_name, vocab_str=vocab_str)
+        cache_key = sample_cache_key('sentences', language_name, difficulty_level, vocab_words)
+
+        print(f"🔍 Debug: Sending request to OpenAI...")
+        try:
+            content = cached_completion(cache_key, [
+                {"role": "system", "content": SENTENCES_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ], max_tokens=200, user_id=user_id)
+        except Exception as e:
+            print(f"❌ Error calling OpenAI API: {str(e)}")
+            return {'success': False, 'error': f'Failed to call OpenAI API: {str(e)}'}
+
+        if content:
+            generated_sentences = content.strip().split('\n')
+            generated_sentences = [s.strip() for s in generated_sentences if s and s.strip()]
+        else:
+            generated_sentences = []
+
+        print(f"🔍 Debug: Generated {len(generated_sentences)} sentences")
+
+        # Add sentences to database; a cache hit returns the ones stored for this user before
+        stored = db.add_generated_sentences(user_id, language_id, cache_key,
+                                            [(sentence, None) for sentence in generated_sentences],
+                                            difficulty_level)
+        generated_sentences = [row['sentence'] for row in stored]
+
+        return {'success': True, 'sentences': generated_sentences, 'count': len(generated_sentences),
+                'sentence_ids': [row['id'] for row in stored]}
+
+    except Exception as e:
+        print(f"❌ Error in sentence generation: {str(e)}")
+        return {'success': False, 'error': f'Failed to generate sentences: {str(e)}'}
+
+def generate_practice_sentence(user_id, language_id, difficulty_level='beginner'):
+    """Generate a single practice sentence with its translation and store it.
+
+    Identical concurrent requests from the same user share one result.
+    """
+    return _single_flight.do(('practice_sentence', user_id, language_id, difficulty_level),
+                             _generate_practice_sentence, user_id, language_id, difficulty_level)
+
+def _generate_practice_sentence(user_id, language_id, difficulty_level):
+    try:
+        # Get vocabulary for the language
+        vocabulary = db.get_random_vocabulary(user_id, language_id, difficulty_level, 5)
+        print(f"🔍 Debug: Found {len(vocabulary)} vocabulary items for practice")
+
+        if not vocabulary:
+            return {'success': False, 'error': 'No vocabulary found for this language and level'}
+
+        # Get language name
+        language = db.get_language(language_id)
+        language_name = language['name'] if language else 'Unknown'
+        print(f"🔍 Debug: Language name: {language_name}")
+
+        # Generate sentence using OpenAI
+        print(f"🔍 Debug: API key loaded: {'Yes' if api_key_configured() else 'No'}")
+
+        if not api_key_configured():
+            return {'success': False, 'error': 'OpenAI API key not configured. Please set your API key in the .env file.'}
+
+        vocab_words = [vocab['word'] for vocab in vocabulary]
+        vocab_str = ", ".join(vocab_words)
+        print(f"🔍 Debug: Using vocabulary words: {vocab_str}")
+
+        prompt = PRACTICE_PROMPT.format(language_name=language_name, vocab_str=vocab_str)
+        cache_key = sample_cache_key('practice_sentence', language_name, difficulty_level, vocab_words)
+
+        print(f"🔍 Debug: Sending request to OpenAI...")
+        try:
+            content = cached_completion(cache_key, [
+                {"role": "system", "content": PRACTICE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ], max_tokens=100, is_valid=lambda text: '|' in text, user_id=user_id)
+        except Exception as e:
+            print(f"❌ Error calling OpenAI API: {str(e)}")
+            return {'success': False, 'error': f'Failed to call OpenAI API: {str(e)}'}
+
+        if content and '|' in content:
+            parts = content.split('|')
+            if len(parts) >= 2:
+                sentence = parts[0].strip()
+                translation = parts[1].strip()
+
+                print(f"🔍 Debug: Parsed sentence: '{sentence}' | translation: '{translation}'")
+
+                # Add sentence to database, or reuse the one stored for this user on a cache hit
+                stored = db.add_generated_sentences(user_id, language_id, cache_key,
+                                                    [(sentence, translation)], difficulty_level)[0]
+
+                return {
+                    'success': True,
+                    'sentence': stored['sentence'],
+                    'translation': stored['translation'],
+                    'sentence_id': stored['id']
+                }
+
+        print(f"🔍 Debug: Failed to parse OpenAI response properly")
+        return {'success': False, 'error': 'Failed to generate sentence'}
+
+    except Exception as e:
+        print(f"❌ Error in practice sentence generation: {str(e)}")
+        return {'success': False, 'error': f'Failed to generate sentence: {str(e)}'}
+
+def parse_sentence_pairs(content):
+    """Parse SENTENCE|TRANSLATION lines, skipping anything malformed"""
+    pairs = []
+    for line in (content or '').split('\n'):
+        parts = line.split('|')
+        if len(parts) >= 2 and parts[0].strip() and parts[1].strip():
+            pairs.append((parts[0].strip(), parts[1].strip()))
+    return pairs
+
+def generate_practice_pool(user_id, language_id, difficulty_level='beginner', count=5):
+    """Generate up to `count` practice sentences in one call and add them to the user's pool.
+
+    Vocabulary is sampled at random and the generation cache is bypassed so
+    successive refills produce different sentences.
+    """
+    vocabulary = db.get_random_vocabulary(user_id, language_id, difficulty_level, 10)
+    if not vocabulary:
+        return {'success': False, 'error': 'No vocabulary found for this language and level'}
+    if not api_key_configured():
+        return {'success': False, 'error': 'OpenAI API key not configured. Please set your API key in the .env file.'}
+
+    language = db.get_language(language_id)
+    language_name = language['name'] if language else 'Unknown'
+    vocab_str = ", ".join(vocab['word'] for vocab in vocabulary)
+    prompt = PRACTICE_POOL_PROMPT.format(count=count, language_name=language_name, vocab_str=vocab_str)
+
+    try:
+        content = complete([
+            {"role": "system", "content": PRACTICE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ], max_tokens=60 * count, user_id=user_id)
+    except Exception as e:
+        print(f"❌ Error refilling sentence pool: {str(e)}")
+        return {'success': False, 'error': f'Failed to call OpenAI API: {str(e)}'}
+
+    pairs = parse_sentence_pairs(content)[:count]
+    if not pairs:
+        return {'success': False, 'error': 'Failed to generate sentences'}
+
+    db.add_pooled_sentences(user_id, language_id, difficulty_level, pairs)
+    return {'success': True, 'count': len(pairs)}
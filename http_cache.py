@@ -0,0 +1,56 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Part of every ETag; bump it when the shape of a conditional response changes
+# so clients revalidate bodies cached from older code
+RESPONSE_FORMAT = 2
+
+def dumps(data):
+    """Compact UTF-8 JSON, through orjson when it is installed (several times faster on long lists)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def make_etag(*parts):
+    """Opaque validator for a response that depends only on `parts`"""
+    key = repr((RESPONSE_FORMAT,) + parts).encode('utf-8')
+    return hashlib.blake2b(key, digest_size=12).hexdigest()
+
+def parse_timestamp(value):
+    """SQLite CURRENT_TIMESTAMP text (UTC) as an aware datetime, or None"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+def is_fresh(etag, last_modified=None):
+    """Whether the client's cached copy (If-None-Match / If-Modified-Since) is still current"""
+    if request.if_none_match:
+        # If-None-Match takes precedence; GET revalidation uses the weak comparison
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+def conditional_json(load, etag, last_modified=None, private=True):
+    """JSON response for load(), or 304 Not Modified without calling load() if the client is current.
+
+    Responses must be revalidated on every use (no-cache), so a changed
+    version is seen immediately, but an unchanged one costs a version
+    lookup instead of a query and serialization.
+    """
+    if is_fresh(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = Response(dumps(load()), mimetype='application/json')
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = f'{"private" if private else "public"}, no-cache'
+    return response
@@ -0,0 +1,127 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+class GenerationJobManager:
+    """Runs slow generation work on a thread pool, persisting job state in generation_jobs.
+
+    Handlers are registered per job type and called as handler(user_id, **params).
+    They return the same dict the synchronous endpoint used to return; a result
+    with success=False marks the job as failed. Finished jobs older than
+    retention_days are deleted at startup and then at most every
+    cleanup_interval seconds, on submit.
+    """
+    def __init__(self, db, max_workers=4, stale_seconds=300, retention_days=7, cleanup_interval=3600):
+        self.db = db
+        self.stale_seconds = stale_seconds
+        self.retention_days = retention_days
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = None
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                            thread_name_prefix='generation-job')
+        self._handlers = {}
+        # Completion events for jobs running in this process, used for long-polling
+        self._events = {}
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'deleted': 0}
+
+    def register(self, job_type, handler):
+        self._handlers[job_type] = handler
+
+    def submit(self, user_id, job_type, **params):
+        """Persist a new job, queue it and return its id immediately"""
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job_id = uuid.uuid4().hex
+        self.db.create_generation_job(job_id, user_id, job_type, params)
+        with self._lock:
+            self._events[job_id] = threading.Event()
+            self._stats['submitted'] += 1
+        self._executor.submit(self._run, job_id, user_id, job_type, params)
+        self.cleanup()
+        return job_id
+
+    def cleanup(self, force=False):
+        """Delete finished jobs past the retention age, unless that ran within cleanup_interval"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_cleanup is not None and now - self._last_cleanup < self.cleanup_interval:
+                return 0
+            self._last_cleanup = now
+
+        deleted = self.db.delete_finished_generation_jobs(self.retention_days)
+        with self._lock:
+            self._stats['deleted'] += deleted
+        return deleted
+
+    def get(self, job_id, user_id=None, wait=0):
+        """Get a job, waiting up to `wait` seconds for it to finish"""
+        job = self.db.get_generation_job(job_id, user_id)
+        deadline = time.monotonic() + wait
+        while job and job['status'] not in FINISHED_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            event = self._events.get(job_id)
+            if event is not None:
+                event.wait(remaining)
+            else:
+                # Job owned by another process - fall back to polling
+                time.sleep(min(0.5, remaining))
+            job = self.db.get_generation_job(job_id, user_id)
+        return job
+
+    def resume_pending(self):
+        """Fail jobs orphaned while running, drop expired ones and queue jobs that never started"""
+        self.db.fail_stale_generation_jobs(self.stale_seconds)
+        self.cleanup(force=True)
+        resumed = 0
+        for job_id in self.db.get_pending_generation_job_ids():
+            job = self.db.get_generation_job(job_id)
+            if job and job['job_type'] in self._handlers:
+                with self._lock:
+                    self._events.setdefault(job_id, threading.Event())
+                self._executor.submit(self._run, job_id, job['user_id'], job['job_type'], job['params'])
+                resumed += 1
+        return resumed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._events)
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id, user_id, job_type, params):
+        try:
+            # Another process may have picked the job up already
+            if not self.db.start_generation_job(job_id):
+                return
+
+            try:
+                result = self._handlers[job_type](user_id, **params)
+            except Exception as e:
+                print(f"❌ Generation job {job_id} crashed: {e}")
+                result = {'success': False, 'error': str(e)}
+
+            succeeded = bool(result and result.get('success'))
+            self.db.finish_generation_job(
+                job_id,
+                'succeeded' if succeeded else 'failed',
+                result,
+                None if succeeded else (result or {}).get('error', 'Generation failed')
+            )
+            with self._lock:
+                self._stats['succeeded' if succeeded else 'failed'] += 1
+        finally:
+            with self._lock:
+                event = self._events.pop(job_id, None)
+            if event is not None:
+                event.set()
@@ -0,0 +1,212 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upstream responses worth retrying; anything else is returned or raised immediately
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+class LLMError(Exception):
+    """Raised when the LLM API cannot produce a response"""
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitOpenError(LLMError):
+    """Raised without contacting the API while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds, then lets a single trial request through."""
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class LLMClient:
+    """Chat-completions client sharing one keep-alive connection pool.
+
+    Transient failures (connection errors, timeouts, 429 and 5xx) are retried
+    with capped exponential backoff and jitter; a Retry-After header sets the
+    minimum wait, and a Retry-After longer than `backoff_max` ends the retries.
+    Consecutive transient failures open the circuit breaker so callers fail
+    fast instead of queueing behind a dead upstream.
+    """
+    def __init__(self, base_url='https://api.openai.com/v1', api_key=None, model='gpt-4',
+                 timeout=30.0, pool_size=10, max_retries=3, backoff_base=0.5,
+                 backoff_max=8.0, breaker=None, sleep=time.sleep, latency_window=1000):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._stats = {'requests': 0, 'succeeded': 0, 'failed': 0, 'attempts': 0,
+                       'retries': 0, 'circuit_rejections': 0}
+
+    def max_call_seconds(self):
+        """Longest a chat_completion() call can take: every attempt timing out, with full backoff between"""
+        return (self.max_retries + 1) * self.timeout + self.max_retries * self.backoff_max
+
+    def chat_completion(self, messages, max_tokens=200, api_key=None, **options):
+        """POST /chat/completions and return the decoded JSON body"""
+        api_key = api_key or self.api_key
+        payload = {'model': self.model, 'messages': messages, 'max_tokens': max_tokens}
+        payload.update(options)
+        headers = {'Content-Type': 'application/json'}
+        if api_key:
+            headers['Authorization'] = f'Bearer {api_key}'
+
+        with self._lock:
+            self._stats['requests'] += 1
+        started = time.perf_counter()
+        try:
+            result = self._post_with_retries(f'{self.base_url}/chat/completions', headers, payload)
+        except LLMError:
+            self._record(started, 'failed')
+            raise
+        self._record(started, 'succeeded')
+        return result
+
+    def _post_with_retries(self, url, headers, payload):
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                with self._lock:
+                    self._stats['circuit_rejections'] += 1
+                raise CircuitOpenError('LLM API circuit breaker is open; try again later')
+
+            with self._lock:
+                self._stats['attempts'] += 1
+            retry_after = None
+            try:
+                response = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.breaker.record_failure()
+                error = LLMError(f'OpenAI API request failed: {e}')
+            else:
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    return response.json()
+
+                error = LLMError(f'OpenAI API error: {response.status_code} - {response.text}',
+                                 response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    # The upstream is healthy; the request itself is bad
+                    self.breaker.record_success()
+                    raise error
+                self.breaker.record_failure()
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            if delay is None:
+                raise error
+
+            attempt += 1
+            with self._lock:
+                self._stats['retries'] += 1
+            self._sleep(delay)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Delay before the next attempt, or None if the server asked us to wait too long"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        if retry_after is not None:
+            if retry_after > self.backoff_max:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    def _record(self, started, outcome):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats[outcome] += 1
+            self._latencies.append(elapsed_ms)
+
+    def stats(self):
+        """Counters plus latency percentiles over the most recent calls"""
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        stats['circuit_state'] = self.breaker.state
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            stats[name] = round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 2) if latencies else None
+        stats['max_ms'] = round(latencies[-1], 2) if latencies else None
+        return stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server for LinguaLearn
+Answers POST /v1/chat/completions with canned sentences so the generation
+path can be load-tested without spending API quota.
+
+    python llm_stub_server.py --port 8089 --latency 0.8 --error-rate 0.05
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 APIKEY=stub python app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _sentence_pairs(count, seed):
+    return [f"Frase de prueba {seed}-{i}|Test sentence {seed}-{i}" for i in range(1, count + 1)]
+
+def fake_completion(messages):
+    """Reply text shaped like what the real prompts ask for"""
+    prompt = messages[-1]['content'] if messages else ''
+    seed = random.randint(1000, 9999)
+
+    # Batched prompt: JSON object of request id -> task
+    try:
+        tasks = json.loads(prompt)
+    except ValueError:
+        tasks = None
+    if isinstance(tasks, dict):
+        return json.dumps({request_id: fake_completion([{'role': 'user', 'content': task}])
+                           for request_id, task in tasks.items()})
+
+    count = re.search(r'Generate (\d+)', prompt)
+    count = int(count.group(1)) if count else 1
+    if 'SENTENCE|TRANSLATION' in prompt:
+        return '\n'.join(_sentence_pairs(count, seed))
+    return '\n'.join(pair.split('|')[0] for pair in _sentence_pairs(count, seed))
+
+class StubLLMServer:
+    """Threaded chat/completions stub with tunable latency, errors and throttling.
+
+    latency/jitter are seconds; error_rate is the fraction of requests answered
+    with a 500; rate_limit caps requests per second, answering the excess with
+    429 and a Retry-After header (0 disables throttling).
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=0.0, retry_after=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'throttled': 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='llm-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _throttled(self):
+        if self.rate_limit <= 0:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            return self._window_count > self.rate_limit
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[outcome] += 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._reply(404, {'error': {'message': 'Not found'}})
+                    return
+
+                if stub._throttled():
+                    stub._count('throttled')
+                    self._reply(429, {'error': {'message': 'Rate limit exceeded'}},
+                                {'Retry-After': str(stub.retry_after)})
+                    return
+
+                delay = stub.latency + random.uniform(-stub.jitter, stub.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+
+                if random.random() < stub.error_rate:
+                    stub._count('errors')
+                    self._reply(500, {'error': {'message': 'Injected stub failure'}})
+                    return
+
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    self._reply(400, {'error': {'message': 'Invalid JSON'}})
+                    return
+                stub._count('ok')
+                content = fake_completion(payload.get('messages', []))
+                self._reply(200, {
+                    'id': f'chatcmpl-stub-{random.randint(0, 1 << 30)}',
+                    'object': 'chat.completion',
+                    'model': payload.get('model', 'stub'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+                })
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local OpenAI-compatible stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds per response (default 0.5)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Random +/- seconds added to latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Requests per second before 429s (0 = unlimited)')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s')
+    args = parser.parse_args()
+
+    stub = StubLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                         args.rate_limit, args.retry_after)
+    print(f"🚀 Stub LLM server listening on {stub.base_url}")
+    print(f"   Set LLM_BASE_URL={stub.base_url} to use it")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {stub.stats}")
+        stub.server.server_close()
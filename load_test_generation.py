@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Load harness for LinguaLearn sentence generation
+Drives /api/practice/generate-sentence or /api/generate-sentences through the
+full app (jobs, pools, cache, batching, LLM client) against the local stub
+server, then reports throughput and latency percentiles.
+
+    python load_test_generation.py --users 20 --requests 200 --concurrency 16
+    python load_test_generation.py --endpoint sentences --stub-error-rate 0.1 --no-pool
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_stub_server import StubLLMServer
+
+ENDPOINTS = {
+    'practice': '/api/practice/generate-sentence',
+    'sentences': '/api/generate-sentences',
+}
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def setup_users(app_module, count, words_per_user):
+    """Create users with one language and some vocabulary; returns their credentials"""
+    db = app_module.db
+    users = []
+    for i in range(count):
+        username = f'load_user_{i}'
+        user_id = db.create_user(username, f'{username}@example.com', 'loadtest')
+        db.add_user_language(user_id, 1)
+        db.add_vocabulary_bulk(user_id, 1, [{'word': f'palabra{j}', 'translation': f'word{j}'}
+                                            for j in range(words_per_user)])
+        users.append(username)
+    return users
+
+def login_sessions(app_module, users):
+    """Log each user in once and return their session cookies, so password
+    hashing stays out of the measured requests"""
+    cookies = []
+    for username in users:
+        client = app_module.app.test_client()
+        client.post('/login', json={'username': username, 'password': 'loadtest'})
+        cookies.append(client.get_cookie('session').value)
+    return cookies
+
+def run_load(app_module, cookies, endpoint, total_requests, concurrency):
+    """Fire total_requests generation requests; returns (latencies_ms, outcomes, wall_seconds)"""
+    local = threading.local()
+    latencies, outcomes = [], {'succeeded': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def client_for(user_index):
+        # Test clients are not thread-safe, so each worker keeps its own per user
+        clients = getattr(local, 'clients', None)
+        if clients is None:
+            clients = local.clients = {}
+        if user_index not in clients:
+            client = app_module.app.test_client()
+            client.set_cookie('session', cookies[user_index])
+            clients[user_index] = client
+        return clients[user_index]
+
+    def one_request(i):
+        client = client_for(i % len(cookies))
+        started = time.perf_counter()
+        response = client.post(endpoint, json={'language_id': 1, 'difficulty_level': 'beginner'})
+        body = response.get_json() or {}
+        if response.status_code == 202:
+            job = {}
+            for _ in range(10):
+                job = client.get(f"{body['status_url']}?wait=30").get_json()['job']
+                if job['status'] in ('succeeded', 'failed'):
+                    break
+            ok = job.get('status') == 'succeeded'
+        else:
+            ok = response.status_code == 200 and body.get('success', False)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            outcomes['succeeded' if ok else 'failed'] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total_requests)))
+    return latencies, outcomes, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the sentence generation path against a stub LLM')
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='practice')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100, help='Total generation requests')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--words', type=int, default=30, help='Vocabulary words per user')
+    parser.add_argument('--base-url', help='Use an already running LLM endpoint instead of the stub')
+    parser.add_argument('--stub-latency', type=float, default=0.5)
+    parser.add_argument('--stub-jitter', type=float, default=0.1)
+    parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    parser.add_argument('--stub-rate-limit', type=float, default=0.0)
+    parser.add_argument('--no-pool', action='store_true', help='Disable pre-generated sentence pools')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the generation cache')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    stub = None
+    if args.base_url:
+        os.environ['LLM_BASE_URL'] = args.base_url
+    else:
+        stub = StubLLMServer(latency=args.stub_latency, jitter=args.stub_jitter,
+                             error_rate=args.stub_error_rate, rate_limit=args.stub_rate_limit).start()
+        os.environ['LLM_BASE_URL'] = stub.base_url
+        os.environ.setdefault('APIKEY', 'stub-key')
+    if args.no_pool:
+        os.environ['SENTENCE_POOL_DEPTH'] = '0'
+    if args.no_cache:
+        os.environ['GENERATION_CACHE_TTL'] = '0'
+    os.environ.setdefault('GENERATION_WORKERS', str(args.concurrency))
+
+    # The app opens language_learning.db in the working directory; keep it throwaway
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix='lingualearn-load-')
+    os.chdir(workdir)
+    import app as app_module
+    import generation
+
+    print(f"🔧 Seeding {args.users} users in {workdir}...")
+    users = setup_users(app_module, args.users, args.words)
+    cookies = login_sessions(app_module, users)
+
+    print(f"🚀 Sending {args.requests} requests to {ENDPOINTS[args.endpoint]} "
+          f"with concurrency {args.concurrency} (LLM at {os.environ['LLM_BASE_URL']})")
+    latencies, outcomes, wall = run_load(app_module, cookies, ENDPOINTS[args.endpoint],
+                                         args.requests, args.concurrency)
+
+    latencies.sort()
+    results = {
+        'endpoint': ENDPOINTS[args.endpoint],
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'users': args.users,
+        **outcomes,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(args.requests / wall, 2) if wall else None,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'llm_client': generation.get_llm_client().stats(),
+        'single_flight': generation.single_flight_stats(),
+        'batching': generation.batch_stats(),
+        'generation_cache': generation.cache_stats(),
+        'sentence_pool': app_module.sentence_pool.stats(),
+        'stub': dict(stub.stats) if stub else None,
+    }
+
+    print(f"\n📊 {outcomes['succeeded']} succeeded, {outcomes['failed']} failed in {results['wall_seconds']}s "
+          f"({results['throughput_rps']} req/s)")
+    print(f"   p50 {results['p50_ms']} ms | p95 {results['p95_ms']} ms | "
+          f"p99 {results['p99_ms']} ms | max {results['max_ms']} ms")
+    print(f"   upstream calls: {results['llm_client']['attempts']} "
+          f"(retries {results['llm_client']['retries']}, batches {results['batching']['batches']}, "
+          f"coalesced {results['single_flight']['shared']})")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {output}")
+
+    app_module.sentence_pool.shutdown()
+    app_module.generation_jobs.shutdown()
+    if stub:
+        stub.stop()
+    app_module.practice_writer.close()
+    app_module.db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Statistics rebuild script for LinguaLearn
+Backfills or verifies the materialized user_stats table
+"""
+
+import argparse
+import sys
+from database import db
+
+def check_stats(user_id=None):
+    """Report user_stats rows that disagree with the base tables"""
+    print("🔍 Checking user statistics...")
+    mismatches = db.check_user_stats(user_id)
+
+    if not mismatches:
+        print("✅ User statistics are consistent")
+        return True
+
+    print(f"❌ Found {len(mismatches)} inconsistent rows:")
+    for mismatch in mismatches[:20]:
+        print(f"  - user {mismatch['user_id']}, language {mismatch['language_id']}: "
+              f"expected {mismatch['expected']}, found {mismatch['actual']}")
+    return False
+
+def rebuild_stats(user_id=None):
+    """Recompute user_stats from vocabulary and learning_sessions"""
+    print("🔄 Rebuilding user statistics...")
+    rows = db.rebuild_user_stats(user_id)
+    print(f"✅ Rebuilt {rows} statistics rows")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild or check the user_stats table')
+    parser.add_argument('--check', action='store_true', help='Only check consistency, do not rebuild')
+    parser.add_argument('--user-id', type=int, help='Limit to a single user')
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check_stats(args.user_id) else 1)
+    rebuild_stats(args.user_id)
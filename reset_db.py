@@ -5,16 +5,24 @@ Use this if you encounter database issues and want to start fresh
 """
 
 import os
-from database import DatabaseManager
+from database import DatabaseManager, db as existing_db
 
 def reset_database():
     """Reset the database by removing the file and reinitializing"""
     db_file = 'language_learning.db'
     
+    # Release pooled connections so the WAL is checkpointed before deleting
+    existing_db.close()
+    
     if os.path.exists(db_file):
         print(f"Removing existing database: {db_file}")
         os.remove(db_file)
     
+    # Remove leftover write-ahead log files so they are not replayed into the new database
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    
     print("Creating new database...")
     db = DatabaseManager()
     db.init_database()
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+DAY_SECONDS = 86400
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MAX_INTERVAL_DAYS = 365
+# A forgotten word comes back within the same practice session
+RELEARN_SECONDS = 600
+# Correct answers faster than FAST_ANSWER_MS count as easy, slower than SLOW_ANSWER_MS as hard
+FAST_ANSWER_MS = 4000
+SLOW_ANSWER_MS = 15000
+
+ReviewState = namedtuple('ReviewState', 'ease_factor interval_days repetitions next_due')
+
+def answer_quality(is_correct, response_time_ms=None):
+    """SM-2 recall quality (0-5) of a practice answer"""
+    if not is_correct:
+        return 1
+    if response_time_ms is None or response_time_ms <= 0:
+        return 4
+    if response_time_ms <= FAST_ANSWER_MS:
+        return 5
+    if response_time_ms >= SLOW_ANSWER_MS:
+        return 3
+    return 4
+
+def interval_after(repetitions, ease_factor=DEFAULT_EASE):
+    """Days until the next review after `repetitions` correct answers in a row"""
+    if repetitions <= 0:
+        return 0
+    if repetitions == 1:
+        return 1
+    return min(MAX_INTERVAL_DAYS, 6 * ease_factor ** (repetitions - 2))
+
+def review(ease_factor, interval_days, repetitions, quality, now):
+    """ReviewState after answering with `quality` at unix time `now` (SM-2).
+
+    A correct answer (quality >= 3) grows the interval by the ease factor
+    after the 1 and 6 day steps; a wrong one resets the streak and brings
+    the word back after RELEARN_SECONDS. The ease factor moves with the
+    quality of each answer and never drops below MIN_EASE.
+    """
+    ease_factor = max(MIN_EASE, ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ReviewState(ease_factor, 0, 0, now + RELEARN_SECONDS)
+
+    repetitions += 1
+    if repetitions <= 2:
+        interval_days = interval_after(repetitions)
+    else:
+        interval_days = min(MAX_INTERVAL_DAYS, max(interval_days, 1) * ease_factor)
+    return ReviewState(ease_factor, interval_days, repetitions, now + interval_days * DAY_SECONDS)
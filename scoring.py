@@ -0,0 +1,193 @@
+import re
+import string
+import unicodedata
+from functools import lru_cache
+
+# Share of the expected answer's key words that must be matched to count as correct
+CORRECT_THRESHOLD = 0.6
+# Minimum similarity (1 - edit distance / longer length) for a misspelled word to count
+FUZZY_THRESHOLD = 0.8
+# Words this short are skipped as key words unless nothing longer is left
+MIN_KEY_WORD_LENGTH = 3
+
+def _char_class(predicate, limit=0x10000):
+    """Regex character-class body for every BMP character matching predicate"""
+    ranges, start = [], None
+    for code in range(limit + 1):
+        if code < limit and predicate(chr(code)):
+            if start is None:
+                start = code
+        elif start is not None:
+            ranges.append(re.escape(chr(start)) if start == code - 1
+                          else f'{re.escape(chr(start))}-{re.escape(chr(code - 1))}')
+            start = None
+    return ''.join(ranges)
+
+# ASCII answers (most of them) skip the Unicode regexes
+_ASCII_PUNCTUATION = bytes.maketrans(string.punctuation.encode(), b' ' * len(string.punctuation))
+# \w does not cover combining marks, which would split Hindi and Arabic words apart
+_MARKS = _char_class(lambda char: unicodedata.category(char).startswith('M'))
+# Han, Hiragana, Katakana and their half-width/compatibility forms are written
+# without spaces, so each character becomes a token of its own
+_CJK_CHAR = (r'\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff'
+             r'\uf900-\ufaff\uff66-\uff9f')
+_TOKEN = re.compile(rf'[{_CJK_CHAR}]|(?:[^\W_{_CJK_CHAR}]|[{_MARKS}])+')
+# Scripts where one or two characters already make a full word
+_DENSE_SCRIPT = re.compile(rf'[{_CJK_CHAR}\u1100-\u11ff\u3130-\u318f\uac00-\ud7af]')
+
+# Per-language clean-up applied after normalize(), by ISO 639-1 code
+_ARABIC_DIACRITICS = re.compile(r'[\u064b-\u0652\u0670\u0640]')
+# Korean attaches case particles to the word; strip the common ones so 학교에 matches 학교
+_KOREAN_PARTICLE = re.compile(r'(?<=[\uac00-\ud7af])(?:에서|에게|한테|께서|까지|부터|으로|은|는|이|가|을|를|에|의|도|로|와|과|만)$')
+
+def _strip_korean_particles(tokens):
+    return [_KOREAN_PARTICLE.sub('', token) if len(token) > 1 else token for token in tokens]
+
+LANGUAGE_RULES = {
+    'ar': {'normalize': lambda text: _ARABIC_DIACRITICS.sub('', text)},
+    'ko': {'tokens': _strip_korean_particles},
+}
+
+def normalize(text):
+    """Case-folded, NFKC-normalized text with punctuation replaced by spaces"""
+    if text.isascii():
+        return text.lower().encode().translate(_ASCII_PUNCTUATION).decode()
+    return ' '.join(_TOKEN.findall(unicodedata.normalize('NFKC', text).casefold()))
+
+def tokenize(text, language=None):
+    """Words of `text`, one token per character for Chinese/Japanese script.
+
+    `language` is an ISO 639-1 code selecting any extra rules from LANGUAGE_RULES.
+    """
+    rules = LANGUAGE_RULES.get(language)
+    if text.isascii():
+        return text.lower().encode().translate(_ASCII_PUNCTUATION).decode().split()
+    text = unicodedata.normalize('NFKC', text).casefold()
+    if rules and 'normalize' in rules:
+        text = rules['normalize'](text)
+    tokens = _TOKEN.findall(text)
+    if rules and 'tokens' in rules:
+        tokens = rules['tokens'](tokens)
+    return tokens
+
+@lru_cache(maxsize=4096)
+def _token_set(text, language):
+    return frozenset(tokenize(text, language))
+
+@lru_cache(maxsize=4096)
+def _key_words(text, language):
+    """Distinct tokens of an expected answer that must appear in a correct reply"""
+    tokens = _token_set(text, language)
+    if text.isascii():
+        key_words = {token for token in tokens if len(token) >= MIN_KEY_WORD_LENGTH}
+    else:
+        key_words = {token for token in tokens
+                     if len(token) >= MIN_KEY_WORD_LENGTH or _DENSE_SCRIPT.match(token)}
+    return frozenset(key_words) if key_words else tokens
+
+def edit_distance(a, b, limit=None):
+    """Edit distance between a and b counting a swap of adjacent letters as one edit.
+
+    Stops early and returns limit + 1 once the distance is known to exceed `limit`.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is None:
+        limit = len(a)
+    if len(a) - len(b) > limit:
+        return limit + 1
+
+    # Shared prefixes and suffixes never change the distance
+    start = 0
+    while start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    if start or end_b < len(b):
+        # Keep one shared character on each side so adjacent swaps are still seen
+        start = max(start - 1, 0)
+        end_a, end_b = min(end_a + 1, len(a)), min(end_b + 1, len(b))
+        a, b = a[start:end_a], b[start:end_b]
+
+    # Only cells within `limit` of the diagonal can stay under the limit
+    n, m, cap = len(a), len(b), limit + 1
+    before, previous = None, [j if j <= limit else cap for j in range(m + 1)]
+    for i in range(1, n + 1):
+        char_a = a[i - 1]
+        current = [cap] * (m + 1)
+        current[0] = row_min = i if i <= limit else cap
+        for j in range(max(1, i - limit), min(m, i + limit) + 1):
+            char_b = b[j - 1]
+            cost = previous[j - 1] + (char_a != char_b)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if (i > 1 and j > 1 and char_a != char_b and char_a == b[j - 2] and a[i - 2] == char_b
+                    and before[j - 2] + 1 < cost):
+                cost = before[j - 2] + 1
+            if cost > cap:
+                cost = cap
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return cap
+        before, previous = previous, current
+    return previous[m]
+
+@lru_cache(maxsize=65536)
+def _similarity(word, candidate, limit):
+    """1 - edit distance / longer length, or 0.0 when more than `limit` edits apart"""
+    distance = edit_distance(word, candidate, limit)
+    return 1 - distance / max(len(word), len(candidate)) if distance <= limit else 0.0
+
+def _fuzzy_credit(word, candidates, slack):
+    """Best similarity of `word` to any candidate allowing `slack` edits per character"""
+    best = 0.0
+    for candidate in candidates:
+        # Most pairs are too short or too different in length to ever match
+        length_a, length_b = len(word), len(candidate)
+        limit = int((length_a if length_a > length_b else length_b) * slack)
+        if limit and -limit <= length_a - length_b <= limit:
+            similarity = _similarity(word, candidate, limit)
+            if similarity > best:
+                best = similarity
+    return best
+
+def score_translation(user_answer, correct_answer, language=None, fuzzy_threshold=FUZZY_THRESHOLD):
+    """Share (0.0 - 1.0) of the correct answer's key words found in the user's answer.
+
+    Exact matches earn full credit and misspellings within `fuzzy_threshold`
+    earn their similarity. `language` is the ISO 639-1 code the answers are
+    written in; Chinese and Japanese script is recognized without it.
+    """
+    if not correct_answer or not user_answer:
+        return 0.0
+    key_words = _key_words(correct_answer, language)
+    if not key_words:
+        return 0.0
+    user_tokens = _token_set(user_answer, language)
+
+    unmatched = key_words - user_tokens
+    credit = len(key_words) - len(unmatched)
+    if unmatched and fuzzy_threshold < 1:
+        # Only words the correct answer does not contain can be misspellings of it
+        candidates = user_tokens - _token_set(correct_answer, language)
+        if candidates:
+            slack = 1 - fuzzy_threshold
+            for word in unmatched:
+                credit += _fuzzy_credit(word, candidates, slack)
+    return round(credit / len(key_words), 4)
+
+def score_translations(pairs, language=None, fuzzy_threshold=FUZZY_THRESHOLD):
+    """score_translation for many (user_answer, correct_answer) pairs"""
+    return [score_translation(user_answer, correct_answer, language, fuzzy_threshold)
+            for user_answer, correct_answer in pairs]
+
+def is_correct(score):
+    return score >= CORRECT_THRESHOLD
@@ -0,0 +1,96 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class SentencePool:
+    """Keeps a pool of pre-generated practice sentences per (user, language, difficulty).
+
+    Pooled sentences live in the sentences table with in_pool = 1 until served.
+    Taking a sentence schedules a background refill once the pool drops below
+    `low_water`; refills top the pool back up to `depth` by calling
+    refill(user_id, language_id, difficulty_level, count), which must store the
+    new sentences and return a result dict with success/count.
+    """
+    def __init__(self, db, refill, depth=5, low_water=2, refill_workers=2):
+        self.db = db
+        self.depth = max(0, depth)
+        self.low_water = min(max(0, low_water), self.depth)
+        self._refill = refill
+        self._executor = ThreadPoolExecutor(max_workers=max(1, refill_workers),
+                                            thread_name_prefix='sentence-pool')
+        # Keys with a refill queued or running, so each pool refills at most once at a time
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'refills': 0, 'refill_failures': 0, 'generated': 0}
+
+    @property
+    def enabled(self):
+        return self.depth > 0
+
+    def take(self, user_id, language_id, difficulty_level):
+        """Serve a pooled sentence (or None if the pool is empty) and top the pool up if needed"""
+        if not self.enabled:
+            return None
+
+        sentence = self.db.take_pooled_sentence(user_id, language_id, difficulty_level)
+        with self._lock:
+            self._stats['hits' if sentence else 'misses'] += 1
+        self.ensure_filled(user_id, language_id, difficulty_level)
+        return sentence
+
+    def ensure_filled(self, user_id, language_id, difficulty_level):
+        """Queue a refill if the pool is below the low-water mark; returns True if one was queued"""
+        if not self.enabled:
+            return False
+
+        key = (user_id, language_id, difficulty_level)
+        with self._lock:
+            if key in self._refilling:
+                return False
+            self._refilling.add(key)
+
+        queued = False
+        try:
+            if self.db.count_pooled_sentences(*key) >= self.low_water:
+                return False
+            self._executor.submit(self._run_refill, key)
+            queued = True
+            return True
+        finally:
+            # _run_refill releases the key once a queued refill finishes
+            if not queued:
+                with self._lock:
+                    self._refilling.discard(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['refilling'] = len(self._refilling)
+        stats.update(depth=self.depth, low_water=self.low_water)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run_refill(self, key):
+        try:
+            missing = self.depth - self.db.count_pooled_sentences(*key)
+            if missing <= 0:
+                return
+
+            try:
+                result = self._refill(*key, count=missing)
+            except Exception as e:
+                print(f"❌ Sentence pool refill crashed: {e}")
+                result = {'success': False, 'error': str(e)}
+
+            with self._lock:
+                if result and result.get('success'):
+                    self._stats['refills'] += 1
+                    self._stats['generated'] += result.get('count', 0)
+                else:
+                    self._stats['refill_failures'] += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
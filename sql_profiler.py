@@ -0,0 +1,232 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+# Literals and IN lists vary per call; replacing them groups a query's executions together
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+# Statements EXPLAIN QUERY PLAN has something to say about
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+# Trace events that are not executions of the profiled statement
+_UNTRACED = ('BEGIN', 'COMMIT', 'ROLLBACK', 'EXPLAIN')
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """SQL with literals replaced by ?, IN lists collapsed and whitespace squeezed"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+class SQLProfiler:
+    """Times every statement run on connections opened through `connection_factory`.
+
+    Executions are aggregated by normalize_sql() text. A statement whose
+    execute plus fetches take longer than `slow_ms` is logged once with its
+    EXPLAIN QUERY PLAN. Between start_request() and end_request() each
+    thread also collects a per-request summary. SQLite's trace hook reports
+    the steps of any trigger a statement fires as repeats of that statement;
+    they are counted as the statement's trigger_steps.
+    """
+    def __init__(self, slow_ms=100.0, explain=True, max_slow_queries=100, log=print):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.log = log
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._slow = deque(maxlen=max_slow_queries)
+        self._plans = {}
+        self._local = threading.local()
+        self.connection_factory = _connection_class(self)
+
+    @classmethod
+    def from_env(cls):
+        """A profiler when SQL_PROFILE=true, else None"""
+        if os.getenv('SQL_PROFILE', 'false').lower() != 'true':
+            return None
+        return cls(slow_ms=float(os.getenv('SQL_SLOW_MS', 100)),
+                   explain=os.getenv('SQL_PROFILE_EXPLAIN', 'true').lower() == 'true')
+
+    def attach(self, conn):
+        """Install the trace hook on a connection opened with connection_factory"""
+        conn.set_trace_callback(self._trace)
+
+    def start_request(self):
+        self._local.request = {'queries': 0, 'time_ms': 0.0, 'statements': {}}
+
+    def end_request(self):
+        """Summary of the statements this thread ran since start_request(), or None"""
+        request = getattr(self._local, 'request', None)
+        self._local.request = None
+        if request is None:
+            return None
+        statements = sorted(request['statements'].items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            'queries': request['queries'],
+            'time_ms': round(request['time_ms'], 3),
+            'statements': [{'sql': sql, 'calls': calls, 'time_ms': round(elapsed, 3)}
+                           for sql, (calls, elapsed) in statements],
+        }
+
+    def stats(self, limit=20):
+        """Aggregates for the `limit` statements with the most total time"""
+        with self._lock:
+            statements = [dict(entry, sql=sql) for sql, entry in self._statements.items()]
+            slow = list(self._slow)
+        statements.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        for entry in statements:
+            entry['avg_ms'] = round(entry['total_ms'] / entry['calls'], 3) if entry['calls'] else 0.0
+            entry['total_ms'] = round(entry['total_ms'], 3)
+            entry['max_ms'] = round(entry['max_ms'], 3)
+        return {'statements': statements[:limit], 'distinct_statements': len(statements),
+                'slow_queries': slow, 'slow_ms': self.slow_ms}
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+
+    # Called by the profiled cursor
+
+    def _begin(self, cursor, sql, parameters):
+        sql_text = normalize_sql(sql)
+        self._local.current = cursor
+        # normalized text, sql, parameters, elapsed ms, logged as slow, last traced text
+        cursor._profile = [sql_text, sql, parameters, 0.0, False, None]
+        with self._lock:
+            entry = self._statements.get(sql_text)
+            if entry is None:
+                entry = self._statements[sql_text] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                      'rows': 0, 'trigger_steps': 0}
+            entry['calls'] += 1
+        request = getattr(self._local, 'request', None)
+        if request is not None:
+            request['queries'] += 1
+            counts = request['statements'].setdefault(sql_text, [0, 0.0])
+            counts[0] += 1
+
+    def _add(self, cursor, elapsed_ms, rows=0):
+        profile = cursor._profile
+        if profile is None:
+            return
+        profile[3] += elapsed_ms
+        sql_text = profile[0]
+        with self._lock:
+            entry = self._statements.get(sql_text)
+            if entry is None:
+                # reset() ran while this statement was open
+                return
+            entry['total_ms'] += elapsed_ms
+            entry['rows'] += rows
+            if profile[3] > entry['max_ms']:
+                entry['max_ms'] = profile[3]
+        request = getattr(self._local, 'request', None)
+        if request is not None:
+            request['time_ms'] += elapsed_ms
+            counts = request['statements'].get(sql_text)
+            if counts is not None:
+                counts[1] += elapsed_ms
+        if not profile[4] and profile[3] >= self.slow_ms:
+            profile[4] = True
+            self._log_slow(cursor.connection, profile)
+
+    def _trace(self, statement):
+        if statement.startswith(_UNTRACED):
+            return
+        cursor = getattr(self._local, 'current', None)
+        profile = cursor._profile if cursor is not None else None
+        if profile is None:
+            return
+        if statement != profile[5]:
+            profile[5] = statement
+            return
+        with self._lock:
+            entry = self._statements.get(profile[0])
+            if entry is not None:
+                entry['trigger_steps'] += 1
+
+    def _log_slow(self, conn, profile):
+        sql_text, sql, parameters, elapsed_ms = profile[:4]
+        plan = self._plan(conn, sql_text, sql, parameters)
+        with self._lock:
+            self._slow.append({'sql': sql_text, 'time_ms': round(elapsed_ms, 3), 'plan': plan,
+                               'at': time.time()})
+        if self.log:
+            self.log(f"🐢 Slow query ({elapsed_ms:.1f} ms): {sql_text}")
+            for step in plan:
+                self.log(f"   plan: {step}")
+
+    def _plan(self, conn, sql_text, sql, parameters):
+        if not self.explain or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        with self._lock:
+            plan = self._plans.get(sql_text)
+        if plan is None:
+            try:
+                # Plain sqlite3 cursor, so the EXPLAIN itself is not profiled
+                rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+                plan = [row[3] for row in rows]
+            except sqlite3.Error as e:
+                plan = [f'unavailable: {e}']
+            with self._lock:
+                self._plans[sql_text] = plan
+        return plan
+
+def _connection_class(profiler):
+    """sqlite3.Connection subclass whose cursors report to `profiler`"""
+    class ProfiledCursor(sqlite3.Cursor):
+        _profile = None
+
+        def execute(self, sql, parameters=()):
+            profiler._begin(self, sql, parameters)
+            started = time.perf_counter()
+            try:
+                return super().execute(sql, parameters)
+            finally:
+                profiler._add(self, (time.perf_counter() - started) * 1000)
+
+        def executemany(self, sql, seq_of_parameters):
+            # Keep a materialized copy so a slow statement can still be explained
+            seq_of_parameters = list(seq_of_parameters)
+            profiler._begin(self, sql, seq_of_parameters[0] if seq_of_parameters else ())
+            started = time.perf_counter()
+            try:
+                return super().executemany(sql, seq_of_parameters)
+            finally:
+                profiler._add(self, (time.perf_counter() - started) * 1000)
+
+        def fetchone(self):
+            started = time.perf_counter()
+            row = super().fetchone()
+            profiler._add(self, (time.perf_counter() - started) * 1000, 1 if row is not None else 0)
+            return row
+
+        def fetchmany(self, size=None):
+            started = time.perf_counter()
+            rows = super().fetchmany(self.arraysize if size is None else size)
+            profiler._add(self, (time.perf_counter() - started) * 1000, len(rows))
+            return rows
+
+        def fetchall(self):
+            started = time.perf_counter()
+            rows = super().fetchall()
+            profiler._add(self, (time.perf_counter() - started) * 1000, len(rows))
+            return rows
+
+    class ProfiledConnection(sqlite3.Connection):
+        def cursor(self, factory=ProfiledCursor):
+            return super().cursor(factory)
+
+        def execute(self, sql, parameters=()):
+            return self.cursor().execute(sql, parameters)
+
+        def executemany(self, sql, seq_of_parameters):
+            return self.cursor().executemany(sql, seq_of_parameters)
+
+    return ProfiledConnection
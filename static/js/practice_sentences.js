@@ -10,6 +10,8 @@ class SentencePractice {
         this.startTime = Date.now();
         this.questions = [];
         this.currentQuestionData = null;
+        this.pendingRecords = [];
+        this.recordBatchSize = 5;
         
         this.init();
     }
@@ -33,7 +35,12 @@ class SentencePractice {
                 })
             });
             
-            const data = await response.json();
+            let data = await response.json();
+            
+            // Generation runs as a background job; wait for its result
+            if (data.success && data.job_id) {
+                data = await this.waitForJob(data.status_url);
+            }
             
             if (data.success) {
                 return {
@@ -50,6 +57,29 @@ class SentencePractice {
         }
     }
     
+    async waitForJob(statusUrl) {
+        // Poll the job with backoff; each status request returns immediately
+        const deadline = Date.now() + 120000;
+        let delay = 250;
+        
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, delay));
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            
+            if (!data.success) {
+                return data;
+            }
+            
+            if (data.job.status === 'succeeded' || data.job.status === 'failed') {
+                return data.job.result || { success: false, error: data.job.error };
+            }
+            delay = Math.min(delay * 1.5, 2000);
+        }
+        
+        return { success: false, error: 'Sentence generation timed out' };
+    }
+    
     async showQuestion() {
         if (this.currentQuestion >= this.totalQuestions) {
             this.endPractice();
@@ -159,19 +189,36 @@ class SentencePractice {
     }
     
     async recordPractice(userAnswer, isCorrect) {
+        this.pendingRecords.push({
+            sentence_id: this.currentQuestionData.sentence_id,
+            user_answer: userAnswer,
+            correct_answer: this.currentQuestionData.translation,
+            is_correct: isCorrect,
+            response_time_ms: Date.now() - this.startTime
+        });
+        
+        if (this.pendingRecords.length >= this.recordBatchSize) {
+            await this.flushRecords();
+        }
+    }
+    
+    async flushRecords() {
+        if (this.pendingRecords.length === 0) {
+            return;
+        }
+        
+        const records = this.pendingRecords;
+        this.pendingRecords = [];
+        
         try {
-            await fetch('/api/practice/record', {
+            await fetch('/api/practice/record-batch', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
                     session_id: this.sessionId,
-                    sentence_id: this.currentQuestionData.sentence_id,
-                    user_answer: userAnswer,
-                    correct_answer: this.currentQuestionData.translation,
-                    is_correct: isCorrect,
-                    response_time_ms: Date.now() - this.startTime
+                    records: records
                 })
             });
         } catch (error) {
@@ -179,6 +226,22 @@ class SentencePractice {
         }
     }
     
+    sendPendingRecordsBeacon() {
+        // Deliver unsent answers when the learner leaves mid-session
+        if (this.pendingRecords.length === 0 || !navigator.sendBeacon) {
+            return;
+        }
+        
+        const payload = JSON.stringify({
+            session_id: this.sessionId,
+            records: this.pendingRecords
+        });
+        
+        if (navigator.sendBeacon('/api/practice/record-batch', new Blob([payload], { type: 'application/json' }))) {
+            this.pendingRecords = [];
+        }
+    }
+    
     showFeedback(isCorrect, userAnswer) {
         const feedbackContainer = document.getElementById('feedback-container');
         const feedbackIcon = document.getElementById('feedback-icon');
@@ -229,6 +292,8 @@ class SentencePractice {
     }
     
     async endSession() {
+        await this.flushRecords();
+        
         try {
             await fetch('/api/practice/end-session', {
                 method: 'POST',
@@ -262,6 +327,8 @@ class SentencePractice {
     }
     
     bindEvents() {
+        window.addEventListener('pagehide', () => this.sendPendingRecordsBeacon());
+        
         // Submit answer button
         document.getElementById('submit-answer').addEventListener('click', () => {
             this.handleAnswer();
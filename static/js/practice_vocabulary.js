@@ -8,8 +8,11 @@ class VocabularyPractice {
         this.score = 0;
         this.totalAnswered = 0;
         this.startTime = Date.now();
+        this.questionStartTime = Date.now();
         this.questions = [];
         this.currentQuestionData = null;
+        this.pendingRecords = [];
+        this.recordBatchSize = 5;
         
         this.init();
     }
@@ -98,6 +101,9 @@ class VocabularyPractice {
         document.getElementById('question-container').style.display = 'block';
         document.getElementById('feedback-container').style.display = 'none';
         document.getElementById('results-container').style.display = 'none';
+        
+        // Time each answer from when its question appears
+        this.questionStartTime = Date.now();
     }
     
     generateAnswerOptions() {
@@ -147,19 +153,36 @@ class VocabularyPractice {
     }
     
     async recordPractice(userAnswer, isCorrect) {
+        this.pendingRecords.push({
+            vocabulary_id: this.currentQuestionData.id,
+            user_answer: userAnswer,
+            correct_answer: this.currentQuestionData.translation || 'No translation available',
+            is_correct: isCorrect,
+            response_time_ms: Date.now() - this.questionStartTime
+        });
+        
+        if (this.pendingRecords.length >= this.recordBatchSize) {
+            await this.flushRecords();
+        }
+    }
+    
+    async flushRecords() {
+        if (this.pendingRecords.length === 0) {
+            return;
+        }
+        
+        const records = this.pendingRecords;
+        this.pendingRecords = [];
+        
         try {
-            await fetch('/api/practice/record', {
+            await fetch('/api/practice/record-batch', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
                     session_id: this.sessionId,
-                    vocabulary_id: this.currentQuestionData.id,
-                    user_answer: userAnswer,
-                    correct_answer: this.currentQuestionData.translation || 'No translation available',
-                    is_correct: isCorrect,
-                    response_time_ms: Date.now() - this.startTime
+                    records: records
                 })
             });
         } catch (error) {
@@ -167,6 +190,22 @@ class VocabularyPractice {
         }
     }
     
+    sendPendingRecordsBeacon() {
+        // Deliver unsent answers when the learner leaves mid-session
+        if (this.pendingRecords.length === 0 || !navigator.sendBeacon) {
+            return;
+        }
+        
+        const payload = JSON.stringify({
+            session_id: this.sessionId,
+            records: this.pendingRecords
+        });
+        
+        if (navigator.sendBeacon('/api/practice/record-batch', new Blob([payload], { type: 'application/json' }))) {
+            this.pendingRecords = [];
+        }
+    }
+    
     showFeedback(isCorrect, selectedAnswer) {
         const feedbackContainer = document.getElementById('feedback-container');
         const feedbackIcon = document.getElementById('feedback-icon');
@@ -214,6 +253,8 @@ class VocabularyPractice {
     }
     
     async endSession() {
+        await this.flushRecords();
+        
         try {
             await fetch('/api/practice/end-session', {
                 method: 'POST',
@@ -247,6 +288,8 @@ class VocabularyPractice {
     }
     
     bindEvents() {
+        window.addEventListener('pagehide', () => this.sendPendingRecordsBeacon());
+        
         // Answer option clicks
         document.addEventListener('click', (e) => {
             if (e.target.classList.contains('answer-option')) {
@@ -1,6 +1,7 @@
 // Global variables
 let languages = [];
 let vocabulary = [];
+let vocabularyCursor = null;
 
 // Initialize profile page
 document.addEventListener('DOMContentLoaded', function() {
@@ -38,11 +39,27 @@ function populateLanguageSelects() {
     });
 }
 
-// Load vocabulary
-async function loadVocabulary() {
+// Load vocabulary one page at a time; append adds the next page to the list
+async function loadVocabulary(append = false) {
+    const params = new URLSearchParams();
+    const languageFilter = document.getElementById('vocabLanguageFilter').value;
+    const difficultyFilter = document.getElementById('vocabDifficultyFilter').value;
+    
+    if (languageFilter) {
+        params.set('language_id', languageFilter);
+    }
+    if (difficultyFilter) {
+        params.set('difficulty_level', difficultyFilter);
+    }
+    if (append && vocabularyCursor) {
+        params.set('cursor', vocabularyCursor);
+    }
+    
     try {
-        const response = await fetch('/api/vocabulary');
-        vocabulary = await response.json();
+        const response = await fetch(`/api/vocabulary?${params}`);
+        const page = await response.json();
+        vocabulary = append ? vocabulary.concat(page.items) : page.items;
+        vocabularyCursor = page.next_cursor;
         displayVocabulary(vocabulary);
     } catch (error) {
         console.error('Error loading vocabulary:', error);
@@ -86,25 +103,17 @@ function displayVocabulary(vocabList) {
                 </button>
             </div>
         </div>
-    `).join('');
+    `).join('') + (vocabularyCursor ? `
+        <button class="btn-outline load-more" onclick="loadVocabulary(true)">
+            <i class="fas fa-chevron-down"></i>
+            Load more
+        </button>
+    ` : '');
 }
 
-// Filter vocabulary
+// Filter vocabulary on the server, so filters apply to every page
 function filterVocabulary() {
-    const languageFilter = document.getElementById('vocabLanguageFilter').value;
-    const difficultyFilter = document.getElementById('vocabDifficultyFilter').value;
-    
-    let filteredVocab = vocabulary;
-    
-    if (languageFilter) {
-        filteredVocab = filteredVocab.filter(vocab => vocab.language_id == languageFilter);
-    }
-    
-    if (difficultyFilter) {
-        filteredVocab = filteredVocab.filter(vocab => vocab.difficulty_level === difficultyFilter);
-    }
-    
-    displayVocabulary(filteredVocab);
+    loadVocabulary();
 }
 
 // Setup event listeners
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-user prompt batching
+"""
+
+import json
+import threading
+import time
+from batching import PromptBatcher, BATCH_SYSTEM_PROMPT, parse_batch_response
+
+def prompt(word):
+    return [{'role': 'system', 'content': 'Use SENTENCE|TRANSLATION'},
+            {'role': 'user', 'content': f'Use the word {word}'}]
+
+def run_concurrently(batcher, words, group_of=lambda word: 'user-1'):
+    results = {}
+
+    def call(word):
+        results[word] = batcher.submit(prompt(word), max_tokens=100, timeout=5, group=group_of(word))
+
+    threads = [threading.Thread(target=call, args=(word,)) for word in words]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_requests_share_one_prompt_and_fan_out():
+    """Requests in one window become one JSON prompt; answers go back to their callers"""
+    calls = []
+
+    def complete(messages, max_tokens):
+        calls.append((messages, max_tokens))
+        if messages[0]['content'] != BATCH_SYSTEM_PROMPT:
+            return 'single answer'
+        tasks = json.loads(messages[1]['content'])
+        # Drop one answer to exercise the per-request fallback
+        dropped = sorted(tasks)[-1]
+        return 'Sure! ' + json.dumps({rid: task.split()[-1].upper() for rid, task in tasks.items()
+                                      if rid != dropped})
+
+    batcher = PromptBatcher(complete, window=0.5, max_batch=4)
+    words = ['hola', 'gato', 'perro', 'casa']
+    results = run_concurrently(batcher, words)
+
+    batched = [call for call in calls if call[0][0]['content'] == BATCH_SYSTEM_PROMPT]
+    assert len(batched) == 1 and len(calls) == 2
+    assert len(json.loads(batched[0][0][1]['content'])) == 4
+    assert batched[0][1] <= 4000
+
+    answered = {word: result for word, result in results.items() if result != 'single answer'}
+    assert len(answered) == 3 and all(answer == word.upper() for word, answer in answered.items())
+
+    stats = batcher.stats()
+    assert (stats['requests'], stats['batches'], stats['upstream_calls'], stats['fallbacks']) == (4, 1, 2, 1)
+
+def test_prompts_from_different_users_are_never_combined():
+    """Only one user's requests share a prompt; ungrouped requests go alone"""
+    calls = []
+    lock = threading.Lock()
+
+    def complete(messages, max_tokens):
+        with lock:
+            calls.append(messages)
+        if messages[0]['content'] != BATCH_SYSTEM_PROMPT:
+            return messages[-1]['content']
+        tasks = json.loads(messages[1]['content'])
+        return json.dumps({rid: task.split('\n')[-1] for rid, task in tasks.items()})
+
+    batcher = PromptBatcher(complete, window=0.5, max_batch=8)
+    owners = {'hola': 1, 'gato': 1, 'perro': 2, 'casa': 2, 'sol': None, 'mar': None}
+    results = run_concurrently(batcher, list(owners), group_of=owners.get)
+
+    assert all(result == f'Use the word {word}' for word, result in results.items())
+    batched = [json.loads(messages[1]['content']) for messages in calls
+               if messages[0]['content'] == BATCH_SYSTEM_PROMPT]
+    assert len(batched) == 2 and len(calls) == 4
+    for tasks in batched:
+        assert len({owners[task.split()[-1]] for task in tasks.values()}) == 1
+
+def test_lone_request_is_sent_unchanged():
+    seen = []
+    batcher = PromptBatcher(lambda messages, max_tokens: seen.append(messages) or 'ok', window=0.01)
+    assert batcher.submit(prompt('hola'), timeout=5, group='user-1') == 'ok'
+    assert seen == [prompt('hola')]
+
+def test_ungrouped_request_skips_the_window():
+    batcher = PromptBatcher(lambda messages, max_tokens: 'ok', window=5)
+    started = time.monotonic()
+    assert batcher.submit(prompt('hola'), timeout=5) == 'ok'
+    assert time.monotonic() - started < 1
+    assert batcher.stats()['upstream_calls'] == 1
+
+def test_batch_errors_reach_every_caller():
+    def complete(messages, max_tokens):
+        raise RuntimeError('upstream down')
+
+    batcher = PromptBatcher(complete, window=0.2, max_batch=2)
+    errors = []
+
+    def call():
+        try:
+            batcher.submit(prompt('hola'), timeout=5)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ['upstream down'] * 2
+
+def test_parse_batch_response_tolerates_noise():
+    assert parse_batch_response('```json\n{"r1": "a", "r2": ["b", "c"], "r3": ""}\n```') == {'r1': 'a', 'r2': 'b\nc'}
+    assert parse_batch_response('not json') == {}
+    assert parse_batch_response('[1, 2]') == {}
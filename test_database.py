@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""
+Tests for DatabaseManager internals (connection pool, schema, queries)
+"""
+
+import random
+import re
+import threading
+import time
+from database import DatabaseManager, sentence_sort_key, vocabulary_sort_key
+
+def make_db(tmp_path, **kwargs):
+    return DatabaseManager(str(tmp_path / 'test.db'), **kwargs)
+
+def test_connection_pool_reuses_connections(tmp_path):
+    """Connections are opened once and reused across calls"""
+    db = make_db(tmp_path, pool_size=2)
+    user_id = db.create_user('pool', 'pool@example.com', 'secret')
+
+    for _ in range(20):
+        assert db.get_user_by_id(user_id)['username'] == 'pool'
+
+    stats = db.pool_stats()
+    assert stats['connections_opened'] == 1
+    assert stats['in_use'] == 0
+    assert stats['checkouts'] >= 21
+
+    conn = db.get_connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+    conn.close()
+    db.close()
+
+def test_connection_pool_is_bounded_under_concurrency(tmp_path):
+    """Concurrent callers share at most pool_size connections"""
+    db = make_db(tmp_path, pool_size=2)
+    user_id = db.create_user('threads', 'threads@example.com', 'secret')
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(25):
+                db.add_user_language(user_id, 1)
+                db.get_user_languages(user_id)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    stats = db.pool_stats()
+    assert stats['size'] <= 2
+    assert stats['in_use'] == 0
+    db.close()
+
+def test_uncommitted_work_is_discarded_on_release(tmp_path):
+    """Returning a connection rolls back anything left uncommitted"""
+    db = make_db(tmp_path, pool_size=1)
+    conn = db.get_connection()
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('x', 'x@x', 'x')")
+    conn.close()
+
+    conn = db.get_connection()
+    assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0
+    conn.close()
+    db.close()
+
+def test_migrations_are_versioned_and_idempotent(tmp_path):
+    """Migrations apply once and record the schema version"""
+    from database import MIGRATIONS
+    db = make_db(tmp_path)
+    assert db.get_schema_version() == MIGRATIONS[-1][0]
+    assert db.run_migrations() == []
+
+    reopened = make_db(tmp_path)
+    assert reopened.get_schema_version() == MIGRATIONS[-1][0]
+    db.close()
+    reopened.close()
+
+def test_every_query_uses_an_index(tmp_path):
+    """EXPLAIN QUERY PLAN never reports a full table scan for DatabaseManager queries"""
+    db = make_db(tmp_path, pool_size=1)
+    user_id = db.create_user('plan', 'plan@example.com', 'secret')
+    db.add_user_language(user_id, 1)
+    vocab_id = db.add_vocabulary(user_id, 1, 'hola', 'hello')
+    sentence_id = db.add_sentence(user_id, 1, 'hola amigo', 'hello friend')
+    session_id = db.start_learning_session(user_id, 1, 'vocabulary')
+
+    # With a single pooled connection every method runs through this trace hook
+    statements = []
+    conn = db.get_connection()
+    conn.set_trace_callback(statements.append)
+    conn.close()
+
+    db.authenticate_user('plan', 'secret')
+    db.get_user_by_id(user_id)
+    db.get_languages()
+    db.get_user_languages(user_id)
+    db.get_user_vocabulary(user_id)
+    db.get_user_vocabulary(user_id, 1, 'beginner')
+    db.get_user_sentences(user_id)
+    db.get_user_sentences(user_id, 1, 'beginner')
+    db.get_user_vocabulary(user_id, 1, after=(0, 0, vocab_id))
+    db.get_user_vocabulary(user_id, after=(0, 0, vocab_id))
+    db.get_user_sentences(user_id, 1, after=(0, sentence_id))
+    db.get_random_sentence(user_id, 1, 'beginner')
+    db.get_random_vocabulary(user_id, 1, 'beginner')
+    db.get_due_vocabulary(user_id, 1)
+    db.get_due_vocabulary(user_id, 1, 'beginner')
+    db.count_pooled_sentences(user_id, 1, 'beginner')
+    db.take_pooled_sentence(user_id, 1, 'beginner')
+    db.record_practice(user_id, session_id, vocab_id, sentence_id, 'hola', 'hola', True, 1200)
+    db.end_learning_session(session_id, 1, 1, 1, 1)
+    db.get_user_stats(user_id)
+    db.get_user_stats(user_id, 1)
+    db.get_data_version(user_id, 'vocabulary')
+    db.add_generated_sentences(user_id, 1, 'plan-key', [('hola', 'hello')])
+    for dataset in ('vocabulary', 'sentences', 'learning_sessions', 'practice_records'):
+        list(db.export_rows(user_id, dataset))
+    db.get_user_by_username('plan')
+    db.create_vocabulary_import('plan-import', user_id, 1, 'csv')
+    import_state = db.get_vocabulary_import('plan-import', user_id)
+    db.write_vocabulary_import_chunk(import_state, [('adiós', 'bye', 'beginner', None, None, None)],
+                                     {'rows_processed': 1, 'added_count': 1, 'error_count': 0,
+                                      'errors': [], 'checkpoint': 'x'})
+    db.set_vocabulary_import_status('plan-import', 'completed')
+    db.get_vocabulary_imports(user_id)
+
+    conn = db.get_connection()
+    conn.set_trace_callback(None)
+    checked = 0
+    for sql in statements:
+        if sql.split()[0].upper() not in ('SELECT', 'UPDATE', 'DELETE'):
+            continue
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        for step in plan:
+            if step.startswith('SCAN') and step != 'SCAN CONSTANT ROW':
+                assert 'USING' in step and 'INDEX' in step, f"Full scan in {sql!r}: {plan}"
+        checked += 1
+    conn.close()
+
+    assert checked >= 15
+    db.close()
+
+def test_hot_queries_search_their_indexes(tmp_path):
+    """The hot queries seek into the index added for them instead of scanning any index"""
+    db = make_db(tmp_path, pool_size=1)
+    user_id = db.create_user('seek', 'seek@example.com', 'secret')
+    db.add_vocabulary(user_id, 1, 'hola', 'hello')
+    db.add_sentence(user_id, 1, 'hola amigo', 'hello friend')
+    index = r'USING (?:COVERING )?INDEX {} \('
+    expected = [
+        (lambda: db.get_user_vocabulary(user_id, 1), 'vocabulary', index.format('idx_vocabulary_user_lang_mastery')),
+        (lambda: db.get_user_vocabulary(user_id), 'vocabulary', index.format('idx_vocabulary_user_mastery')),
+        (lambda: db.get_random_vocabulary(user_id, 1), 'vocabulary', index.format('idx_vocabulary_sample_seq')),
+        (lambda: db.get_user_sentences(user_id, 1), 'sentences', index.format('idx_sentences_user_lang_use')),
+        (lambda: db.get_user_sentences(user_id), 'sentences', index.format('idx_sentences_user_use')),
+        (lambda: db.get_random_sentence(user_id, 1), 'sentences', index.format('idx_sentences_sample_seq')),
+        (lambda: db.get_user_stats(user_id), 'user_stats', r'USING PRIMARY KEY \('),
+        (lambda: db.get_user_stats(user_id, 1), 'user_stats', r'USING PRIMARY KEY \('),
+    ]
+
+    for call, table, using in expected:
+        # With a single pooled connection the call runs through this trace hook
+        statements = []
+        conn = db.get_connection()
+        conn.set_trace_callback(statements.append)
+        conn.close()
+        call()
+        conn = db.get_connection()
+        conn.set_trace_callback(None)
+
+        # Every read of the table except fetching picked rows by id must seek the index
+        reads = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')
+                 and f'FROM {table}' in sql and 'WHERE id ' not in sql]
+        assert reads, f'No query on {table}'
+        for sql in reads:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+            assert any(re.match(f'SEARCH {table} {using}', step) for step in plan), \
+                f"{sql!r} does not search {using}: {plan}"
+            assert not any(step.startswith(f'SCAN {table}') for step in plan), f"Scan in {sql!r}: {plan}"
+        conn.close()
+
+    # practice_records foreign keys
+    conn = db.get_connection()
+    for column, name in (('user_id', 'user'), ('session_id', 'session'),
+                         ('vocabulary_id', 'vocabulary'), ('sentence_id', 'sentence')):
+        plan = [row[3] for row in conn.execute(
+            f'EXPLAIN QUERY PLAN SELECT id FROM practice_records WHERE {column} = 1')]
+        assert any(re.match(f'SEARCH practice_records {index.format("idx_practice_records_" + name)}', step)
+                   for step in plan), plan
+    conn.close()
+    db.close()
+
+def test_random_vocabulary_samples_least_mastered_first(tmp_path):
+    """Random practice picks distinct rows, lowest mastery levels first"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('sample', 'sample@example.com', 'secret')
+    conn = db.get_connection()
+    for i in range(60):
+        conn.execute('''INSERT INTO vocabulary (user_id, language_id, word, mastery_level, difficulty_level)
+                        VALUES (?, 1, ?, ?, ?)''',
+                     (user_id, f'word{i}', i % 3, 'advanced' if i % 2 else 'beginner'))
+    conn.commit()
+    conn.close()
+
+    picked = db.get_random_vocabulary(user_id, 1, limit=25)
+    assert len({vocab['id'] for vocab in picked}) == 25
+    levels = [vocab['mastery_level'] for vocab in picked]
+    assert levels == sorted(levels)
+    assert levels.count(0) == 20 and levels.count(1) == 5
+
+    beginner = db.get_random_vocabulary(user_id, 1, 'beginner', limit=100)
+    assert len(beginner) == 30
+    assert all(vocab['difficulty_level'] == 'beginner' for vocab in beginner)
+
+    assert db.get_random_vocabulary(user_id, 2) == []
+    assert db.get_random_sentence(user_id, 1) is None
+    sentence_id = db.add_sentence(user_id, 1, 'hola', 'hello')
+    assert db.get_random_sentence(user_id, 1)['id'] == sentence_id
+    db.close()
+
+def test_random_sampling_is_uniform_over_gapped_ids(tmp_path):
+    """Rows after large id gaps are picked no more often than the rest"""
+    from database import sample_random_ids
+    db = make_db(tmp_path)
+    user_id = db.create_user('gaps', 'gaps@example.com', 'secret')
+    other_id = db.create_user('other', 'other@example.com', 'secret')
+    conn = db.get_connection()
+    # Another user's bulk import leaves a large gap in this user's ids
+    for i in range(20):
+        owner = user_id if i < 10 or i >= 19 else other_id
+        conn.execute('INSERT INTO vocabulary (user_id, language_id, word) VALUES (?, 1, ?)', (owner, f'a{i}'))
+    conn.executemany('INSERT INTO vocabulary (user_id, language_id, word) VALUES (?, 1, ?)',
+                     [(other_id, f'b{i}') for i in range(5000)])
+    for i in range(9):
+        conn.execute('INSERT INTO vocabulary (user_id, language_id, word) VALUES (?, 1, ?)', (user_id, f'c{i}'))
+    conn.commit()
+
+    rng = random.Random(11)
+    counts = {}
+    for _ in range(4000):
+        for vocab_id in sample_random_ids(conn.cursor(), 'vocabulary', user_id, 1, 2, rng=rng):
+            counts[vocab_id] = counts.get(vocab_id, 0) + 1
+    conn.close()
+
+    # 20 rows, 8000 picks: about 400 each
+    assert len(counts) == 20
+    assert all(300 < picks < 500 for picks in counts.values()), counts
+    db.close()
+
+def test_sample_sequences_stay_dense_through_writes(tmp_path):
+    """Every sampled group numbers its rows 0..size-1 after inserts, moves and deletes"""
+    from database import _rebuild_sample_groups
+    db = make_db(tmp_path)
+    user_id = db.create_user('dense', 'dense@example.com', 'secret')
+    vocab_ids = [db.add_vocabulary(user_id, 1, f'word{i}', f'translation{i}') for i in range(12)]
+    sentence_ids = [db.add_sentence(user_id, 1, f'sentence {i}', f'translation {i}') for i in range(6)]
+    conn = db.get_connection()
+    conn.execute("UPDATE vocabulary SET mastery_level = 2 WHERE id IN (?, ?, ?)", vocab_ids[:3])
+    conn.execute("UPDATE vocabulary SET difficulty_level = 'advanced' WHERE id = ?", (vocab_ids[5],))
+    conn.execute('UPDATE vocabulary SET is_active = 0 WHERE id = ?', (vocab_ids[7],))
+    conn.execute('DELETE FROM vocabulary WHERE id = ?', (vocab_ids[4],))
+    conn.execute('UPDATE sentences SET in_pool = 1 WHERE id = ?', (sentence_ids[1],))
+    conn.execute('UPDATE sentences SET difficulty_level = NULL WHERE id = ?', (sentence_ids[2],))
+    conn.commit()
+
+    def groups():
+        return conn.execute('SELECT * FROM sample_groups WHERE size > 0 ORDER BY 1, 2, 3, 4, 5').fetchall()
+
+    def sequences(table, level, member):
+        seqs = {}
+        for key_level, difficulty, seq in conn.execute(
+                f"SELECT {level}, IFNULL(difficulty_level, ''), sample_seq FROM {table} WHERE {member}"):
+            seqs.setdefault((key_level, difficulty), []).append(seq)
+        return seqs.values()
+
+    maintained = groups()
+    assert [group[3:] for group in maintained] == [
+        (0, '', 1), (0, 'beginner', 4), (0, 'advanced', 1), (0, 'beginner', 6), (2, 'beginner', 3)]
+    for table, level, member in (('vocabulary', 'mastery_level', 'is_active = 1'),
+                                 ('sentences', '0', 'is_active = 1 AND in_pool = 0')):
+        for seqs in sequences(table, level, member):
+            assert sorted(seqs) == list(range(len(seqs))), (table, seqs)
+
+    _rebuild_sample_groups(conn.cursor())
+    assert groups() == maintained
+    conn.rollback()
+    conn.close()
+    db.close()
+
+def test_due_vocabulary_follows_the_review_schedule(tmp_path):
+    """Answers push words back by their SM-2 interval; the due queue serves the earliest first"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('due', 'due@example.com', 'secret')
+    ids = [db.add_vocabulary(user_id, 1, f'word{i}', f'translation{i}') for i in range(4)]
+    session_id = db.start_learning_session(user_id, 1, 'vocabulary')
+
+    assert [vocab['id'] for vocab in db.get_due_vocabulary(user_id, 1)] == ids
+    db.record_practice_batch([
+        {'user_id': user_id, 'session_id': session_id, 'vocabulary_id': ids[0], 'is_correct': True},
+        {'user_id': user_id, 'session_id': session_id, 'vocabulary_id': ids[1], 'is_correct': False},
+        {'user_id': user_id, 'session_id': session_id, 'vocabulary_id': ids[2], 'is_correct': True},
+        {'user_id': user_id, 'session_id': session_id, 'vocabulary_id': ids[2], 'is_correct': True},
+    ])
+
+    queue = db.get_due_vocabulary(user_id, 1, limit=10, now=time.time())
+    assert [vocab['id'] for vocab in queue] == [ids[3], ids[1], ids[0], ids[2]]
+    assert [vocab['due'] for vocab in queue] == [True, False, False, False]
+    assert [vocab['interval_days'] for vocab in queue] == [0, 0, 1, 6]
+    assert [vocab['id'] for vocab in db.get_due_vocabulary(user_id, 1, limit=2)] == [ids[3], ids[1]]
+    db.close()
+
+def test_keyset_pages_cover_every_row_once(tmp_path):
+    """Paging by the last row's sort key walks the full ordering, through runs of equal keys"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('pages', 'pages@example.com', 'secret')
+    db.add_vocabulary_bulk(user_id, 1, [{'word': f'palabra{i}'} for i in range(23)])
+    db.add_vocabulary_bulk(user_id, 2, [{'word': f'mot{i}'} for i in range(5)])
+    conn = db.get_connection()
+    conn.execute("UPDATE vocabulary SET mastery_level = id % 3, review_count = id % 2 WHERE id % 4 = 0")
+    for i in range(9):
+        conn.execute("INSERT INTO sentences (user_id, language_id, sentence, use_count) VALUES (?, 1, ?, ?)",
+                     (user_id, f'frase {i}', i % 2))
+    conn.commit()
+    conn.close()
+
+    def walk(load, sort_key, size, **filters):
+        rows, after = [], None
+        while True:
+            page = load(user_id, limit=size, after=after, **filters)
+            rows.extend(page)
+            if len(page) < size:
+                return rows
+            after = sort_key(page[-1])
+
+    for filters in ({}, {'language_id': 1}, {'language_id': 1, 'difficulty_level': 'beginner'}):
+        everything = db.get_user_vocabulary(user_id, limit=100, **filters)
+        assert [vocab['id'] for vocab in walk(db.get_user_vocabulary, vocabulary_sort_key, 4, **filters)] == \
+            [vocab['id'] for vocab in everything]
+        assert [vocabulary_sort_key(vocab) for vocab in everything] == \
+            sorted(vocabulary_sort_key(vocab) for vocab in everything)
+    assert len(db.get_user_vocabulary(user_id, limit=100)) == 28
+
+    sentences = walk(db.get_user_sentences, sentence_sort_key, 2)
+    assert [sentence_sort_key(sentence) for sentence in sentences] == \
+        sorted(sentence_sort_key(sentence) for sentence in sentences)
+    assert len(sentences) == 9
+    db.close()
+
+def test_add_vocabulary_bulk_reports_per_row_results(tmp_path):
+    """Bulk insert commits valid rows in chunks and reports invalid ones"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('bulk', 'bulk@example.com', 'secret')
+    words = [{'word': f'word{i}', 'translation': f'translation{i}'} for i in range(1200)]
+    words[3] = {'word': '   '}
+    words[7] = 'not-a-dict'
+    words[11] = {'word': 'palabra', 'translation': 42}
+
+    result = db.add_vocabulary_bulk(user_id, 1, words, chunk_size=500)
+    assert result['added_count'] == 1197
+    assert [row['index'] for row in result['results'] if row['status'] == 'error'] == [3, 7, 11]
+
+    added = result['results'][0]
+    conn = db.get_connection()
+    word = conn.execute('SELECT word FROM vocabulary WHERE id = ?', (added['vocabulary_id'],)).fetchone()[0]
+    last = result['results'][-1]
+    last_word = conn.execute('SELECT word FROM vocabulary WHERE id = ?', (last['vocabulary_id'],)).fetchone()[0]
+    conn.close()
+    assert word == 'word0' and last_word == 'word1199'
+    db.close()
+
+def test_record_practice_batch_matches_sequential_updates(tmp_path):
+    """Coalesced batch updates give the same mastery and schedule as one-by-one recording"""
+    answers = [False, True, True, False, False, False, True, False, True, True]
+    mastery = {}
+    for mode in ('sequential', 'batch'):
+        (tmp_path / mode).mkdir()
+        db = make_db(tmp_path / mode)
+        user_id = db.create_user('batch', 'batch@example.com', 'secret')
+        vocab_id = db.add_vocabulary(user_id, 1, 'hola', 'hello')
+        sentence_id = db.add_sentence(user_id, 1, 'hola amigo', 'hello friend')
+        session_id = db.start_learning_session(user_id, 1, 'vocabulary')
+
+        records = [{'user_id': user_id, 'session_id': session_id, 'vocabulary_id': vocab_id,
+                    'sentence_id': sentence_id, 'is_correct': answer} for answer in answers]
+        if mode == 'sequential':
+            for record in records:
+                db.record_practice(record['user_id'], record['session_id'], vocab_id, sentence_id,
+                                   is_correct=record['is_correct'])
+        else:
+            assert db.record_practice_batch(records) == len(records)
+
+        conn = db.get_connection()
+        mastery[mode] = (
+            conn.execute('''SELECT mastery_level, review_count, ease_factor, interval_days, repetitions
+                            FROM vocabulary WHERE id = ?''', (vocab_id,)).fetchone(),
+            conn.execute('SELECT use_count FROM sentences WHERE id = ?', (sentence_id,)).fetchone(),
+            conn.execute('SELECT COUNT(*) FROM practice_records').fetchone(),
+        )
+        conn.close()
+        db.close()
+
+    assert mastery['batch'] == mastery['sequential']
+
+def test_practice_write_behind_flushes_on_batch_size_and_session_end(tmp_path):
+    """Queued records are written when max_batch is reached or the session ends"""
+    from database import PracticeWriteBehind
+    db = make_db(tmp_path)
+    user_id = db.create_user('queue', 'queue@example.com', 'secret')
+    vocab_id = db.add_vocabulary(user_id, 1, 'hola', 'hello')
+    session_id = db.start_learning_session(user_id, 1, 'vocabulary')
+    writer = PracticeWriteBehind(db, flush_interval=60, max_batch=3)
+
+    def count():
+        conn = db.get_connection()
+        total = conn.execute('SELECT COUNT(*) FROM practice_records').fetchone()[0]
+        conn.close()
+        return total
+
+    record = {'user_id': user_id, 'session_id': session_id, 'vocabulary_id': vocab_id, 'is_correct': True}
+    writer.submit([record, record])
+    assert count() == 0 and writer.stats()['pending'] == 2
+
+    writer.submit([record])
+    assert count() == 3 and writer.stats()['batches'] == 1
+
+    writer.submit([record])
+    writer.session_ended(session_id)
+    assert count() == 4 and writer.stats()['pending'] == 0
+    writer.close()
+    db.close()
+
+def test_practice_write_behind_drops_only_failing_records(tmp_path):
+    """A record SQLite cannot bind does not take other users' records down with it"""
+    from database import PracticeWriteBehind
+    db = make_db(tmp_path)
+    first_id = db.create_user('first', 'first@example.com', 'secret')
+    second_id = db.create_user('second', 'second@example.com', 'secret')
+    session_id = db.start_learning_session(first_id, 1, 'vocabulary')
+    writer = PracticeWriteBehind(db, flush_interval=60, max_batch=10)
+
+    writer.submit([{'user_id': first_id, 'session_id': session_id, 'user_answer': 'hola'},
+                   {'user_id': second_id, 'session_id': session_id, 'user_answer': {'not': 'a string'}},
+                   {'user_id': second_id, 'session_id': session_id, 'user_answer': 'adiós'}])
+    assert writer.flush() == 2
+
+    conn = db.get_connection()
+    answers = [row[0] for row in conn.execute('SELECT user_answer FROM practice_records ORDER BY id')]
+    conn.close()
+    assert answers == ['hola', 'adiós']
+    stats = writer.stats()
+    assert stats['dropped'] == 1 and stats['pending'] == 0 and stats['written'] == 2
+    writer.close()
+    db.close()
+
+def test_user_stats_are_maintained_incrementally(tmp_path):
+    """Materialized stats match a full recount after every kind of write"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('stats', 'stats@example.com', 'secret')
+    other_id = db.create_user('other', 'other@example.com', 'secret')
+    spanish = [db.add_vocabulary(user_id, 1, f'palabra{i}') for i in range(4)]
+    db.add_vocabulary_bulk(user_id, 2, [{'word': f'mot{i}'} for i in range(3)])
+    db.add_vocabulary(other_id, 1, 'hola')
+
+    session_id = db.start_learning_session(user_id, 1, 'vocabulary')
+    for _ in range(6):
+        db.record_practice(user_id, session_id, spanish[0], is_correct=True)
+    db.record_practice_batch([{'user_id': user_id, 'session_id': session_id,
+                               'vocabulary_id': spanish[1], 'is_correct': answer}
+                              for answer in (True, False, False, True)])
+    db.end_learning_session(session_id, 10, 0, 7, 10)
+    empty_session = db.start_learning_session(user_id, 2, 'vocabulary')
+    db.end_learning_session(empty_session, 0, 0, 0, 0)
+
+    stats = db.get_user_stats(user_id)
+    assert stats['vocabulary'] == {'total': 7, 'mastered': 1, 'avg_mastery': round(7 / 7, 2)}
+    assert stats['sessions'] == {'total': 2, 'total_correct': 7, 'total_questions': 10, 'avg_accuracy': 70.0}
+    assert db.get_user_stats(user_id, 2)['vocabulary']['total'] == 3
+    assert db.get_user_stats(other_id)['vocabulary']['total'] == 1
+    assert db.check_user_stats() == []
+
+    # Writes that bypass DatabaseManager are caught by the triggers too
+    conn = db.get_connection()
+    conn.execute('UPDATE vocabulary SET is_active = 0 WHERE id = ?', (spanish[3],))
+    conn.execute('UPDATE vocabulary SET language_id = 2 WHERE id = ?', (spanish[2],))
+    conn.commit()
+    conn.close()
+    assert db.get_user_stats(user_id, 1)['vocabulary']['total'] == 2
+    assert db.get_user_stats(user_id, 2)['vocabulary']['total'] == 4
+    assert db.check_user_stats() == []
+
+    conn = db.get_connection()
+    conn.execute('DELETE FROM user_stats')
+    conn.commit()
+    conn.close()
+    assert db.check_user_stats(user_id)
+    db.rebuild_user_stats()
+    assert db.check_user_stats() == []
+    assert db.get_user_stats(user_id) == {
+        'vocabulary': {'total': 6, 'mastered': 1, 'avg_mastery': round(7 / 6, 2)},
+        'sessions': {'total': 2, 'total_correct': 7, 'total_questions': 10, 'avg_accuracy': 70.0},
+    }
+    db.close()
+
+def test_data_versions_change_with_every_visible_write(tmp_path):
+    """Each write to rows the API returns moves the owner's version, and only theirs"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('versions', 'versions@example.com', 'secret')
+    other_id = db.create_user('other', 'other@example.com', 'secret')
+    assert db.get_data_version(user_id, 'vocabulary') == (0, None)
+
+    seen = set()
+    def changed(scope='vocabulary', owner=user_id):
+        version = (owner, scope) + db.get_data_version(owner, scope)
+        is_new = version not in seen
+        seen.add(version)
+        return is_new
+
+    vocab_id = db.add_vocabulary(user_id, 1, 'hola', 'hello')
+    assert changed()
+    db.add_vocabulary_bulk(user_id, 1, [{'word': 'adios'}, {'word': 'gracias'}])
+    assert changed()
+    session_id = db.start_learning_session(user_id, 1, 'vocabulary')
+    db.record_practice(user_id, session_id, vocab_id, is_correct=True)
+    assert changed()
+    assert db.get_data_version(other_id, 'vocabulary') == (0, None)
+
+    # Columns the API does not return leave the version alone
+    conn = db.get_connection()
+    conn.execute('UPDATE vocabulary SET next_due = 0 WHERE id = ?', (vocab_id,))
+    conn.commit()
+    conn.close()
+    assert not changed()
+
+    # A word moved to another user changes both users' versions
+    conn = db.get_connection()
+    conn.execute('UPDATE vocabulary SET user_id = ? WHERE id = ?', (other_id, vocab_id))
+    conn.commit()
+    conn.close()
+    assert changed()
+    assert changed(owner=other_id)
+
+    db.add_sentence(user_id, 1, 'hola amigo')
+    assert changed('sentences')
+    db.add_user_language(user_id, 2)
+    assert changed('languages')
+
+    # Bulk loads skip the triggers but still leave every version changed
+    with db.deferred_user_stats():
+        conn = db.get_connection()
+        conn.execute("INSERT INTO vocabulary (user_id, language_id, word) VALUES (?, 1, 'nuevo')", (user_id,))
+        conn.commit()
+        conn.close()
+    assert changed()
+    assert changed('sentences')
+    assert 'nuevo' in [vocab['word'] for vocab in db.get_random_vocabulary(user_id, 1, limit=50)]
+    db.close()
+
+def test_language_catalog_is_loaded_once(tmp_path):
+    """Language lookups are served from memory after the first load"""
+    db = make_db(tmp_path, pool_size=1)
+    statements = []
+    conn = db.get_connection()
+    conn.set_trace_callback(statements.append)
+    conn.close()
+
+    languages = db.get_languages()
+    assert [lang['name'] for lang in languages] == sorted(lang['name'] for lang in languages)
+    spanish = db.get_language_by_code('es')
+    assert db.get_language(spanish['id'])['name'] == 'Spanish'
+    assert db.get_language(9999) is None
+    assert spanish['id'] in db.get_language_catalog()
+
+    # Callers get copies, so the cached catalog cannot be modified
+    spanish['name'] = 'Changed'
+    languages[0]['name'] = 'Changed'
+    assert db.get_language_by_code('es')['name'] == 'Spanish'
+    assert 'Changed' not in [lang['name'] for lang in db.get_languages()]
+    # The catalog version and the rows, once
+    assert len(statements) == 2
+
+    db.invalidate_language_catalog()
+    db.get_languages()
+    assert len(statements) == 4
+    db.close()
+
+def test_language_catalog_notices_writes_from_other_processes(tmp_path, monkeypatch):
+    """Any write to languages, even from another process, reaches the cached catalog"""
+    import sqlite3
+    import database
+    monkeypatch.setattr(database, 'LANGUAGE_CATALOG_CHECK_SECONDS', 0)
+    db = make_db(tmp_path)
+    catalog = db.get_language_catalog()
+    assert db.get_language_catalog() is catalog
+
+    # A separate connection stands in for another worker process
+    other = sqlite3.connect(db.db_path)
+    other.execute("INSERT INTO languages (name, code, flag_emoji) VALUES ('Welsh', 'cy', '🏴')")
+    other.commit()
+    assert db.get_language_by_code('cy')['name'] == 'Welsh'
+    other.execute("UPDATE languages SET name = 'Cymraeg' WHERE code = 'cy'")
+    other.commit()
+    assert db.get_language_by_code('cy')['name'] == 'Cymraeg'
+    other.execute("DELETE FROM languages WHERE code = 'cy'")
+    other.commit()
+    other.close()
+    assert db.get_language_by_code('cy') is None
+    assert db.get_language_catalog().fingerprint == catalog.fingerprint
+    db.close()
+
+def test_user_cache_serves_repeat_loads_and_invalidates(tmp_path):
+    """load_user lookups hit the cache until the account changes"""
+    db = make_db(tmp_path)
+    user_id = db.create_user('cached', 'cached@example.com', 'secret')
+
+    for _ in range(10):
+        assert db.get_cached_user(user_id)['username'] == 'cached'
+    stats = db.user_cache.stats()
+    assert stats['misses'] == 1 and stats['hits'] == 9
+
+    assert db.deactivate_user(user_id)
+    assert db.get_cached_user(user_id) is None
+
+    # Re-registering reactivates the account and must not serve the cached None
+    db.create_user('cached', 'new@example.com', 'secret')
+    assert db.get_cached_user(user_id)['email'] == 'new@example.com'
+    db.close()
+
+def test_ttl_cache_expires_and_evicts():
+    """Entries expire after the TTL and the least recently used is evicted"""
+    from cache import TTLCache
+    cache = TTLCache(max_size=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['expirations'] == 1
+
+def test_benchmark_suite_runs_on_a_small_dataset(tmp_path):
+    """benchmark_database seeds consistent rows and every benchmark runs"""
+    import benchmark_database
+
+    db = make_db(tmp_path)
+    layout = benchmark_database.seed_database(db, users=3, vocabulary=60, sentences=30,
+                                              sessions=12, records=50)
+    counts = benchmark_database.row_counts(db)
+    assert (counts['users'], counts['vocabulary'], counts['practice_records']) == (3, 60, 50)
+
+    # Practice records point at the user's own vocabulary and sessions
+    conn = db.get_connection()
+    mismatched = conn.execute('''SELECT COUNT(*) FROM practice_records p
+                                 JOIN vocabulary v ON v.id = p.vocabulary_id
+                                 JOIN learning_sessions s ON s.id = p.session_id
+                                 WHERE v.user_id != p.user_id OR s.user_id != p.user_id''').fetchone()[0]
+    conn.close()
+    assert mismatched == 0
+    assert db.check_user_stats() == []
+
+    assert benchmark_database.load_layout(db)['user_ids'] == layout['user_ids']
+    for func in benchmark_database.build_benchmarks(db, layout, random.Random(1)).values():
+        func()
+    db.close()
+
+def test_dataset_generator_is_deterministic(tmp_path):
+    """Same seed gives the same rows whatever the chunk size; stats stay consistent"""
+    from datetime import date
+    from generate_dataset import DatasetGenerator
+
+    def dump(chunk_users, name):
+        (tmp_path / name).mkdir()
+        db = make_db(tmp_path / name)
+        generator = DatasetGenerator(db, seed=7, avg_vocabulary=15, avg_sessions=3, end_date=date(2026, 1, 1))
+        generator.generate(25, chunk_users=chunk_users)
+        conn = db.get_connection()
+        rows = {table: conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+                for table in ('vocabulary', 'sentences', 'learning_sessions', 'practice_records')}
+        rows['users'] = conn.execute('SELECT username, created_at FROM users ORDER BY id').fetchall()
+        conn.close()
+        assert db.check_user_stats() == []
+        db.close()
+        return rows
+
+    first, second = dump(25, 'a'), dump(4, 'b')
+    assert first == second
+    assert len(first['users']) == 25 and first['practice_records']
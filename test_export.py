@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming exports
+"""
+
+import csv
+import io
+import json
+import tracemalloc
+from database import DatabaseManager, EXPORT_DATASETS
+import export
+
+def make_user(tmp_path, words):
+    db = DatabaseManager(str(tmp_path / 'export.db'))
+    user_id = db.create_user('exporter', 'exporter@example.com', 'secret')
+    other_id = db.create_user('other', 'other@example.com', 'secret')
+    db.add_vocabulary_bulk(user_id, 1, [{'word': f'palabra {i}', 'translation': f'word, "{i}"'}
+                                        for i in range(words)])
+    db.add_vocabulary(other_id, 1, 'ajena')
+    return db, user_id
+
+def test_rows_stream_in_id_chunks_for_one_user(tmp_path):
+    db, user_id = make_user(tmp_path, 25)
+    conn = db.get_connection()
+    conn.execute("UPDATE vocabulary SET is_active = 0 WHERE word = 'palabra 3'")
+    conn.commit()
+    conn.close()
+
+    chunks = list(db.export_rows(user_id, 'vocabulary', chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 4]
+    ids = [row[0] for chunk in chunks for row in chunk]
+    assert ids == sorted(ids) and len(set(ids)) == 24
+    assert list(db.export_rows(user_id, 'sentences')) == []
+
+    columns = EXPORT_DATASETS['vocabulary'].columns
+    lines = b''.join(export.encode('ndjson', columns, iter(chunks))).decode('utf-8').splitlines()
+    assert [json.loads(line)['id'] for line in lines] == ids
+
+    body = b''.join(export.encode('csv', columns, iter(chunks))).decode('utf-8')
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [int(row['id']) for row in rows] == ids
+    assert rows[0]['translation'] == 'word, "0"' and rows[0]['category'] == ''
+    assert b''.join(export.encode('csv', columns, iter([]))).decode('utf-8').strip() == ','.join(columns)
+    db.close()
+
+def test_export_memory_does_not_grow_with_row_count(tmp_path):
+    db, user_id = make_user(tmp_path, 20000)
+    small_id = db.create_user('small', 'small@example.com', 'secret')
+    db.add_vocabulary_bulk(small_id, 1, [{'word': f'palabra {i}', 'translation': f'word, "{i}"'}
+                                         for i in range(2000)])
+
+    def peak(format_name, owner):
+        tracemalloc.start()
+        size = 0
+        for piece in export.encode(format_name, EXPORT_DATASETS['vocabulary'].columns,
+                                   db.export_rows(owner, 'vocabulary', chunk_size=500)):
+            size += len(piece)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size, peak_bytes
+
+    for format_name in export.FORMATS:
+        small_size, small_peak = peak(format_name, small_id)
+        size, peak_bytes = peak(format_name, user_id)
+        # Ten times the rows, about the same peak: one chunk is held at a time
+        assert size > 9 * small_size
+        assert peak_bytes < 2 * small_peak
+    db.close()
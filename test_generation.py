@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for sentence generation caching and request coalescing
+"""
+
+import random
+import threading
+import time
+import generation
+from cache import SingleFlight
+from database import DatabaseManager
+
+def test_cache_key_ignores_word_order_and_case():
+    """Near-identical prompts share a key; other inputs do not"""
+    key = generation.generation_cache_key('sentences', 'Spanish', 'beginner', ['hola', 'Gato ', 'perro'])
+    assert key == generation.generation_cache_key('sentences', 'spanish', 'beginner', ['perro', 'gato', 'hola', 'hola'])
+    assert key != generation.generation_cache_key('practice_sentence', 'Spanish', 'beginner', ['hola', 'gato', 'perro'])
+    assert key != generation.generation_cache_key('sentences', 'Spanish', 'advanced', ['hola', 'gato', 'perro'])
+
+def test_cached_completion_calls_model_once(tmp_path, monkeypatch):
+    """Repeated requests are served from the cache; invalid output is not cached"""
+    db = DatabaseManager(str(tmp_path / 'cache.db'))
+    replies = ['not a pair', 'Hola|Hello', 'unused']
+    calls = []
+
+    def fake_api(messages, max_tokens=200):
+        calls.append(messages)
+        return {'choices': [{'message': {'content': replies[len(calls) - 1]}}]}
+
+    monkeypatch.setattr(generation, 'db', db)
+    monkeypatch.setattr(generation, 'call_openai_api', fake_api)
+    monkeypatch.setattr(generation, 'GENERATION_CACHE_TTL', 60)
+
+    def complete():
+        return generation.cached_completion('key', [{'role': 'user', 'content': 'hi'}], 100,
+                                            is_valid=lambda text: '|' in text)
+
+    assert complete() == 'not a pair'
+    assert complete() == 'Hola|Hello'
+    assert complete() == 'Hola|Hello'
+    assert len(calls) == 2
+    db.close()
+
+def test_generation_cache_expires_and_evicts(tmp_path):
+    """Entries expire after the TTL and the least recently used are evicted"""
+    db = DatabaseManager(str(tmp_path / 'cache.db'))
+    for key in ('a', 'b', 'c'):
+        db.store_cached_generation(key, key.upper(), ttl_seconds=60, max_entries=3)
+
+    assert db.get_cached_generation('a', 60) == 'A'
+    assert db.store_cached_generation('d', 'D', ttl_seconds=60, max_entries=3) == 1
+    assert db.get_cached_generation('b', 60) is None
+    assert db.get_cached_generation('a', 60) == 'A'
+    assert db.get_cached_generation('d', 0) is None
+    db.close()
+
+def test_single_flight_shares_result_and_errors():
+    """Callers arriving while a key is in flight get the leader's outcome"""
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+
+    def slow(value):
+        started.set()
+        release.wait(5)
+        if value == 'boom':
+            raise ValueError(value)
+        return value
+
+    def call(key, value):
+        try:
+            results.append(flight.do(key, slow, value))
+        except ValueError as e:
+            errors.append(str(e))
+
+    for key, value in (('ok', 'first'), ('bad', 'boom')):
+        started.clear()
+        release.clear()
+        leader = threading.Thread(target=call, args=(key, value))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=call, args=(key, 'ignored')) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        while flight.stats()['shared'] < 4 * (1 + (key == 'bad')):
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+    assert results == ['first'] * 5
+    assert errors == ['boom'] * 5
+    assert flight.stats() == {'executions': 2, 'shared': 8, 'in_flight': 0}
+
+def test_concurrent_identical_completions_call_model_once(tmp_path, monkeypatch):
+    """Concurrent cache misses for one prompt make a single upstream call"""
+    db = DatabaseManager(str(tmp_path / 'flight.db'))
+    release = threading.Event()
+    calls = []
+
+    def slow_api(messages, max_tokens=200):
+        calls.append(messages)
+        release.wait(5)
+        return {'choices': [{'message': {'content': 'Hola|Hello'}}]}
+
+    monkeypatch.setattr(generation, 'db', db)
+    monkeypatch.setattr(generation, 'call_openai_api', slow_api)
+    monkeypatch.setattr(generation, 'GENERATION_CACHE_TTL', 0)
+    monkeypatch.setattr(generation, '_single_flight', SingleFlight())
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        generation.cached_completion('same', [{'role': 'user', 'content': 'hi'}], 100)))
+        for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while generation.single_flight_stats()['shared'] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['Hola|Hello'] * 5
+    assert len(calls) == 1
+    db.close()
+
+def test_practice_sentences_vary_and_cache_hits_reuse_stored_rows(tmp_path, monkeypatch):
+    """Repeated requests spread over cached variants without storing duplicate sentences"""
+    db = DatabaseManager(str(tmp_path / 'variants.db'))
+    user_id = db.create_user('variety', 'variety@example.com', 'secret')
+    for word in ('hola', 'gato', 'perro'):
+        db.add_vocabulary(user_id, 1, word)
+    calls = []
+
+    def fake_api(messages, max_tokens=200):
+        calls.append(messages)
+        return {'choices': [{'message': {'content': f'Frase {len(calls)}|Sentence {len(calls)}'}}]}
+
+    monkeypatch.setattr(generation, 'db', db)
+    monkeypatch.setattr(generation, 'call_openai_api', fake_api)
+    monkeypatch.setattr(generation, 'api_key_configured', lambda: True)
+    monkeypatch.setattr(generation, 'GENERATION_CACHE_TTL', 60)
+    monkeypatch.setattr(generation, 'GENERATION_CACHE_VARIANTS', 2)
+    monkeypatch.setattr(generation, 'GENERATION_BATCH_WINDOW', 0)
+    random.seed(7)
+
+    results = [generation.generate_practice_sentence(user_id, 1) for _ in range(12)]
+    assert all(result['success'] for result in results)
+    assert len({result['sentence'] for result in results}) == 2
+    assert len(calls) == 2
+
+    # Both variants are stored once and served by id afterwards
+    ids = {result['sentence_id'] for result in results}
+    conn = db.get_connection()
+    stored = conn.execute('SELECT id FROM sentences WHERE user_id = ?', (user_id,)).fetchall()
+    conn.close()
+    assert {row[0] for row in stored} == ids and len(ids) == 2
+
+    other_id = db.create_user('other', 'other@example.com', 'secret')
+    for word in ('perro', 'gato', 'hola'):
+        db.add_vocabulary(other_id, 1, word)
+    other = generation.generate_practice_sentence(other_id, 1)
+    assert other['sentence'] in {result['sentence'] for result in results}
+    assert other['sentence_id'] not in ids and len(calls) == 2
+    db.close()
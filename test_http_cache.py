@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional JSON responses
+"""
+
+import json
+from flask import Flask
+from http_cache import conditional_json, dumps, make_etag, parse_timestamp
+
+app = Flask(__name__)
+
+def respond(headers, etag, last_modified=None):
+    loads = []
+    def load():
+        loads.append(1)
+        return [{'word': 'café', 'id': 1}]
+    with app.test_request_context('/api/vocabulary', headers=headers):
+        return conditional_json(load, etag, last_modified), len(loads)
+
+def test_matching_validators_skip_the_body():
+    etag = make_etag('vocabulary', 7, 3, None)
+    modified = parse_timestamp('2024-05-01 12:00:00')
+
+    response, loads = respond({}, etag, modified)
+    assert response.status_code == 200 and loads == 1
+    assert json.loads(response.get_data()) == [{'word': 'café', 'id': 1}]
+    assert response.headers['ETag'] == f'"{etag}"'
+    assert response.headers['Last-Modified'] == 'Wed, 01 May 2024 12:00:00 GMT'
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    for headers in ({'If-None-Match': f'"{etag}"'}, {'If-None-Match': f'W/"{etag}", "other"'},
+                    {'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'}):
+        response, loads = respond(headers, etag, modified)
+        assert (response.status_code, loads, response.get_data()) == (304, 0, b'')
+        assert response.headers['ETag'] == f'"{etag}"'
+
+def test_changed_validators_return_the_body():
+    etag = make_etag('vocabulary', 7, 4, None)
+    assert etag != make_etag('vocabulary', 7, 3, None)
+    modified = parse_timestamp('2024-05-01 12:00:01')
+
+    # A stale ETag wins over a matching date
+    for headers in ({'If-None-Match': f'"{make_etag("vocabulary", 7, 3, None)}"',
+                     'If-Modified-Since': 'Wed, 01 May 2024 12:00:01 GMT'},
+                    {'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'}):
+        response, loads = respond(headers, etag, modified)
+        assert (response.status_code, loads) == (200, 1)
+
+    assert dumps({'a': [1, 'ü']}) == '{"a":[1,"ü"]}'.encode('utf-8')
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for background generation jobs
+"""
+
+import threading
+from database import DatabaseManager
+from jobs import GenerationJobManager
+
+def make_manager(tmp_path, **kwargs):
+    db = DatabaseManager(str(tmp_path / 'jobs.db'))
+    user_id = db.create_user('jobs', 'jobs@example.com', 'secret')
+    return db, user_id, GenerationJobManager(db, **kwargs)
+
+def test_job_returns_immediately_and_long_polls_result(tmp_path):
+    """submit() does not wait for the handler; get(wait=...) does"""
+    db, user_id, manager = make_manager(tmp_path)
+    release = threading.Event()
+
+    def handler(user_id, word):
+        release.wait(5)
+        return {'success': True, 'sentence': f'{word}!'}
+
+    manager.register('echo', handler)
+    job_id = manager.submit(user_id, 'echo', word='hola')
+    assert manager.get(job_id, user_id)['status'] in ('pending', 'running')
+
+    release.set()
+    job = manager.get(job_id, user_id, wait=5)
+    assert job['status'] == 'succeeded'
+    assert job['result'] == {'success': True, 'sentence': 'hola!'}
+    assert job['params'] == {'word': 'hola'}
+
+    # Other users cannot see the job
+    assert manager.get(job_id, user_id + 1) is None
+    manager.shutdown()
+    db.close()
+
+def test_failed_results_and_crashes_mark_job_failed(tmp_path):
+    """success=False results and handler exceptions both fail the job"""
+    db, user_id, manager = make_manager(tmp_path)
+    manager.register('refuse', lambda user_id: {'success': False, 'error': 'No vocabulary'})
+    manager.register('crash', lambda user_id: 1 / 0)
+
+    refused = manager.get(manager.submit(user_id, 'refuse'), user_id, wait=5)
+    crashed = manager.get(manager.submit(user_id, 'crash'), user_id, wait=5)
+    assert (refused['status'], refused['error']) == ('failed', 'No vocabulary')
+    assert crashed['status'] == 'failed' and 'division' in crashed['error']
+    assert manager.stats()['failed'] == 2
+    manager.shutdown()
+    db.close()
+
+def test_pending_jobs_resume_after_restart(tmp_path):
+    """Jobs persisted as pending are picked up by a new manager"""
+    db, user_id, _ = make_manager(tmp_path)
+    db.create_generation_job('left-behind', user_id, 'echo', {'word': 'adiós'})
+
+    manager = GenerationJobManager(db)
+    manager.register('echo', lambda user_id, word: {'success': True, 'sentence': word})
+    assert manager.resume_pending() == 1
+    assert manager.get('left-behind', user_id, wait=5)['result']['sentence'] == 'adiós'
+    manager.shutdown()
+    db.close()
+
+def test_finished_jobs_past_retention_are_deleted(tmp_path):
+    """Submitting cleans up old finished jobs at most once per cleanup interval"""
+    db, user_id, manager = make_manager(tmp_path, retention_days=1, cleanup_interval=3600)
+    manager.register('echo', lambda user_id, word: {'success': True, 'sentence': word})
+    old_id = manager.submit(user_id, 'echo', word='viejo')
+    assert manager.get(old_id, user_id, wait=5)['status'] == 'succeeded'
+
+    conn = db.get_connection()
+    conn.execute("UPDATE generation_jobs SET finished_at = datetime('now', '-2 days') WHERE id = ?", (old_id,))
+    conn.commit()
+    conn.close()
+
+    # The first submit already cleaned up, so the next one within the interval does not
+    recent_id = manager.submit(user_id, 'echo', word='nuevo')
+    assert manager.get(old_id, user_id) is not None
+
+    manager.cleanup_interval = 0
+    manager.submit(user_id, 'echo', word='otro')
+    assert manager.get(old_id, user_id) is None
+    assert manager.get(recent_id, user_id, wait=5)['status'] == 'succeeded'
+    assert manager.stats()['deleted'] == 1
+    manager.shutdown()
+    db.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM HTTP client against a local stub server
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from llm_client import LLMClient, LLMError, CircuitBreaker, CircuitOpenError
+from llm_stub_server import StubLLMServer
+from batching import parse_batch_response
+from generation import PRACTICE_POOL_PROMPT, parse_sentence_pairs
+
+class StubServer:
+    """Serves scripted (status, headers) responses, then 200s"""
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests += 1
+                stub.connections.add(self.client_address)
+                status, headers = stub.script.pop(0) if stub.script else (200, {})
+                body = json.dumps({'choices': [{'message': {'content': 'Hola'}}]} if status == 200
+                                  else {'error': 'stub'}).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/v1'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+def make_client(stub, **kwargs):
+    sleeps = []
+    client = LLMClient(base_url=stub.url, api_key='test', sleep=sleeps.append, **kwargs)
+    return client, sleeps
+
+MESSAGES = [{'role': 'user', 'content': 'hi'}]
+
+def test_connections_are_reused(stub):
+    """Sequential calls share one keep-alive connection"""
+    client, _ = make_client(stub)
+    for _ in range(5):
+        assert client.chat_completion(MESSAGES)['choices'][0]['message']['content'] == 'Hola'
+    assert stub.requests == 5
+    assert len(stub.connections) == 1
+    client.close()
+
+def test_transient_errors_are_retried_honoring_retry_after(stub):
+    """429/5xx are retried; Retry-After sets the minimum wait"""
+    stub.script = [(503, {}), (429, {'Retry-After': '2'})]
+    client, sleeps = make_client(stub, backoff_base=0.1, backoff_max=5)
+    client.chat_completion(MESSAGES)
+
+    assert stub.requests == 3
+    assert len(sleeps) == 2 and sleeps[0] <= 0.1 and sleeps[1] == 2
+    stats = client.stats()
+    assert (stats['succeeded'], stats['attempts'], stats['retries']) == (1, 3, 2)
+    assert stats['p50_ms'] is not None
+
+def test_client_errors_and_long_retry_after_are_not_retried(stub):
+    """4xx fails immediately; a Retry-After past backoff_max gives up"""
+    stub.script = [(400, {}), (429, {'Retry-After': '120'})]
+    client, sleeps = make_client(stub, backoff_max=5)
+    for status in (400, 429):
+        with pytest.raises(LLMError) as error:
+            client.chat_completion(MESSAGES)
+        assert error.value.status_code == status
+    assert stub.requests == 2 and sleeps == []
+
+def test_circuit_breaker_fails_fast_and_recovers(stub):
+    """Consecutive failures open the breaker; a trial call closes it again"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    stub.script = [(500, {})] * 3
+    client, _ = make_client(stub, max_retries=5, breaker=breaker)
+
+    with pytest.raises(CircuitOpenError):
+        client.chat_completion(MESSAGES)
+    assert stub.requests == 3 and breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        client.chat_completion(MESSAGES)
+    assert stub.requests == 3
+    assert client.stats()['circuit_rejections'] == 2
+
+    now[0] = 11
+    assert breaker.state == 'half_open'
+    client.chat_completion(MESSAGES)
+    assert breaker.state == 'closed'
+
+def test_bundled_stub_server_speaks_chat_completions():
+    """llm_stub_server answers in the shapes the generation prompts ask for"""
+    stub = StubLLMServer(rate_limit=3, retry_after=0).start()
+    client = LLMClient(base_url=stub.base_url, api_key='test', sleep=lambda delay: None, max_retries=0)
+    prompt = PRACTICE_POOL_PROMPT.format(count=3, language_name='Spanish', vocab_str='hola, gato')
+    content = client.chat_completion([{'role': 'user', 'content': prompt}])['choices'][0]['message']['content']
+    assert len(parse_sentence_pairs(content)) == 3
+
+    batched = client.chat_completion([{'role': 'user', 'content': '{"r1": "Generate 2 sentences", "r2": "Hi"}'}])
+    answers = parse_batch_response(batched['choices'][0]['message']['content'])
+    assert set(answers) == {'r1', 'r2'} and len(answers['r1'].splitlines()) == 2
+
+    client.chat_completion(MESSAGES)
+    with pytest.raises(LLMError) as error:
+        client.chat_completion(MESSAGES)
+    assert error.value.status_code == 429
+    assert stub.stats['throttled'] == 1
+
+    stub.rate_limit, stub.error_rate = 0, 1.0
+    with pytest.raises(LLMError) as error:
+        client.chat_completion(MESSAGES)
+    assert error.value.status_code == 500
+    client.close()
+    stub.stop()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics registry
+"""
+
+import pytest
+from metrics import Registry, instrument_methods
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram('test_seconds', 'Test latency', ['route'], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value, '/a')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP test_seconds Test latency', '# TYPE test_seconds histogram']
+    assert lines[2:] == [
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1"} 3',
+        'test_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_seconds_sum{route="/a"} 4.05',
+        'test_seconds_count{route="/a"} 4',
+    ]
+
+def test_counters_collectors_and_label_escaping():
+    registry = Registry()
+    errors = registry.counter('test_errors_total', 'Errors', ['kind'])
+    errors.inc('say "hi"\n')
+    errors.inc('say "hi"\n', amount=2)
+    registry.register_collector(lambda: [('test_hits_total', 'counter', 'Hits', [({'cache': 'users'}, 7)])])
+
+    text = registry.render()
+    assert 'test_errors_total{kind="say \\"hi\\"\\n"} 3' in text
+    assert '# TYPE test_hits_total counter\ntest_hits_total{cache="users"} 7\n' in text
+    # Asking again returns the same metric; a conflicting definition is refused
+    assert registry.counter('test_errors_total', 'Errors', ['kind']) is errors
+    with pytest.raises(ValueError):
+        registry.histogram('test_errors_total', 'Errors', ['kind'])
+
+def test_instrument_methods_times_public_methods_and_counts_errors():
+    registry = Registry()
+    latency = registry.histogram('test_method_seconds', 'Method latency', ['method'])
+    errors = registry.counter('test_method_errors_total', 'Method errors', ['method'])
+
+    class Store:
+        def get(self, key):
+            return key * 2
+
+        def fail(self):
+            raise RuntimeError('boom')
+
+        def _private(self):
+            return 'untimed'
+
+    instrument_methods(Store, latency, errors)
+    store = Store()
+    assert store.get(2) == 4 and store.get(3) == 6
+    with pytest.raises(RuntimeError):
+        store.fail()
+    store._private()
+
+    assert latency.count('get') == 2 and latency.count('fail') == 1 and latency.count('_private') == 0
+    assert errors.value('fail') == 1 and errors.value('get') == 0
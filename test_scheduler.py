@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for the SM-2 review scheduler
+"""
+
+from scheduler import (DAY_SECONDS, DEFAULT_EASE, MIN_EASE, RELEARN_SECONDS,
+                       answer_quality, interval_after, review)
+
+def test_answer_quality_grades_by_correctness_and_speed():
+    assert answer_quality(False, 1000) == 1
+    assert answer_quality(True) == 4
+    assert answer_quality(True, 2000) == 5
+    assert answer_quality(True, 8000) == 4
+    assert answer_quality(True, 60000) == 3
+
+def test_correct_answers_grow_the_interval():
+    state = review(DEFAULT_EASE, 0, 0, 4, now=0)
+    assert (state.interval_days, state.repetitions, state.next_due) == (1, 1, DAY_SECONDS)
+    state = review(*state[:3], 4, now=0)
+    assert state.interval_days == 6
+    state = review(*state[:3], 4, now=0)
+    assert state.interval_days == 6 * DEFAULT_EASE
+    assert [interval_after(n) for n in range(4)] == [0, 1, 6, 6 * DEFAULT_EASE]
+
+def test_wrong_answers_reset_the_streak_and_lower_ease():
+    state = review(DEFAULT_EASE, 15, 3, 1, now=100)
+    assert (state.interval_days, state.repetitions, state.next_due) == (0, 0, 100 + RELEARN_SECONDS)
+    assert state.ease_factor < DEFAULT_EASE
+
+    for _ in range(20):
+        state = review(*state[:3], 1, now=100)
+    assert state.ease_factor == MIN_EASE
+    # Easy answers earn ease back
+    assert review(*state[:3], 5, now=100).ease_factor > MIN_EASE
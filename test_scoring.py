@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for translation scoring
+"""
+
+from scoring import edit_distance, is_correct, score_translation, score_translations, tokenize
+
+def test_edit_distance_counts_swaps_and_respects_limit():
+    assert edit_distance('kitten', 'sitting') == 3
+    assert edit_distance('student', 'studnet') == 1
+    assert edit_distance('library', 'libary') == 1
+    assert edit_distance('house', 'mouse', limit=1) == 1
+    assert edit_distance('house', 'table', limit=1) == 2
+
+def test_tokenize_handles_scripts_and_language_rules():
+    assert tokenize("¡Hola, Señor_López!") == ['hola', 'señor', 'lópez']
+    assert tokenize('नमस्ते दुनिया।') == ['नमस्ते', 'दुनिया']
+    assert tokenize('我是学生。') == ['我', '是', '学', '生']
+    assert tokenize('مَرْحَبًا', 'ar') == ['مرحبا']
+    assert tokenize('학교에 가요', 'ko') == ['학교', '가요']
+
+def test_score_matches_key_words_with_partial_credit_for_typos():
+    assert score_translation('The cat eats fish.', 'the cat eats fish') == 1.0
+    assert score_translation('A dog sleeps', 'The cat eats fish') == 0.0
+    # 'student' is the only key word; one swapped pair of letters keeps 6/7 of the credit
+    assert score_translation('I am a studnet', 'I am a student.') == round(6 / 7, 4)
+    # Short answers are scored on all of their words
+    assert score_translation('I go', 'I go.') == 1.0
+    assert score_translation('I am a studnet', 'I am a student.', fuzzy_threshold=1) == 0.0
+
+def test_chinese_and_japanese_are_scored_per_character():
+    assert score_translation('我是老师', '我是学生') == 0.5
+    assert is_correct(score_translation('私は学生です', '私は学生です。'))
+
+def test_batch_scoring_matches_single_calls():
+    pairs = [('I am a studnet', 'I am a student.'), ('我是老师', '我是学生'), ('', 'hello')]
+    assert score_translations(pairs) == [score_translation(*pair) for pair in pairs]
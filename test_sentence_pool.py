@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for pre-generated practice sentence pools
+"""
+
+import sqlite3
+import threading
+import time
+import pytest
+from database import DatabaseManager
+from sentence_pool import SentencePool
+
+def make_pool(tmp_path, **kwargs):
+    db = DatabaseManager(str(tmp_path / 'pool.db'))
+    user_id = db.create_user('pool', 'pool@example.com', 'secret')
+    calls = []
+    release = threading.Event()
+    release.set()
+
+    def refill(user_id, language_id, difficulty_level, count):
+        calls.append(count)
+        release.wait(5)
+        pairs = [(f'frase {len(calls)}.{i}', f'sentence {i}') for i in range(count)]
+        db.add_pooled_sentences(user_id, language_id, difficulty_level, pairs)
+        return {'success': True, 'count': count}
+
+    pool = SentencePool(db, refill, **kwargs)
+    return db, user_id, pool, calls, release
+
+def wait_for_refills(pool, timeout=5):
+    deadline = time.monotonic() + timeout
+    while pool.stats()['refilling'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_pool_serves_sentences_and_refills_below_low_water(tmp_path):
+    """An empty pool misses and fills to depth; taking below low water tops it up"""
+    db, user_id, pool, calls, _ = make_pool(tmp_path, depth=4, low_water=2)
+
+    assert pool.take(user_id, 1, 'beginner') is None
+    wait_for_refills(pool)
+    assert calls == [4]
+    assert db.count_pooled_sentences(user_id, 1, 'beginner') == 4
+
+    served = [pool.take(user_id, 1, 'beginner') for _ in range(3)]
+    pool.shutdown()
+
+    assert [s['sentence'] for s in served] == ['frase 1.0', 'frase 1.1', 'frase 1.2']
+    # The third take left one sentence, below the low-water mark
+    assert calls == [4, 3]
+    assert db.count_pooled_sentences(user_id, 1, 'beginner') == 4
+    assert pool.stats()['hits'] == 3
+
+    # Served sentences become regular sentences; pooled ones stay hidden
+    listed = {s['sentence'] for s in db.get_user_sentences(user_id, 1)}
+    assert listed == {'frase 1.0', 'frase 1.1', 'frase 1.2'}
+    db.close()
+
+def test_concurrent_takes_share_one_refill(tmp_path):
+    """Only one refill per pool is in flight at a time"""
+    db, user_id, pool, calls, release = make_pool(tmp_path, depth=3, low_water=1)
+    release.clear()
+
+    assert pool.ensure_filled(user_id, 1, 'beginner')
+    assert not pool.ensure_filled(user_id, 1, 'beginner')
+    assert pool.take(user_id, 1, 'beginner') is None
+
+    release.set()
+    pool.shutdown()
+    assert calls == [3]
+    db.close()
+
+def test_failed_count_does_not_block_later_refills(tmp_path, monkeypatch):
+    """A pool whose count query fails is refilled once the database recovers"""
+    db, user_id, pool, calls, _ = make_pool(tmp_path, depth=2, low_water=1)
+    count = db.count_pooled_sentences
+
+    def locked(*args):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(db, 'count_pooled_sentences', locked)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.ensure_filled(user_id, 1, 'beginner')
+    assert pool.stats()['refilling'] == 0
+
+    monkeypatch.setattr(db, 'count_pooled_sentences', count)
+    assert pool.ensure_filled(user_id, 1, 'beginner')
+    pool.shutdown()
+    assert calls == [2]
+    db.close()
+
+def test_zero_depth_disables_pool(tmp_path):
+    """depth=0 never generates"""
+    db, user_id, pool, calls, _ = make_pool(tmp_path, depth=0)
+    assert pool.take(user_id, 1, 'beginner') is None
+    assert not pool.ensure_filled(user_id, 1, 'beginner')
+    pool.shutdown()
+    assert calls == []
+    db.close()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQL profiler
+"""
+
+from database import DatabaseManager
+from sql_profiler import SQLProfiler, normalize_sql
+
+def test_normalize_sql_groups_literals_and_in_lists():
+    assert normalize_sql("SELECT * FROM vocabulary\n   WHERE user_id = 12 AND word = 'it''s'") == \
+        'SELECT * FROM vocabulary WHERE user_id = ? AND word = ?'
+    assert normalize_sql('SELECT id FROM vocabulary WHERE id IN (?, ?, ?) AND level >= 1.5') == \
+        'SELECT id FROM vocabulary WHERE id IN (...) AND level >= ?'
+    # Digits inside identifiers are left alone
+    assert normalize_sql('SELECT col2 FROM t1') == 'SELECT col2 FROM t1'
+
+def test_statements_are_aggregated_per_normalized_text(tmp_path):
+    profiler = SQLProfiler(slow_ms=10_000, log=None)
+    db = DatabaseManager(str(tmp_path / 'profile.db'), profiler=profiler)
+    user_id = db.create_user('profiled', 'profiled@example.com', 'secret')
+    profiler.reset()
+
+    db.add_vocabulary_bulk(user_id, 1, [{'word': f'word{i}', 'translation': 't'} for i in range(10)])
+    for _ in range(3):
+        db.get_user_vocabulary(user_id, 1)
+
+    stats = profiler.stats()
+    by_sql = {entry['sql']: entry for entry in stats['statements']}
+    select = next(entry for sql, entry in by_sql.items() if sql.startswith('SELECT') and 'FROM vocabulary' in sql)
+    assert select['calls'] == 3
+    assert select['rows'] == 30
+    assert select['max_ms'] <= select['total_ms']
+    insert = next(entry for sql, entry in by_sql.items() if sql.startswith('INSERT INTO vocabulary'))
+    # The user_stats triggers run once per inserted row
+    assert insert['trigger_steps'] >= 10
+    assert stats['slow_queries'] == []
+
+def test_slow_queries_are_logged_with_their_plan_and_requests_summarized(tmp_path):
+    logged = []
+    profiler = SQLProfiler(slow_ms=0, log=logged.append)
+    db = DatabaseManager(str(tmp_path / 'profile.db'), profiler=profiler)
+    user_id = db.create_user('profiled', 'profiled@example.com', 'secret')
+    profiler.reset()
+
+    profiler.start_request()
+    db.get_user_vocabulary(user_id, 1)
+    db.get_user_vocabulary(user_id, 1)
+    summary = profiler.end_request()
+
+    assert summary['queries'] == sum(statement['calls'] for statement in summary['statements'])
+    vocabulary = [statement for statement in summary['statements'] if 'FROM vocabulary' in statement['sql']]
+    assert vocabulary and vocabulary[0]['calls'] == 2
+    assert profiler.end_request() is None
+
+    slow = [entry for entry in profiler.stats()['slow_queries'] if 'FROM vocabulary' in entry['sql']]
+    assert slow and any('vocabulary' in step for step in slow[0]['plan'])
+    assert any(line.startswith('🐢 Slow query') for line in logged)
+    assert any(line.strip().startswith('plan:') for line in logged)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming vocabulary imports
+"""
+
+import io
+import json
+import pytest
+from database import DatabaseManager
+import vocabulary_import
+from vocabulary_import import import_vocabulary, parse_rows, VocabularyImportError
+
+def make_user(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'import.db'))
+    user_id = db.create_user('importer', 'importer@example.com', 'secret')
+    db.add_user_language(user_id, 1)
+    return db, user_id
+
+def words(db, user_id):
+    conn = db.get_connection()
+    rows = conn.execute('SELECT word, translation, difficulty_level, category FROM vocabulary '
+                        'WHERE user_id = ? ORDER BY id', (user_id,)).fetchall()
+    conn.close()
+    return rows
+
+def test_each_format_parses_with_line_numbers():
+    csv_file = io.BytesIO('﻿Word,Translation,notes\nhola,hello,x\n\n"adiós","good\nbye",y\n'.encode('utf-8'))
+    assert list(parse_rows(csv_file, 'csv')) == [
+        (2, {'word': 'hola', 'translation': 'hello'}),
+        (4, {'word': 'adiós', 'translation': 'good\nbye'}),
+    ]
+
+    ndjson_file = io.BytesIO(b'{"word": "gato", "extra": 1}\n\n[1]\n{oops\n')
+    assert list(parse_rows(ndjson_file, 'ndjson')) == [
+        (1, {'word': 'gato'}), (3, 'Entry must be an object'), (4, 'Invalid JSON')]
+
+    anki_file = io.BytesIO(b'#separator:tab\n#html:true\n#tags column:3\n'
+                           b'perro<br>dog\tthe <b>dog</b> [sound:perro.mp3]\tanimals nouns\n'
+                           b'caf&eacute;\tcoffee\t\n')
+    assert list(parse_rows(anki_file, 'anki')) == [
+        (4, {'word': 'perro dog', 'translation': 'the dog', 'category': 'animals'}),
+        (5, {'word': 'café', 'translation': 'coffee'}),
+    ]
+
+    with pytest.raises(VocabularyImportError):
+        list(parse_rows(io.BytesIO(b'translation\nhello\n'), 'csv'))
+
+def test_import_writes_chunks_and_records_row_errors(tmp_path):
+    db, user_id = make_user(tmp_path)
+    lines = [json.dumps({'word': f'palabra {i}', 'translation': f'word {i}'}) for i in range(25)]
+    lines[4] = json.dumps({'word': ' '})
+    lines[9] = json.dumps({'word': 'raro', 'difficulty_level': 'expert'})
+    progress = []
+
+    result = import_vocabulary(db, user_id, io.BytesIO('\n'.join(lines).encode('utf-8')), 'ndjson', 1,
+                               difficulty_level='intermediate', chunk_size=10,
+                               progress=lambda item: progress.append(item['rows_processed']))
+    assert progress == [0, 10, 20, 25]
+    assert result['status'] == 'completed'
+    assert (result['rows_processed'], result['added_count'], result['error_count']) == (25, 23, 2)
+    assert result['errors'] == [{'line': 5, 'error': 'Word is required'},
+                                {'line': 10, 'error': "Unknown difficulty level 'expert'"}]
+    rows = words(db, user_id)
+    assert len(rows) == 23 and rows[0] == ('palabra 0', 'word 0', 'intermediate', None)
+    assert db.get_vocabulary_imports(user_id)[0]['id'] == result['id']
+    db.close()
+
+def test_interrupted_import_resumes_without_duplicates(tmp_path, monkeypatch):
+    db, user_id = make_user(tmp_path)
+    body = ('word,translation\n' + ''.join(f'palabra {i},word {i}\n' for i in range(35))).encode('utf-8')
+
+    write_chunk = db.write_vocabulary_import_chunk
+    calls = []
+    def crash_on_third_chunk(*args):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError('disk on fire')
+        return write_chunk(*args)
+    monkeypatch.setattr(db, 'write_vocabulary_import_chunk', crash_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        import_vocabulary(db, user_id, io.BytesIO(body), 'csv', 1, chunk_size=10)
+    monkeypatch.undo()
+
+    interrupted = db.get_vocabulary_imports(user_id)[0]
+    assert (interrupted['status'], interrupted['rows_processed']) == ('failed', 20)
+    assert len(words(db, user_id)) == 20
+
+    # A different file is refused instead of skipping the wrong rows
+    edited = body.replace(b'palabra 7,', b'palabra siete,')
+    with pytest.raises(VocabularyImportError):
+        import_vocabulary(db, user_id, io.BytesIO(edited), import_id=interrupted['id'], chunk_size=10)
+    assert len(words(db, user_id)) == 20
+
+    result = import_vocabulary(db, user_id, io.BytesIO(body), import_id=interrupted['id'], chunk_size=10)
+    assert (result['status'], result['rows_processed'], result['added_count']) == ('completed', 35, 35)
+    assert [row[0] for row in words(db, user_id)] == [f'palabra {i}' for i in range(35)]
+
+    # A completed import is not run again
+    again = import_vocabulary(db, user_id, io.BytesIO(body), import_id=interrupted['id'])
+    assert again['added_count'] == 35 and len(words(db, user_id)) == 35
+    assert 'checkpoint' not in vocabulary_import.import_summary(again)
+    db.close()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Vocabulary Importer for LinguaLearn
+Streams CSV, NDJSON or Anki plain-text (tab-separated) vocabulary files into
+a user's vocabulary. Rows are parsed and validated one at a time and written
+in one transaction per chunk together with the import's progress, so memory
+stays flat for any file size and an interrupted import picks up after the
+last chunk it committed.
+
+    python vocabulary_import.py deck.txt --user dev --language es
+    python vocabulary_import.py words.csv --user dev --resume <import id>
+"""
+
+import argparse
+import csv
+import hashlib
+import html
+import io
+import itertools
+import json
+import os
+import re
+import shlex
+import uuid
+
+FORMATS = ('csv', 'ndjson', 'anki')
+_EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.tsv': 'anki', '.txt': 'anki'}
+# Columns read from CSV headers and NDJSON objects; anything else is ignored
+FIELDS = ('word', 'translation', 'category', 'part_of_speech', 'example_sentence', 'difficulty_level')
+DIFFICULTY_LEVELS = ('beginner', 'intermediate', 'advanced')
+# Rows parsed per transaction
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+# Row errors stored with an import; later ones are only counted
+MAX_STORED_ERRORS = 100
+
+# Anki "Notes in Plain Text" headers (#separator:tab, #html:true, #tags column:3, ...)
+_ANKI_SEPARATORS = {'tab': '\t', 'comma': ',', 'semicolon': ';', 'space': ' ', 'pipe': '|', 'colon': ':'}
+_ANKI_META_COLUMNS = ('guid', 'notetype', 'deck', 'tags')
+_HTML_BREAK = re.compile(r'<br\s*/?>|</div>|</p>', re.IGNORECASE)
+_HTML_TAG = re.compile(r'<[^>]*>')
+_ANKI_MEDIA = re.compile(r'\[sound:[^\]]*\]')
+_SPACE = re.compile(r'\s+')
+
+class VocabularyImportError(Exception):
+    """Raised when an import cannot start or continue; row problems are recorded instead"""
+    def __init__(self, message, import_id=None):
+        super().__init__(message)
+        self.import_id = import_id
+
+class ImportConflictError(VocabularyImportError):
+    """Raised when another process has advanced the same import"""
+
+def detect_format(filename):
+    """Format implied by a file name's extension, or None"""
+    return _EXTENSIONS.get(os.path.splitext(filename or '')[1].lower())
+
+def _text(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    # utf-8-sig drops the byte order mark spreadsheet programs put in CSV files
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+def parse_rows(stream, format_name):
+    """Yield (line number, record) for each row of a file, where record is a
+    dict of FIELDS values, or an error message for rows that cannot be read"""
+    text = _text(stream)
+    if format_name == 'csv':
+        return _parse_csv(text)
+    if format_name == 'ndjson':
+        return _parse_ndjson(text)
+    if format_name == 'anki':
+        return _parse_anki(text)
+    raise VocabularyImportError(f'Unknown format {format_name!r}, expected one of: {", ".join(FORMATS)}')
+
+def _read_csv(reader, offset=0):
+    """(first line, values) per record of a csv.reader, skipping blank records"""
+    line = reader.line_num
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            line = reader.line_num
+            yield offset + line, f'Malformed row: {e}'
+            continue
+        start, line = line + 1, reader.line_num
+        if any(value.strip() for value in values):
+            yield offset + start, values
+
+def _parse_csv(text):
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [column.strip().lower() for column in header]
+    if 'word' not in columns:
+        raise VocabularyImportError('The CSV header must have a "word" column')
+
+    for line, values in _read_csv(reader):
+        if isinstance(values, str):
+            yield line, values
+        else:
+            yield line, {column: value for column, value in zip(columns, values) if column in FIELDS}
+
+def _parse_ndjson(text):
+    for line, content in enumerate(text, 1):
+        if not content.strip():
+            continue
+        try:
+            value = json.loads(content)
+        except ValueError:
+            yield line, 'Invalid JSON'
+            continue
+        if not isinstance(value, dict):
+            yield line, 'Entry must be an object'
+            continue
+        yield line, {key: value[key] for key in FIELDS if key in value}
+
+def _clean_anki_field(value, is_html):
+    if is_html:
+        value = html.unescape(_HTML_TAG.sub('', _HTML_BREAK.sub(' ', value)))
+    return _SPACE.sub(' ', _ANKI_MEDIA.sub('', value)).strip()
+
+def _parse_anki(text):
+    """Front -> word, back -> translation, first tag -> category"""
+    separator, is_html = '\t', True
+    meta_columns = {}
+    header_lines = 0
+    first = None
+    for content in text:
+        if not content.startswith('#'):
+            first = content
+            break
+        header_lines += 1
+        key, _, value = content[1:].strip().partition(':')
+        key, value = key.strip().lower(), value.strip()
+        if key == 'separator':
+            separator = _ANKI_SEPARATORS.get(value.lower(), value[:1] or '\t')
+        elif key == 'html':
+            is_html = value.lower() == 'true'
+        elif key.endswith(' column') and key[:-len(' column')] in _ANKI_META_COLUMNS and value.isdigit():
+            meta_columns[key[:-len(' column')]] = int(value) - 1
+    if first is None:
+        return
+
+    reader = csv.reader(itertools.chain([first], text), delimiter=separator)
+    skipped = set(meta_columns.values())
+    for line, values in _read_csv(reader, header_lines):
+        if isinstance(values, str):
+            yield line, values
+            continue
+        fields = [value for index, value in enumerate(values) if index not in skipped]
+        record = {'word': _clean_anki_field(fields[0], is_html) if fields else ''}
+        if len(fields) > 1:
+            record['translation'] = _clean_anki_field(fields[1], is_html)
+        tags_column = meta_columns.get('tags')
+        if tags_column is not None and tags_column < len(values) and values[tags_column].split():
+            record['category'] = values[tags_column].split()[0]
+        yield line, record
+
+def validate(record, default_level='beginner'):
+    """(word, translation, difficulty_level, category, part_of_speech, example_sentence), or an error message"""
+    values = {}
+    for key in FIELDS:
+        value = record.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return 'Fields must be strings'
+        value = value.strip()
+        if value:
+            values[key] = value
+
+    if 'word' not in values:
+        return 'Word is required'
+    level = values.get('difficulty_level', default_level).lower()
+    if level not in DIFFICULTY_LEVELS:
+        return f'Unknown difficulty level {level!r}'
+    return (values['word'], values.get('translation'), level, values.get('category'),
+            values.get('part_of_speech'), values.get('example_sentence'))
+
+def import_summary(vocabulary_import):
+    """An import as shown to its owner"""
+    return {key: value for key, value in vocabulary_import.items() if key not in ('user_id', 'checkpoint')}
+
+def import_vocabulary(db, user_id, stream, format_name=None, language_id=None, filename=None,
+                      difficulty_level='beginner', import_id=None, chunk_size=None, progress=None):
+    """Stream a vocabulary file into a user's vocabulary and return the import's final state.
+
+    A new import needs format_name and language_id. Passing the import_id
+    of an interrupted or failed import, with the same file, resumes it: its
+    stored format, language and level apply, the rows it already committed
+    are read again only to check that the file matches, and importing
+    continues after them. progress(vocabulary_import) is called once before
+    reading (so callers learn the import id) and after each chunk. Unreadable or invalid rows are counted and the first
+    MAX_STORED_ERRORS are kept with their line numbers; problems that stop
+    the whole import raise VocabularyImportError.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    if import_id:
+        vocabulary_import = db.get_vocabulary_import(import_id, user_id)
+        if vocabulary_import is None:
+            raise VocabularyImportError('Import not found')
+        if vocabulary_import['status'] == 'completed':
+            return vocabulary_import
+        db.set_vocabulary_import_status(import_id, 'running')
+    else:
+        if format_name not in FORMATS:
+            raise VocabularyImportError(f'Unknown format {format_name!r}, expected one of: {", ".join(FORMATS)}')
+        if difficulty_level not in DIFFICULTY_LEVELS:
+            raise VocabularyImportError(f'Unknown difficulty level {difficulty_level!r}')
+        import_id = uuid.uuid4().hex
+        db.create_vocabulary_import(import_id, user_id, language_id, format_name, filename, difficulty_level)
+    vocabulary_import = db.get_vocabulary_import(import_id)
+    if progress:
+        progress(vocabulary_import)
+
+    try:
+        _run_import(db, vocabulary_import, stream, chunk_size, progress)
+    except ImportConflictError:
+        raise
+    except KeyboardInterrupt:
+        db.set_vocabulary_import_status(import_id, 'failed', 'Interrupted')
+        raise
+    except (VocabularyImportError, UnicodeDecodeError) as e:
+        message = 'The file is not UTF-8 text' if isinstance(e, UnicodeDecodeError) else str(e)
+        db.set_vocabulary_import_status(import_id, 'failed', message)
+        raise VocabularyImportError(message, import_id) from e
+    except Exception as e:
+        db.set_vocabulary_import_status(import_id, 'failed', str(e))
+        raise
+    db.set_vocabulary_import_status(import_id, 'completed')
+    return db.get_vocabulary_import(import_id)
+
+def _run_import(db, vocabulary_import, stream, chunk_size, progress):
+    # Digest of every row read so far, so a resumed import can check it is reading the same file
+    digest = hashlib.blake2b(digest_size=16)
+    committed = vocabulary_import['rows_processed']
+    state = {'rows_processed': 0, 'added_count': vocabulary_import['added_count'],
+             'error_count': vocabulary_import['error_count'], 'errors': vocabulary_import['errors']}
+    rows = []
+
+    for line, record in parse_rows(stream, vocabulary_import['format']):
+        digest.update(repr((line, record)).encode('utf-8'))
+        state['rows_processed'] += 1
+        if state['rows_processed'] <= committed:
+            if state['rows_processed'] == committed and digest.hexdigest() != vocabulary_import['checkpoint']:
+                raise VocabularyImportError('The file does not match the interrupted import')
+            continue
+
+        values = record if isinstance(record, str) else validate(record, vocabulary_import['difficulty_level'])
+        if isinstance(values, str):
+            state['error_count'] += 1
+            if len(state['errors']) < MAX_STORED_ERRORS:
+                state['errors'].append({'line': line, 'error': values})
+        else:
+            rows.append(values)
+
+        if state['rows_processed'] - vocabulary_import['rows_processed'] >= chunk_size:
+            vocabulary_import = _write_chunk(db, vocabulary_import, rows, state, digest)
+            rows = []
+            if progress:
+                progress(vocabulary_import)
+
+    if state['rows_processed'] < committed:
+        raise VocabularyImportError('The file ends before the rows the interrupted import already read')
+    if state['rows_processed'] > vocabulary_import['rows_processed']:
+        vocabulary_import = _write_chunk(db, vocabulary_import, rows, state, digest)
+        if progress:
+            progress(vocabulary_import)
+
+def _write_chunk(db, vocabulary_import, rows, state, digest):
+    state['added_count'] += len(rows)
+    update = dict(state, errors=list(state['errors']), checkpoint=digest.hexdigest())
+    if not db.write_vocabulary_import_chunk(vocabulary_import, rows, update):
+        raise ImportConflictError('The import was resumed somewhere else', vocabulary_import['id'])
+    return dict(vocabulary_import, **update)
+
+def resume_command(path, username, import_id):
+    """Shell command that continues an interrupted import"""
+    return ' '.join(shlex.quote(part) for part in
+                    ('python', 'vocabulary_import.py', path, '--user', username, '--resume', import_id))
+
+def main():
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description='Import a vocabulary file for a LinguaLearn user')
+    parser.add_argument('path', help='CSV (word column required), NDJSON or Anki plain-text export')
+    parser.add_argument('--user', required=True, help='Username to import for')
+    parser.add_argument('--language', help='Language code or id (not needed with --resume)')
+    parser.add_argument('--format', choices=FORMATS, help='File format (default: from the extension)')
+    parser.add_argument('--difficulty', choices=DIFFICULTY_LEVELS, default='beginner',
+                        help='Level for rows without a difficulty_level')
+    parser.add_argument('--resume', metavar='IMPORT_ID', help='Continue an interrupted import of the same file')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction')
+    parser.add_argument('--db', default='language_learning.db', help='Database file')
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    try:
+        user = db.get_user_by_username(args.user)
+        if not user:
+            parser.error(f'No active user named {args.user!r}')
+
+        language_id = None
+        format_name = args.format or detect_format(args.path)
+        if not args.resume:
+            if not args.language:
+                parser.error('--language is required for a new import')
+            language = (db.get_language(int(args.language)) if args.language.isdigit()
+                        else db.get_language_by_code(args.language))
+            if not language:
+                parser.error(f'Unknown language {args.language!r}')
+            if not format_name:
+                parser.error('Cannot tell the format from the file name; pass --format')
+            language_id = language['id']
+            db.add_user_language(user['id'], language_id)
+
+        started = {}
+
+        def report(vocabulary_import):
+            started['id'] = vocabulary_import['id']
+            print(f"\r📥 {vocabulary_import['rows_processed']:,} rows read, "
+                  f"{vocabulary_import['added_count']:,} added, {vocabulary_import['error_count']:,} errors",
+                  end='', flush=True)
+
+        print(f"📚 Importing {args.path} for {user['username']}...")
+        try:
+            with open(args.path, 'rb') as stream:
+                result = import_vocabulary(db, user['id'], stream, format_name, language_id,
+                                           filename=os.path.basename(args.path), difficulty_level=args.difficulty,
+                                           import_id=args.resume, chunk_size=args.chunk_size, progress=report)
+        except VocabularyImportError as e:
+            print(f"\n❌ {e}")
+            if e.import_id:
+                print(f"   Resume with: {resume_command(args.path, args.user, e.import_id)}")
+            raise SystemExit(1)
+        except KeyboardInterrupt:
+            if started:
+                print(f"\n⚠️ Import {started['id']} interrupted; resume with:\n"
+                      f"   {resume_command(args.path, args.user, started['id'])}")
+            else:
+                print("\n⚠️ Interrupted before the import started")
+            raise SystemExit(130)
+
+        print(f"\n✅ Import {result['id']}: {result['added_count']:,} words added, "
+              f"{result['error_count']:,} rows skipped")
+        for error in result['errors'][:10]:
+            print(f"  - line {error['line']}: {error['error']}")
+        if result['error_count'] > 10:
+            print(f"  ... and {result['error_count'] - 10:,} more")
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()